@@ -1,4 +1,8 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
+
+from auth.dependencies import require_token
+from auth.services.token_cache import token_cache
+from xrp.services.client import client_stats
 
 general_router = r = APIRouter()
 
@@ -62,4 +66,19 @@ async def get_remittances():
 
 @r.get("/200OK")
 async def get_200OK():
-    return {"message": "200 OK"}
\ No newline at end of file
+    return {"message": "200 OK"}
+
+
+@r.get("/xrpl-clients", dependencies=[Depends(require_token)])
+async def get_xrpl_clients():
+    """
+    Pool size, timeout and request counters of the shared XRPL clients.
+    Endpoint URLs are reduced to scheme and host.
+    """
+    return client_stats()
+
+
+@r.get("/token-cache", dependencies=[Depends(require_token)])
+async def get_token_cache():
+    """Hit/miss counters and size of the verified-token cache"""
+    return token_cache.stats()
@@ -1,3 +1,89 @@
-from fastapi import APIRouter
+import os
+import re
+from typing import List
 
-wallet_router = r = APIRouter()
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from fastapi.responses import FileResponse
+from pydantic import BaseModel
+
+from app.services.provisioning import provision_accounts, provisioning_jobs
+from auth.dependencies import require_admin
+from app.services.wallet import get_wallet_service
+from xrp.models.loan import ApiResponse, JobStatus
+from xrp.services.jobs import JobQueueFull
+
+# Provisioning funds and creates accounts and its results list wallet
+# addresses, so every route needs a token from an operator DID (ADMIN_DIDS)
+wallet_router = r = APIRouter(dependencies=[Depends(require_admin)])
+
+# Per-batch results; keep them out of the statically served data directory
+PROVISIONING_DIR = os.getenv("PROVISIONING_DIR", "provisioning-results")
+
+
+class ProvisionRequest(BaseModel):
+    batch_id: str
+    usernames: List[str]
+
+
+@r.post("/provision", response_model=ApiResponse)
+async def provision(req: ProvisionRequest, response: Response):
+    """
+    Create Turnkey accounts for a list of users in the background.
+
+    Results are written per user to ``PROVISIONING_DIR/<batch_id>.jsonl`` and
+    served by ``GET /provision/{job_id}/results`` once the job has finished;
+    posting the same ``batch_id`` again resumes the batch, retrying only the
+    users that failed or were not reached.
+    """
+    if not re.fullmatch(r"[A-Za-z0-9_-]{1,64}", req.batch_id):
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="batch_id must be 1-64 letters, digits, '-' or '_'",
+        )
+    results_path = os.path.join(PROVISIONING_DIR, f"{req.batch_id}.jsonl")
+
+    async def workflow(report) -> ApiResponse:
+        counts = await provision_accounts(
+            get_wallet_service(), req.usernames, results_path, report=report
+        )
+        return ApiResponse(
+            success=counts.get("failed", 0) == 0,
+            message=f"Provisioned batch {req.batch_id}",
+            data={**counts, "batch_id": req.batch_id},
+        )
+
+    try:
+        job = provisioning_jobs.submit("provision", workflow)
+    except JobQueueFull as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"Too many provisioning jobs in progress: {e}",
+            headers={"Retry-After": "30"},
+        )
+    response.status_code = status.HTTP_202_ACCEPTED
+    return ApiResponse(
+        success=True,
+        message=f"Queued provisioning of {len(req.usernames)} users",
+        data={"job_id": job.id, "status_url": f"provision/{job.id}"},
+    )
+
+
+@r.get("/provision/{job_id}", response_model=JobStatus)
+async def get_provision_job(job_id: str):
+    """Get progress and, once finished, the counts of a provisioning job"""
+    job = provisioning_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@r.get("/provision/{job_id}/results")
+async def get_provision_results(job_id: str):
+    """Per-user results (JSON lines) of a finished provisioning job"""
+    job = await get_provision_job(job_id)
+    if job.result is None or job.result.data is None or "batch_id" not in job.result.data:
+        raise HTTPException(status_code=409, detail="Job has not finished")
+    results_path = os.path.join(PROVISIONING_DIR, f"{job.result.data['batch_id']}.jsonl")
+    if not os.path.exists(results_path):
+        raise HTTPException(status_code=404, detail="Results not found")
+    return FileResponse(results_path, media_type="application/x-ndjson")
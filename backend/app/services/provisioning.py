@@ -0,0 +1,171 @@
+import argparse
+import asyncio
+import json
+import os
+import time
+from collections import Counter
+from typing import Callable, Dict, Iterable, List, Optional, Set, TextIO
+
+from fastapi import HTTPException
+
+from xrp.services.jobs import JobQueue
+
+from .rate_limit import TokenBucket
+from .wallet import AsyncTurnkeyService, get_wallet_service
+
+# Users provisioned at the same time
+PROVISION_CONCURRENCY = int(os.getenv("PROVISION_CONCURRENCY", "20"))
+
+# Statuses that need no retry when a run is resumed
+DONE_STATUSES = {"created", "exists"}
+
+provisioning_jobs = JobQueue(
+    workers=int(os.getenv("PROVISION_JOB_WORKERS", "1")),
+    max_queued=int(os.getenv("PROVISION_JOB_QUEUE_SIZE", "10")),
+    max_jobs=int(os.getenv("PROVISION_JOB_HISTORY", "100")),
+)
+
+
+def completed_usernames(results_path: str) -> Set[str]:
+    """Users already provisioned according to an earlier run's results file"""
+    done: Set[str] = set()
+    if not os.path.exists(results_path):
+        return done
+    with open(results_path) as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # A line cut short by an interrupted run
+                continue
+            if record.get("status") in DONE_STATUSES:
+                done.add(record["username"])
+    return done
+
+
+def _open_results(results_path: str) -> TextIO:
+    directory = os.path.dirname(results_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    return open(results_path, "a")
+
+
+def _append_record(results: TextIO, record: Dict) -> None:
+    results.write(json.dumps(record) + "\n")
+    results.flush()
+
+
+async def _provision_user(service: AsyncTurnkeyService, username: str) -> Dict:
+    record = {"username": username, "at": time.time()}
+    try:
+        result = await service.create_account(username)
+    except HTTPException as e:
+        return {**record, "status": "failed", "error": e.detail}
+    except Exception as e:
+        return {**record, "status": "failed", "error": str(e)}
+
+    if isinstance(result, list):
+        return {**record, "status": "exists", "sub_org_id": result[0]}
+    created = service.created_wallet(result)
+    if created is None:
+        return {**record, "status": "created"}
+    return {
+        **record,
+        "status": "created",
+        "sub_org_id": created.sub_org_id,
+        "wallet_id": created.wallet_id,
+        "address": created.address,
+    }
+
+
+async def provision_accounts(
+    service: AsyncTurnkeyService,
+    usernames: Iterable[str],
+    results_path: str,
+    concurrency: int = PROVISION_CONCURRENCY,
+    report: Callable[[str], None] = lambda step: None,
+) -> Dict[str, int]:
+    """
+    Create Turnkey sub-orgs for many users at once.
+
+    Existence checks and creation run for ``concurrency`` users at a time,
+    throttled by the service's rate limiter. One JSON line per user is
+    appended to ``results_path`` as soon as that user finishes. The file
+    doubles as the checkpoint: rerunning with the same path skips users
+    already created or found, and retries the ones that failed.
+    """
+    done = await asyncio.to_thread(completed_usernames, results_path)
+    pending = list(dict.fromkeys(u.strip() for u in usernames if u.strip()))
+    counts = Counter(skipped=sum(1 for u in pending if u in done))
+    pending = [u for u in pending if u not in done]
+    report(f"Provisioning {len(pending)} users ({counts['skipped']} already done)")
+
+    queue: asyncio.Queue = asyncio.Queue()
+    for username in pending:
+        queue.put_nowait(username)
+    report_every = max(1, len(pending) // 20)
+
+    results = await asyncio.to_thread(_open_results, results_path)
+    # One write at a time, each handed to a thread so disk I/O stays off the loop
+    write_lock = asyncio.Lock()
+
+    async def worker() -> None:
+        while True:
+            try:
+                username = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            record = await _provision_user(service, username)
+            async with write_lock:
+                await asyncio.to_thread(_append_record, results, record)
+            counts[record["status"]] += 1
+            finished = sum(counts.values()) - counts["skipped"]
+            if finished % report_every == 0:
+                report(f"Provisioned {finished}/{len(pending)} users")
+
+    try:
+        await asyncio.gather(*(worker() for _ in range(max(1, concurrency))))
+    finally:
+        await asyncio.to_thread(results.close)
+
+    return dict(counts)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Create Turnkey sub-orgs and XRP wallets for a list of users"
+    )
+    parser.add_argument("usernames", help="file with one username per line")
+    parser.add_argument(
+        "--results",
+        default="provisioning-results.jsonl",
+        help="per-user results file, also used to resume an interrupted run",
+    )
+    parser.add_argument("--concurrency", type=int, default=PROVISION_CONCURRENCY)
+    parser.add_argument(
+        "--rate", type=float, default=0, help="Turnkey requests per second (0: no limit)"
+    )
+    parser.add_argument("--burst", type=int, default=10)
+    args = parser.parse_args(argv)
+
+    with open(args.usernames) as f:
+        usernames = f.read().splitlines()
+
+    service = get_wallet_service()
+    if args.rate > 0:
+        service.rate_limiter = TokenBucket(args.rate, args.burst)
+
+    async def run() -> Dict[str, int]:
+        try:
+            return await provision_accounts(
+                service, usernames, args.results, args.concurrency, print
+            )
+        finally:
+            await service.aclose()
+
+    counts = asyncio.run(run())
+    print(json.dumps(counts))
+
+
+if __name__ == "__main__":
+    main()
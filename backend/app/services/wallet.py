@@ -1,16 +1,61 @@
+import asyncio
+import hashlib
 import json
-from cryptography.hazmat.primitives import hashes
-from cryptography.hazmat.primitives.asymmetric import ec
-from base64 import urlsafe_b64encode
-from fastapi import HTTPException
+import os
+import threading
+import time
 from abc import ABC, abstractmethod
+from base64 import urlsafe_b64encode
+from typing import Any, Coroutine, Dict, List, Optional, Set, Tuple
+
 import httpx
-import time
-import requests
 import xrpl
-from xrpl.clients import JsonRpcClient
-from xrpl.core.binarycodec import encode, decode
-from xrpl.models import Payment
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.asymmetric import ec
+from cryptography.hazmat.primitives.asymmetric.utils import encode_dss_signature
+from fastapi import HTTPException
+from xrpl.asyncio.clients import Client
+from xrpl.core.binarycodec import encode, encode_for_signing
+
+from xrp.services.autofill import Autofiller
+from xrp.services.client import (
+    LoopClients,
+    PooledJsonRpcClient,
+    get_client,
+    rpc_urls,
+)
+from xrp.services.confirmations import ConfirmationTracker, get_tracker
+from xrp.services.ledger_stream import ledger_stream
+
+from .rate_limit import TokenBucket
+from .wallet_resolution import WalletResolution, WalletResolutionCache
+
+
+def _dumps(payload: dict) -> bytes:
+    """Compact request body; the stamp signs exactly these bytes"""
+    return json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode()
+
+
+# Connections kept open to the Turnkey API
+TURNKEY_POOL_SIZE = int(os.getenv("TURNKEY_POOL_SIZE", "20"))
+# Seconds allowed for a Turnkey request, and for opening its connection
+TURNKEY_TIMEOUT = float(os.getenv("TURNKEY_TIMEOUT", "30"))
+TURNKEY_CONNECT_TIMEOUT = float(os.getenv("TURNKEY_CONNECT_TIMEOUT", "5"))
+# Cached username -> sub-org/wallet/address mappings, and how long they are kept
+TURNKEY_RESOLUTION_CACHE_SIZE = int(os.getenv("TURNKEY_RESOLUTION_CACHE_SIZE", "1024"))
+TURNKEY_RESOLUTION_CACHE_TTL = float(os.getenv("TURNKEY_RESOLUTION_CACHE_TTL", "3600"))
+# Turnkey requests per second (0 disables the limit) and the burst allowed above it
+TURNKEY_RATE_LIMIT = float(os.getenv("TURNKEY_RATE_LIMIT", "0"))
+TURNKEY_RATE_BURST = int(os.getenv("TURNKEY_RATE_BURST", "10"))
+
+# Order of the secp256k1 group; XRPL only accepts signatures with s <= n/2
+SECP256K1_ORDER = 0xFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFEBAAEDCE6AF48A03BBFD25E8CD0364141
+
+
+def signing_hash(transaction: dict) -> str:
+    """SHA-512Half of the transaction's signing serialization, as hex"""
+    blob = bytes.fromhex(encode_for_signing(transaction))
+    return hashlib.sha512(blob).digest()[:32].hex()
 
 
 class WalletService(ABC):
@@ -18,228 +63,519 @@ class WalletService(ABC):
         pass
 
     @abstractmethod
-    def create_account(self,username: str) -> str:
+    def create_account(self, username: str):
         pass
 
     @abstractmethod
-    def sign_transaction(self, transaction: dict) -> str:
+    def sign_transaction(self, transaction: dict, username: str):
         pass
 
 
-class TurnkeyService(WalletService):
-    def __init__(self,url:str,api_public_key :str, api_private_key: str,organization_id:str, ripple_url:str):
+class AsyncWalletService(ABC):
+    @abstractmethod
+    async def create_account(self, username: str):
+        pass
+
+    @abstractmethod
+    async def sign_transaction(self, transaction: dict, username: str):
+        pass
+
+
+class AsyncTurnkeyService(AsyncWalletService):
+    """
+    Turnkey wallet service on one pooled httpx.AsyncClient, so the event loop
+    keeps serving other requests while a Turnkey round trip is in flight.
+
+    The pool is created lazily on the running event loop and recreated if
+    used from a different loop. Each username's sub-org, wallet and address
+    are resolved once and cached, so signing needs no lookups on a hit.
+    Fee, Sequence, LastLedgerSequence and NetworkID are filled in locally
+    before signing unless ``autofill=False`` is passed. With ``wait=True``
+    signing returns once the shared confirmation tracker sees the
+    transaction validated.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        api_public_key: str,
+        api_private_key: str,
+        organization_id: str,
+        ripple_url: Optional[str] = None,
+        xrpl_client: Optional[Client] = None,
+        pool_size: int = TURNKEY_POOL_SIZE,
+        timeout: float = TURNKEY_TIMEOUT,
+        connect_timeout: float = TURNKEY_CONNECT_TIMEOUT,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        resolution_cache: Optional[WalletResolutionCache] = None,
+        rate_limiter: Optional[TokenBucket] = None,
+        autofiller: Optional[Autofiller] = None,
+        confirmations: Optional[ConfirmationTracker] = None,
+    ):
         self.url = url
         self.organization_id = organization_id
         self.private_key = ec.derive_private_key(int(api_private_key, 16), ec.SECP256R1())
         self.public_key = api_public_key
-        self.client = JsonRpcClient(ripple_url)
+        self.client = xrpl_client or get_client(ripple_url)
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self._transport = transport
+        self.resolutions = resolution_cache or WalletResolutionCache(
+            max_entries=TURNKEY_RESOLUTION_CACHE_SIZE,
+            ttl=TURNKEY_RESOLUTION_CACHE_TTL,
+        )
+        self.rate_limiter = rate_limiter
+        self.autofiller = autofiller or Autofiller(self.client)
+        self.confirmations = confirmations or get_tracker(self.client)
+        self._clients = LoopClients(
+            lambda: httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=self.pool_size,
+                    max_keepalive_connections=self.pool_size,
+                ),
+                timeout=httpx.Timeout(self.timeout, connect=self.connect_timeout),
+                transport=self._transport,
+            )
+        )
+        self._stamp_prefix = self._encode_stamp_prefix()
 
-    def _stamp(self,payload : dict) -> dict:
-        payload_str = json.dumps(payload)
-        signature = self.private_key.sign(payload_str.encode(), ec.ECDSA(hashes.SHA256()))
+    def _http_client(self) -> httpx.AsyncClient:
+        return self._clients.get()
 
-        stamp = {
-            "publicKey": self.public_key,
-            "scheme": "SIGNATURE_SCHEME_TK_API_P256",
-            "signature": signature.hex(),
-        }
-        encoded_stamp = urlsafe_b64encode(json.dumps(stamp).encode()).decode().rstrip("=")
-        return encoded_stamp
+    async def aclose(self) -> None:
+        await self._clients.aclose()
 
+    def _encode_stamp_prefix(self) -> str:
+        """
+        Base64url of the stamp JSON up to the signature value. Whitespace
+        between the key and its opening quote pads the prefix to a multiple
+        of 3 bytes so its encoding can be reused and the per-call part
+        encoded on its own; the signature string itself stays exact.
+        """
+        prefix = json.dumps(
+            {"publicKey": self.public_key, "scheme": "SIGNATURE_SCHEME_TK_API_P256"}
+        )[:-1] + ', "signature":'
+        prefix += " " * (-(len(prefix.encode()) + 1) % 3) + '"'
+        return urlsafe_b64encode(prefix.encode()).decode()
 
-    def _create_suborg(self, username: str) -> str:
+    def _stamp(self, body: bytes) -> str:
+        signature = self.private_key.sign(body, ec.ECDSA(hashes.SHA256()))
+        suffix = urlsafe_b64encode(f'{signature.hex()}"}}'.encode()).decode()
+        return self._stamp_prefix + suffix.rstrip("=")
 
-       
+    async def _post(self, path: str, payload: dict) -> httpx.Response:
+        # Wait for the rate limiter first so activities are not stamped with
+        # a timestamp that went stale while queued
+        if self.rate_limiter is not None:
+            await self.rate_limiter.acquire()
+        if path.startswith("/submit/"):
+            payload = {**payload, "timestampMs": str(int(time.time() * 1000))}
+        # Serialized once; the stamp signs exactly the bytes that are sent
+        body = _dumps(payload)
+        headers = {
+            "Accept": "application/json",
+            "Content-Type": "application/json",
+            "X-Stamp": self._stamp(body),
+        }
+        return await self._http_client().post(
+            f"{self.url}{path}", headers=headers, content=body
+        )
+
+    async def _create_suborg(self, username: str) -> dict:
         data = {
             "type": "ACTIVITY_TYPE_CREATE_SUB_ORGANIZATION_V4",
-            "timestampMs": str(int(time.time() * 1000)),
             "organizationId": self.organization_id,
             "parameters": {
-            "subOrganizationName": f"{username}-sub-org",
-            "rootUsers": [
-                {
-                "userName": username,
-                "userEmail": "",
-                "authenticators": [],
-                "apiKeys": [
+                "subOrganizationName": f"{username}-sub-org",
+                "rootUsers": [
                     {
-                    "apiKeyName": "organization-api-key",
-                    "publicKey": self.public_key
+                        "userName": username,
+                        "userEmail": "",
+                        "authenticators": [],
+                        "apiKeys": [
+                            {
+                                "apiKeyName": "organization-api-key",
+                                "publicKey": self.public_key,
+                            }
+                        ],
                     }
-                ]
-                }
-            ],
-            "rootQuorumThreshold": 1,
-            "wallet": {
-                "walletName": f"{username}-xrp-wallet",
-                "accounts": [
-                {
-                    "curve": "CURVE_SECP256K1",
-                    "pathFormat": "PATH_FORMAT_BIP32",
-                    "path": "m/44'/144'/0'/0/0",
-                    "addressFormat": "ADDRESS_FORMAT_XRP"
-                }
-                ]
-            }
-            }
-        }
-
-        headers = {
-            "Accept": "application/json",
-            "Content-Type": "application/json",
-            "X-Stamp": self._stamp(data)
+                ],
+                "rootQuorumThreshold": 1,
+                "wallet": {
+                    "walletName": f"{username}-xrp-wallet",
+                    "accounts": [
+                        {
+                            "curve": "CURVE_SECP256K1",
+                            "pathFormat": "PATH_FORMAT_BIP32",
+                            "path": "m/44'/144'/0'/0/0",
+                            "addressFormat": "ADDRESS_FORMAT_XRP",
+                        }
+                    ],
+                },
+            },
         }
 
-        # async with httpx.AsyncClient() as client:
-        #     response = await client.post(f"{self.url}/submit/create_sub_organization", headers=headers, json=data)
-        #     if response.status_code != 200:
-        #         print(response.text)
-        #         raise HTTPException(status_code=500,detail="unable to create wallet")
-        #     data = response.json()
-        #     return data["activity"]["result"]["result"]["createSubOrganizationResultV7"]["wallet"]["addresses"]
-        
-        response = requests.post(f"{self.url}/submit/create_sub_organization", headers=headers, json=data)
+        response = await self._post("/submit/create_sub_organization", data)
         if response.status_code != 200:
             print(response.text)
-            raise HTTPException(status_code=500,detail="unable to create wallet")
-        data = response.json()
-        return data
-    
-    def _get_suborg(self, username: str) -> str | None:
+            raise HTTPException(status_code=500, detail="unable to create wallet")
+        return response.json()
+
+    async def _get_suborg(self, username: str) -> List[str]:
         data = {
             "organizationId": self.organization_id,
             "filterType": "USERNAME",
             "filterValue": username,
         }
 
-        headers = {
-            'Accept': 'application/json',
-            'Content-Type': 'application/json',
-            'X-Stamp': self._stamp(data),
-        }
-
-
-        resp = requests.post(f"{self.url}/query/list_suborgs", headers=headers, json=data)
-        print(resp.text)
-        if resp.status_code == 200:
-            return resp.json()["organizationIds"]
-        else:
+        resp = await self._post("/query/list_suborgs", data)
+        if resp.status_code != 200:
             print(resp.text)
-            raise HTTPException(status_code=404,detail="bad request params")
-        
-    def _whoami(self):
-        payload = {
-            "organizationId": self.organization_id
-        }
-
-        headers = {
-            'Content-Type': 'application/json',
-            'X-Stamp': self._stamp(payload),
-        }
+            raise HTTPException(status_code=404, detail="bad request params")
+        return resp.json()["organizationIds"]
 
-        
-        resp = requests.post(f"{self.url}/query/whoami", headers=headers, json=payload)
+    async def _whoami(self) -> dict:
+        resp = await self._post("/query/whoami", {"organizationId": self.organization_id})
         return resp.json()
 
-    def _sign_raw_payload(self, sign_with: str, payload: str, sub_org:str) -> dict:
+    async def _sign_raw_payload(self, sign_with: str, payload: dict, sub_org: str) -> str:
+        # Turnkey signs the XRPL signing hash as-is (no further hashing)
         data = {
             "type": "ACTIVITY_TYPE_SIGN_RAW_PAYLOAD_V2",
-            "timestampMs": str(int(time.time() * 1000)),
             "organizationId": sub_org,
             "parameters": {
                 "signWith": sign_with,
-                "payload": encode(payload),
+                "payload": signing_hash(payload),
                 "encoding": "PAYLOAD_ENCODING_HEXADECIMAL",
-                "hashFunction": "HASH_FUNCTION_SHA256",
-            }
+                "hashFunction": "HASH_FUNCTION_NO_OP",
+            },
         }
 
-        headers = {
-            "Accept": "application/json",
-            "Content-Type": "application/json",
-            "X-Stamp": self._stamp(data)
-        }
-
-        response = requests.post(f"{self.url}/submit/sign_raw_payload", headers=headers, json=data)
+        response = await self._post("/submit/sign_raw_payload", data)
         if response.status_code != 200:
             print(response.text)
             raise HTTPException(status_code=500, detail="unable to sign payload")
         result = response.json()["activity"]["result"]["signRawPayloadResult"]
-        r = result.get("r")
-        s = result.get("s") 
-        v = result.get("v")
+        return self._signature(result)
+
+    async def _sign_raw_payloads(
+        self, sign_with: str, payloads: List[dict], sub_org: str
+    ) -> List[str]:
+        """Sign several payloads in one activity; signatures keep payload order"""
+        data = {
+            "type": "ACTIVITY_TYPE_SIGN_RAW_PAYLOADS",
+            "organizationId": sub_org,
+            "parameters": {
+                "signWith": sign_with,
+                "payloads": [signing_hash(payload) for payload in payloads],
+                "encoding": "PAYLOAD_ENCODING_HEXADECIMAL",
+                "hashFunction": "HASH_FUNCTION_NO_OP",
+            },
+        }
+
+        response = await self._post("/submit/sign_raw_payloads", data)
+        if response.status_code != 200:
+            print(response.text)
+            raise HTTPException(status_code=500, detail="unable to sign payloads")
+        results = response.json()["activity"]["result"]["signRawPayloadsResult"]
+        signatures = [self._signature(result) for result in results["signatures"]]
+        if len(signatures) != len(payloads):
+            raise HTTPException(status_code=500, detail="signature count mismatch")
+        return signatures
 
-        r_clean = r.replace('0x', '').zfill(64)
-        s_clean = s.replace('0x', '').zfill(64) 
-        if not all([r, s, v]):
+    @staticmethod
+    def _signature(result: dict) -> str:
+        """DER-encoded, low-S TxnSignature from Turnkey's r/s components"""
+        r = result.get("r")
+        s = result.get("s")
+        if not all([r, s]):
             raise ValueError("Missing signature components in response")
 
-        r_clean = r.replace('0x', '').zfill(64)
-        s_clean = s.replace('0x', '').zfill(64)
-        
-        signature = r_clean + s_clean
-        
-        signature.upper()
-                
-    def _get_wallet_address(self, username: str) -> str:
-        sub_orgs = self._get_suborg(username)
+        r_value = int(r.removeprefix("0x"), 16)
+        s_value = int(s.removeprefix("0x"), 16)
+        if s_value > SECP256K1_ORDER // 2:
+            s_value = SECP256K1_ORDER - s_value
+        return encode_dss_signature(r_value, s_value).hex().upper()
+
+    async def _resolve_wallet(self, username: str) -> WalletResolution:
+        sub_orgs = await self._get_suborg(username)
         if not sub_orgs:
             raise HTTPException(status_code=404, detail="Sub-organization not found")
-        
+
         sub_org_id = sub_orgs[0]
         payload = {
             "organizationId": sub_org_id,
             "filterType": "NAME",
             "filterValue": f"{username}-xrp-wallet",
         }
-        headers = {
-            'Accept': 'application/json',
-            'Content-Type': 'application/json',
-            'X-Stamp': self._stamp(payload),
-        }
-        resp = requests.post(f"{self.url}/query/list_wallets", headers=headers, json=payload)
+        resp = await self._post("/query/list_wallets", payload)
         if resp.status_code != 200:
             print(resp.text)
             raise HTTPException(status_code=404, detail="bad request params")
         data = resp.json()
-        print(data)
         if not data["wallets"]:
             raise HTTPException(status_code=404, detail="Wallet not found")
-        wallet_id =  data["wallets"][0]["walletId"]
+
+        return await self._wallet_account(sub_org_id, data["wallets"][0]["walletId"])
+
+    async def _wallet_account(self, sub_org_id: str, wallet_id: str) -> WalletResolution:
+        """The wallet's XRP account: its address and signing public key"""
         payload = {
             "walletId": wallet_id,
             "organizationId": sub_org_id,
         }
-        headers = {
-            'Accept': 'application/json',
-            'Content-Type': 'application/json',
-            'X-Stamp': self._stamp(payload),
-        }
-        resp = requests.post(f"{self.url}/query/get_wallet", headers=headers, json=payload) 
+        resp = await self._post("/query/list_wallet_accounts", payload)
         if resp.status_code != 200:
             print(resp.text)
             raise HTTPException(status_code=404, detail="bad request params")
-        data = resp.json()
-        print(data)
-        if not data["wallet"]["addresses"]:
+        accounts = resp.json()["accounts"]
+        account = next(
+            (a for a in accounts if a.get("addressFormat") == "ADDRESS_FORMAT_XRP"),
+            accounts[0] if accounts else None,
+        )
+        if account is None:
             raise HTTPException(status_code=404, detail="No addresses found for wallet")
-        return data
+        return WalletResolution(
+            sub_org_id, wallet_id, account["address"], account["publicKey"].upper()
+        )
+
+    async def resolve_wallet(self, username: str) -> WalletResolution:
+        return await self.resolutions.get(username, self._resolve_wallet)
+
+    async def _get_wallet_address(self, username: str) -> str:
+        return (await self.resolve_wallet(username)).address
+
+    @staticmethod
+    def created_wallet(data: dict) -> Optional[WalletResolution]:
+        """The sub-org and wallet in a create_sub_organization result, if present"""
+        results = data.get("activity", {}).get("result", {})
+        result = next(
+            (v for k, v in results.items() if k.startswith("createSubOrganizationResult")),
+            None,
+        )
+        wallet = (result or {}).get("wallet") or {}
+        if not (result and wallet.get("walletId") and wallet.get("addresses")):
+            return None
+        return WalletResolution(
+            result["subOrganizationId"], wallet["walletId"], wallet["addresses"][0]
+        )
 
-    def create_account(self,username:str) -> str:
-        result = self._get_suborg(username)
+    async def create_account(self, username: str):
+        result = await self._get_suborg(username)
         if len(result) == 0:
-            return self._create_suborg(username)
-        else:
-            return result
-
-    
-    def sign_transaction(self,transaction: dict,username: str) -> bool:
-        signature = self._sign_raw_payload(self._get_wallet_address(username),transaction, self._get_suborg(username)[0])
-        if not signature:
-            raise HTTPException(status_code=500, detail="Failed to sign transaction")
+            data = await self._create_suborg(username)
+            created = self.created_wallet(data)
+            if created is not None:
+                self.resolutions.put(
+                    username,
+                    await self._wallet_account(created.sub_org_id, created.wallet_id),
+                )
+            return data
+        return result
+
+    async def _prepare(
+        self, transaction: dict, wallet: WalletResolution, autofill: bool
+    ) -> Tuple[dict, Optional[Dict[str, int]]]:
+        # SigningPubKey is part of the signed serialization
+        transaction = {**transaction, "SigningPubKey": wallet.public_key}
+        if not autofill:
+            return transaction, None
+        return await self.autofiller.fill({"Account": wallet.address, **transaction})
+
+    def _release(self, transaction: dict, lease: Optional[Dict[str, int]], result: str) -> None:
+        self.autofiller.release(transaction["Account"], lease, result)
+
+    async def sign_transaction(
+        self, transaction: dict, username: str, autofill: bool = True, wait: bool = False
+    ):
+        wallet = await self.resolve_wallet(username)
+        transaction, lease = await self._prepare(transaction, wallet, autofill)
+        try:
+            signature = await self._sign_raw_payload(
+                wallet.address, transaction, wallet.sub_org_id
+            )
+        except BaseException as e:
+            if isinstance(e, HTTPException):
+                # The cached mapping may be stale; look it up again next time
+                self.resolutions.invalidate(username)
+            # Nothing was submitted, so the sequence goes back unused
+            self._release(transaction, lease, "")
+            raise
+        return await self._submit_signed(transaction, signature, lease, wait)
+
+    async def sign_transactions(
+        self,
+        transactions: List[dict],
+        username: str,
+        autofill: bool = True,
+        wait: bool = False,
+    ):
+        """
+        Sign many transactions in one Turnkey activity, then submit the signed
+        blobs one at a time in Sequence order so none reaches rippled ahead of
+        its predecessor. Responses are returned in transaction order.
+        """
+        if not transactions:
+            return []
+        wallet = await self.resolve_wallet(username)
+        prepared: List[Tuple[dict, Optional[Dict[str, int]]]] = []
+        # Leases not yet handed to _submit; released if anything fails
+        unsubmitted: Set[int] = set()
+        try:
+            for transaction in transactions:
+                prepared.append(await self._prepare(transaction, wallet, autofill))
+                unsubmitted.add(len(prepared) - 1)
+            try:
+                signatures = await self._sign_raw_payloads(
+                    wallet.address, [tx for tx, _ in prepared], wallet.sub_org_id
+                )
+            except HTTPException:
+                self.resolutions.invalidate(username)
+                raise
+            responses = [None] * len(prepared)
+            for i in sorted(unsubmitted, key=lambda i: prepared[i][0].get("Sequence", 0)):
+                transaction, lease = prepared[i]
+                unsubmitted.discard(i)
+                responses[i] = await self._submit(transaction, signatures[i], lease)
+        finally:
+            for i in unsubmitted:
+                self._release(*prepared[i], "")
+        return await asyncio.gather(
+            *(
+                self._confirm(transaction, response, wait)
+                for (transaction, _), response in zip(prepared, responses)
+            )
+        )
+
+    async def _submit_signed(
+        self,
+        transaction: dict,
+        signature: str,
+        lease: Optional[Dict[str, int]] = None,
+        wait: bool = False,
+    ):
+        response = await self._submit(transaction, signature, lease)
+        return await self._confirm(transaction, response, wait)
+
+    async def _submit(
+        self, transaction: dict, signature: str, lease: Optional[Dict[str, int]]
+    ):
+        """Submit a signed transaction and hand its lease back"""
         signed_transaction = {
             **transaction,
             "TxnSignature": signature,
         }
-        response = self.client.request(xrpl.models.requests.SubmitOnly(tx_blob=encode(signed_transaction)))
-        return response
\ No newline at end of file
+        try:
+            response = await self.client.request(
+                xrpl.models.requests.SubmitOnly(tx_blob=encode(signed_transaction))
+            )
+        except Exception:
+            self._release(transaction, lease, "")
+            raise
+        self._release(transaction, lease, response.result.get("engine_result", ""))
+        return response
+
+    async def _confirm(self, transaction: dict, response, wait: bool):
+        prelim = response.result.get("engine_result", "")
+        if not wait or prelim.startswith(("tem", "tef", "tel")):
+            return response
+        if "LastLedgerSequence" not in transaction:
+            raise HTTPException(
+                status_code=400,
+                detail="LastLedgerSequence is required to wait for validation",
+            )
+        return await self.confirmations.wait(
+            response.result["tx_json"]["hash"], transaction["LastLedgerSequence"]
+        )
+
+
+class TurnkeyService(WalletService):
+    """
+    Blocking facade over AsyncTurnkeyService for scripts. Calls run on a
+    private event loop thread so pooled connections survive between calls.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        api_public_key: str,
+        api_private_key: str,
+        organization_id: str,
+        ripple_url: str,
+        **options: Any,
+    ):
+        options.setdefault(
+            "xrpl_client", PooledJsonRpcClient(ripple_url or rpc_urls())
+        )
+        self.service = AsyncTurnkeyService(
+            url, api_public_key, api_private_key, organization_id, **options
+        )
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _run(self, coro: Coroutine) -> Any:
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, daemon=True).start()
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+
+    def create_account(self, username: str):
+        return self._run(self.service.create_account(username))
+
+    def sign_transaction(
+        self, transaction: dict, username: str, autofill: bool = True, wait: bool = False
+    ):
+        return self._run(
+            self.service.sign_transaction(transaction, username, autofill, wait)
+        )
+
+    def sign_transactions(
+        self,
+        transactions: List[dict],
+        username: str,
+        autofill: bool = True,
+        wait: bool = False,
+    ):
+        return self._run(
+            self.service.sign_transactions(transactions, username, autofill, wait)
+        )
+
+    def close(self) -> None:
+        if self._loop is None:
+            return
+        self._run(self.service.aclose())
+        if isinstance(self.service.client, PooledJsonRpcClient):
+            self._run(self.service.client.aclose())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._loop = None
+
+
+_services: Dict[str, AsyncTurnkeyService] = {}
+
+
+def get_wallet_service() -> AsyncTurnkeyService:
+    """Shared async Turnkey service configured from the TURNKEY_* environment"""
+    if "turnkey" not in _services:
+        service = _services["turnkey"] = AsyncTurnkeyService(
+            url=os.getenv("TURNKEY_URL"),
+            api_public_key=os.getenv("TURNKEY_PUBLIC_KEY"),
+            api_private_key=os.getenv("TURNKEY_PRIVATE_KEY"),
+            organization_id=os.getenv("TURNKEY_ORGANIZATION_ID"),
+            ripple_url=os.getenv("RIPPLE_TESTNET_URL"),
+            rate_limiter=(
+                TokenBucket(TURNKEY_RATE_LIMIT, TURNKEY_RATE_BURST)
+                if TURNKEY_RATE_LIMIT > 0
+                else None
+            ),
+        )
+        # Pushed ledgers keep LastLedgerSequence current between fee refreshes
+        ledger_stream.on_ledger(service.autofiller.note_validated_ledger)
+    return _services["turnkey"]
+
+
+async def close_wallet_services() -> None:
+    """Close pooled Turnkey connections; called from the app lifespan"""
+    for service in _services.values():
+        await service.aclose()
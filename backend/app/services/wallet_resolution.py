@@ -0,0 +1,64 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, NamedTuple, Optional, Tuple
+
+
+class WalletResolution(NamedTuple):
+    sub_org_id: str
+    wallet_id: str
+    address: str
+    # Compressed secp256k1 key, the SigningPubKey of every transaction
+    public_key: Optional[str] = None
+
+
+class WalletResolutionCache:
+    """
+    Bounded username -> (sub-org id, wallet id, address) cache with TTL and
+    LRU eviction.
+
+    The mapping is fixed once a user's sub-organization exists, so it only
+    needs to be looked up on Turnkey once. Concurrent misses for the same
+    username share a single lookup.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 3600.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, WalletResolution]]" = OrderedDict()
+        self._pending: Dict[str, asyncio.Future] = {}
+
+    def put(self, username: str, resolution: WalletResolution) -> None:
+        self._entries[username] = (time.monotonic(), resolution)
+        self._entries.move_to_end(username)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, username: str) -> None:
+        self._entries.pop(username, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    async def get(
+        self,
+        username: str,
+        resolve: Callable[[str], Awaitable[WalletResolution]],
+    ) -> WalletResolution:
+        entry = self._entries.get(username)
+        if entry is not None and time.monotonic() - entry[0] < self.ttl:
+            self._entries.move_to_end(username)
+            return entry[1]
+
+        pending = self._pending.get(username)
+        if pending is None:
+            pending = asyncio.ensure_future(resolve(username))
+            self._pending[username] = pending
+            pending.add_done_callback(lambda f: self._settle(username, f))
+        return await asyncio.shield(pending)
+
+    def _settle(self, username: str, future: asyncio.Future) -> None:
+        if self._pending.get(username) is future:
+            del self._pending[username]
+        if not future.cancelled() and future.exception() is None:
+            self.put(username, future.result())
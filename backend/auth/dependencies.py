@@ -0,0 +1,36 @@
+import os
+from typing import Optional
+
+from fastapi import Depends, HTTPException, status
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+
+from auth.services.token_cache import token_cache
+
+bearer_scheme = HTTPBearer(auto_error=False)
+
+# Comma-separated DIDs allowed to run operator routes such as bulk provisioning
+ADMIN_DIDS = {did.strip() for did in os.getenv("ADMIN_DIDS", "").split(",") if did.strip()}
+
+
+async def require_token(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(bearer_scheme),
+) -> dict:
+    """Claims of the request's bearer token; 401 if it is missing, invalid or expired"""
+    claims = token_cache.verify(credentials.credentials) if credentials else None
+    if claims is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or expired token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return claims
+
+
+async def require_admin(claims: dict = Depends(require_token)) -> dict:
+    """Claims of a bearer token whose DID is listed in ADMIN_DIDS; 403 otherwise"""
+    if claims.get("sub") not in ADMIN_DIDS:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Operator access required",
+        )
+    return claims
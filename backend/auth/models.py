@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import List, Optional
 
 class DIDDocument(BaseModel):
     id: str = Field(..., description="Full DID URI, e.g. did:xrpl:test:<classic_address>")
@@ -11,6 +11,10 @@ class DIDCreateRequest(BaseModel):
     seed: Optional[str] = None
 
 
+class DIDResolveRequest(BaseModel):
+    dids: List[str]
+
+
 class ChallengeRequest(BaseModel):
     did: str
 
@@ -19,6 +23,9 @@ class AuthPayload(BaseModel):
     challenge: str
     signature: str
 
+class BatchAuthPayload(BaseModel):
+    items: List[AuthPayload]
+
 class LoginRequest(BaseModel):
     did: str
     signature: str  # hex-encoded signature over the nonce
\ No newline at end of file
@@ -1,75 +1,41 @@
-import secrets
-import json
-import base64
+import asyncio
+import os
 from fastapi import HTTPException, APIRouter
-from xrpl.asyncio.clients import AsyncJsonRpcClient
-from xrpl.core.keypairs import is_valid_message
-from xrpl.models.requests import AccountObjects
 
-from db.db import supabase_client
-from auth.xrpl import xrpl_client
-from auth.models import ChallengeRequest, AuthPayload
+from auth.models import ChallengeRequest, AuthPayload, BatchAuthPayload
 from auth.services.jwt import create_access_token
-from auth.services.ipfs import retrieve_from_ipfs
+from auth.services.did_cache import did_cache
+from auth.services.nonce_store import nonce_store
+from auth.services.signatures import decode_signature, signature_verifier
 
+# Most logins accepted by one /auth/verify-batch call
+AUTH_BATCH_MAX = int(os.getenv("AUTH_BATCH_MAX", "100"))
 
 
 authentication_router = r = APIRouter()
 
 @r.post("/request-challenge")
-def request_challenge(req: ChallengeRequest):
-    nonce = secrets.token_hex(16)
-    supabase_client.table("login_nonces").insert({"did": req.did, "nonce": nonce}).execute()
+async def request_challenge(req: ChallengeRequest):
+    nonce = await nonce_store.issue(req.did)
     return {"challenge": nonce}
 
 
-@r.post("/verify")
-async def verify_auth(p: AuthPayload):
-    """Verify the client-signed challenge, using their on-chain DID doc."""
-    # 1. Check we issued that challenge
-    expected = supabase_client.table("login_nonces").select("nonce").eq("did", p.did).limit(1).execute()
-    if not expected or expected.data[0]["nonce"] != p.challenge:
+async def _authenticate(p: AuthPayload) -> dict:
+    # 1. Check we issued that challenge, using it up so it cannot be replayed
+    if not await nonce_store.consume(p.did, p.challenge):
         raise HTTPException(400, "Invalid or missing challenge")
-    #supabase_client.table("login_nonces").delete().eq("did", p.did).execute()  # Clean up the nonce
-
-    # 2. Resolve the DID Document on XRPL
-    #    DID format: did:xrp:<classicAddress>
-    classic_addr = p.did.split(":")[-1]
-    resp = await xrpl_client.request(
-        AccountObjects(
-            account=classic_addr
-        )
-    )
 
-    objs = resp.result.get("account_objects", [])
-    # Filter for the XRPL DID ledger entry
-    did_obj = next((o for o in objs if o["LedgerEntryType"] == "DID"), None)
-    if not did_obj:
-        raise HTTPException(status_code=404, detail="DID Document not found on ledger")  # :contentReference[oaicite:0]{index=0}
-
-    # 4. Extract and parse the DIDDocument field (or fallback to implicit publicKey)
-    hex_uri = did_obj.get("URI")
-    ipfs_uri = bytes.fromhex(hex_uri).decode("utf-8")
-    did_doc = retrieve_from_ipfs(ipfs_uri)
-
-    # Pick the first verification method
-    vm = did_doc["verificationMethod"][0]
-    pubkey = vm.get("publicKeyHex") or vm.get("publicKeyBase58")
-    if not pubkey:
-        raise HTTPException(status_code=500, detail="No supported public key in DID Document")  # :contentReference[oaicite:1]{index=1}
-    
-    # 5. Verify the signature over the challenge
-    message = p.challenge.encode("utf-8").hex()
-    message_bytes = bytes.fromhex(message)
-    
+    # 2-4. Resolve the DID Document (ledger URI + IPFS), cached per DID
+    resolution = await did_cache.resolve(p.did)
+    pubkey = resolution.public_key
+
+    # 5. Verify the signature over the challenge, off the event loop
     try:
-        # if hexdigest
-        sig_bytes = bytes.fromhex(p.signature)
+        sig_bytes = decode_signature(p.signature)
     except ValueError:
-        # otherwise assume Base64
-        sig_bytes = base64.b64decode(p.signature)
+        raise HTTPException(status_code=400, detail="Malformed signature")
 
-    valid = is_valid_message(message=message_bytes, signature=sig_bytes, public_key=pubkey)
+    valid = await signature_verifier.verify(p.challenge.encode("utf-8"), sig_bytes, pubkey)
 
     if not valid:
         raise HTTPException(status_code=401, detail="Signature verification failed")
@@ -77,3 +43,37 @@ async def verify_auth(p: AuthPayload):
     # 6. Issue a JWT for the authenticated DID
     token = create_access_token(data={"sub": p.did})
     return {"access_token": token, "token_type": "bearer"}
+
+
+@r.post("/verify")
+async def verify_auth(p: AuthPayload):
+    """Verify the client-signed challenge, using their on-chain DID doc."""
+    return await _authenticate(p)
+
+
+@r.post("/verify-batch")
+async def verify_auth_batch(batch: BatchAuthPayload):
+    """
+    Verify many signed challenges at once; signatures are checked in parallel
+    across the verification pool. Each item gets a token or its own error.
+    """
+    if len(batch.items) > AUTH_BATCH_MAX:
+        raise HTTPException(
+            status_code=413, detail=f"At most {AUTH_BATCH_MAX} logins per batch"
+        )
+
+    outcomes = await asyncio.gather(
+        *(_authenticate(p) for p in batch.items), return_exceptions=True
+    )
+    results = []
+    for p, outcome in zip(batch.items, outcomes):
+        if isinstance(outcome, HTTPException):
+            results.append(
+                {"did": p.did, "status_code": outcome.status_code, "detail": outcome.detail}
+            )
+        elif isinstance(outcome, Exception):
+            print(f"Error verifying {p.did}: {outcome}")
+            results.append({"did": p.did, "status_code": 500, "detail": "Verification failed"})
+        else:
+            results.append({"did": p.did, **outcome})
+    return {"results": results}
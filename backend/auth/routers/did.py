@@ -1,26 +1,34 @@
+import asyncio
 from fastapi import APIRouter, HTTPException, status
 from xrpl.asyncio.transaction import autofill_and_sign, submit
 from xrpl.models.transactions import DIDSet
-from xrpl.asyncio.wallet import generate_faucet_wallet
 import os
+from auth.models import DIDResolveRequest
+from auth.services.did_cache import did_cache
 from auth.services.ipfs import store_in_ipfs
-from db.db import supabase_client
+from auth.services.wallet_pool import wallet_pool
+from db.db import postgrest, write_behind
 from auth.xrpl import xrpl_client 
 
 # Load environment variables
 NETWORK = os.getenv("XRPL_NETWORK")
+# Most DIDs accepted by one /did/resolve call, and how many resolve at once
+DID_RESOLVE_MAX = int(os.getenv("DID_RESOLVE_MAX", "500"))
+DID_RESOLVE_CONCURRENCY = int(os.getenv("DID_RESOLVE_CONCURRENCY", "32"))
 
 did_router = r = APIRouter()
 
 @r.post("", status_code=status.HTTP_201_CREATED)
 async def create_did():
-    wallet = await generate_faucet_wallet(xrpl_client)
+    # Funded ahead of time by the pool; falls back to the faucet when it is empty
+    wallet = await wallet_pool.take()
 
-    supabase_client.table("wallets").insert({
+    # Holds the seed, so the request waits for it to be stored
+    await postgrest.insert("wallets", [{
         "classic_address": wallet.classic_address,
         "public_key": wallet.public_key,
         "seed": wallet.seed
-    }).execute()
+    }])
 
     did = f"did:xrpl:{NETWORK}:{wallet.classic_address}"
     did_doc = {
@@ -34,7 +42,7 @@ async def create_did():
         }]
     }
 
-    ipfs_uri = store_in_ipfs(did_doc)
+    ipfs_uri = await store_in_ipfs(did_doc)
     uri_hex  = ipfs_uri.encode("utf-8").hex()
 
     # Build transaction
@@ -45,9 +53,41 @@ async def create_did():
     # Sign and submit
     signed = await autofill_and_sign(tx, xrpl_client, wallet)
     resp = await submit(signed, xrpl_client)
+    did_cache.invalidate(wallet.classic_address)
 
     if resp.result.get("engine_result") != "tesSUCCESS":
         raise HTTPException(400, detail=resp.result)
-    
+
+    # Registering the DID is bookkeeping; the caller does not wait for it
+    await write_behind.put("users", {"did": did}, on_conflict="did")
+
     # brand new wallet—return the seed so the client can back it up
-    return {"result": resp.result, "did": did, "wallet_seed": wallet.seed}
\ No newline at end of file
+    return {"result": resp.result, "did": did, "wallet_seed": wallet.seed}
+
+
+@r.post("/resolve")
+async def resolve_dids(req: DIDResolveRequest):
+    """Resolve many DIDs concurrently; each gets its document key or its own error."""
+    if len(req.dids) > DID_RESOLVE_MAX:
+        raise HTTPException(413, detail=f"At most {DID_RESOLVE_MAX} DIDs per request")
+
+    semaphore = asyncio.Semaphore(DID_RESOLVE_CONCURRENCY)
+
+    async def resolve(did: str) -> dict:
+        try:
+            async with semaphore:
+                resolution = await did_cache.resolve(did)
+        except HTTPException as e:
+            return {"did": did, "status_code": e.status_code, "detail": e.detail}
+        except Exception as e:
+            print(f"Error resolving {did}: {e}")
+            return {"did": did, "status_code": 502, "detail": "Resolution failed"}
+        return {
+            "did": did,
+            "address": resolution.address,
+            "uri": resolution.uri,
+            "verification_method": resolution.verification_method,
+            "public_key": resolution.public_key,
+        }
+
+    return {"results": await asyncio.gather(*(resolve(did) for did in req.dids))}
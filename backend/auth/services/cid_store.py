@@ -0,0 +1,191 @@
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from base64 import b32decode
+from typing import Optional
+
+BASE58_ALPHABET = "123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz"
+# Multicodec codes of the CIDs we can check
+SHA2_256 = 0x12
+RAW = 0x55
+DAG_PB = 0x70
+
+
+def _varint(data: bytes, offset: int = 0):
+    value = shift = 0
+    while True:
+        byte = data[offset]
+        value |= (byte & 0x7F) << shift
+        offset += 1
+        if not byte & 0x80:
+            return value, offset
+        shift += 7
+
+
+def _encode_varint(value: int) -> bytes:
+    out = bytearray()
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+
+def _field(number: int, payload: bytes) -> bytes:
+    """Length-delimited protobuf field"""
+    return _encode_varint(number << 3 | 2) + _encode_varint(len(payload)) + payload
+
+
+def _unixfs_file_node(data: bytes) -> bytes:
+    """dag-pb leaf node of a single-chunk UnixFS file, as ``ipfs add`` writes it"""
+    unixfs = b"\x08\x02" + _field(2, data) + b"\x18" + _encode_varint(len(data))
+    return _field(1, unixfs)
+
+
+def _decode_cid(cid: str):
+    """(codec, multihash) of a CIDv0 or base32 CIDv1; ValueError otherwise"""
+    if cid.startswith("Qm") and len(cid) == 46:
+        number = 0
+        for char in cid:
+            number = number * 58 + BASE58_ALPHABET.index(char)
+        return DAG_PB, number.to_bytes(34, "big")
+    if cid.startswith("b"):
+        body = cid[1:].upper()
+        raw = b32decode(body + "=" * (-len(body) % 8))
+        version, offset = _varint(raw)
+        if version != 1:
+            raise ValueError(f"Unsupported CID version {version}")
+        codec, offset = _varint(raw, offset)
+        return codec, raw[offset:]
+    raise ValueError(f"Unsupported CID encoding: {cid}")
+
+
+def verify_cid(cid: str, data: bytes) -> Optional[bool]:
+    """
+    Whether ``data`` is the content ``cid`` addresses: sha2-256 CIDs over raw
+    bytes or a single-chunk dag-pb file. None when the CID cannot be checked.
+    """
+    try:
+        codec, multihash = _decode_cid(cid)
+    except (ValueError, IndexError):
+        return None
+    if multihash[:2] != bytes([SHA2_256, 32]) or len(multihash) != 34:
+        return None
+    if codec == RAW:
+        block = data
+    elif codec == DAG_PB:
+        block = _unixfs_file_node(data)
+    else:
+        return None
+    return hashlib.sha256(block).digest() == multihash[2:]
+
+
+class CIDStore:
+    """
+    Persistent content-addressed store for IPFS documents, in one SQLite file.
+
+    Content under a CID never changes, so a document fetched or pinned once
+    can be served locally from then on, across restarts and gateway outages.
+    Callers only put documents they pinned themselves or that passed
+    ``verify_cid``.
+    Each blob is stored with its SHA-256 and checked on every read; a blob
+    that no longer matches is dropped and treated as a miss. Once the stored
+    blobs exceed ``max_bytes`` the least recently read are evicted.
+
+    SQLite calls run in a worker thread so the event loop is never blocked.
+    The file is opened on first use.
+    """
+
+    def __init__(self, path: str, max_bytes: int = 64 * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    @property
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = self._open()
+        return self._conn
+
+    def _open(self) -> sqlite3.Connection:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        db = sqlite3.connect(self.path, check_same_thread=False)
+        with db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS blobs ("
+                " cid TEXT PRIMARY KEY,"
+                " data BLOB NOT NULL,"
+                " sha256 TEXT NOT NULL,"
+                " size INTEGER NOT NULL,"
+                " last_used REAL NOT NULL)"
+            )
+            db.execute("CREATE INDEX IF NOT EXISTS blobs_last_used ON blobs (last_used)")
+        return db
+
+    async def get(self, cid: str) -> Optional[dict]:
+        return await asyncio.to_thread(self.get_sync, cid)
+
+    async def put(self, cid: str, document: dict) -> None:
+        await asyncio.to_thread(self.put_sync, cid, document)
+
+    def get_sync(self, cid: str) -> Optional[dict]:
+        with self._lock, self._db:
+            row = self._db.execute(
+                "SELECT data, sha256 FROM blobs WHERE cid = ?", (cid,)
+            ).fetchone()
+            if row is None:
+                return None
+            data, digest = row
+            if hashlib.sha256(data).hexdigest() != digest:
+                print(f"Dropping corrupted IPFS cache entry {cid}")
+                self._db.execute("DELETE FROM blobs WHERE cid = ?", (cid,))
+                return None
+            self._db.execute(
+                "UPDATE blobs SET last_used = ? WHERE cid = ?", (time.time(), cid)
+            )
+        return json.loads(data)
+
+    def put_sync(self, cid: str, document: dict) -> None:
+        data = json.dumps(document, separators=(",", ":"), sort_keys=True).encode()
+        if len(data) > self.max_bytes:
+            return
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO blobs (cid, data, sha256, size, last_used)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (cid, data, hashlib.sha256(data).hexdigest(), len(data), time.time()),
+            )
+            self._evict()
+
+    def size(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def _evict(self) -> None:
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for cid, size in self._db.execute(
+            "SELECT cid, size FROM blobs ORDER BY last_used"
+        ).fetchall():
+            self._db.execute("DELETE FROM blobs WHERE cid = ?", (cid,))
+            total -= size
+            if total <= self.max_bytes:
+                break
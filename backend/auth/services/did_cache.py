@@ -0,0 +1,137 @@
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Set, Tuple
+
+from xrpl.asyncio.clients import Client
+from xrpl.core.addresscodec import is_valid_classic_address
+
+from auth.services.did_resolver import DIDResolution, resolve_did
+from auth.services.ipfs import retrieve_from_ipfs
+from auth.xrpl import xrpl_client
+from xrp.services.ledger_stream import ledger_stream
+
+# Seconds a resolved DID is trusted when DIDSet updates cannot be observed
+DID_CACHE_TTL = float(os.getenv("DID_CACHE_TTL", "60"))
+# Seconds a resolved DID is kept while its account is on the ledger subscription
+DID_CACHE_MAX_AGE = float(os.getenv("DID_CACHE_MAX_AGE", "3600"))
+DID_CACHE_SIZE = int(os.getenv("DID_CACHE_SIZE", "1024"))
+# Accounts this cache adds to the ledger subscription; DIDs past the cap use the TTL
+DID_CACHE_MAX_TRACKED = int(os.getenv("DID_CACHE_MAX_TRACKED", "1000"))
+
+# Transactions that change or remove an account's DID ledger entry
+DID_TRANSACTION_TYPES = {"DIDSet", "DIDDelete"}
+
+
+class DIDCache:
+    """
+    DID -> (ledger URI, verification method, public key) cache, so repeat
+    logins skip the DID ledger entry lookup and the IPFS fetch.
+
+    Accounts whose DID resolved are added to the ledger subscription, up to
+    ``max_tracked`` of them; once rippled has acknowledged an account's
+    subscription, and while it stays live, its entries are kept for ``max_age``
+    and dropped as soon as the account sends a DIDSet or DIDDelete. Otherwise
+    entries expire after the short ``ttl``. Updates sent while the stream is
+    down are never seen, so tracked entries are dropped on disconnect.
+    Concurrent misses for the same DID share one resolution.
+    """
+
+    def __init__(
+        self,
+        client: Client,
+        retrieve: Callable[[str], Awaitable[dict]] = retrieve_from_ipfs,
+        ttl: float = DID_CACHE_TTL,
+        max_age: float = DID_CACHE_MAX_AGE,
+        max_entries: int = DID_CACHE_SIZE,
+        max_tracked: int = DID_CACHE_MAX_TRACKED,
+        stream=None,
+    ):
+        self.client = client
+        self.retrieve = retrieve
+        self.ttl = ttl
+        self.max_age = max_age
+        self.max_entries = max_entries
+        self.max_tracked = max_tracked
+        self.stream = stream
+        self._tracked: Set[str] = set()
+        # did -> (stored at, resolution, account subscribed when stored)
+        self._entries: "OrderedDict[str, Tuple[float, DIDResolution, bool]]" = OrderedDict()
+        self._pending: Dict[str, asyncio.Future] = {}
+
+    def invalidate(self, address: str) -> None:
+        """Drop every DID resolved from an account"""
+        for did in [d for d, (_, r, _) in self._entries.items() if r.address == address]:
+            del self._entries[did]
+
+    def on_connection(self, connected: bool) -> None:
+        if connected:
+            return
+        # Entries kept fresh by the subscription can no longer be trusted
+        for did in [d for d, (_, r, _) in self._entries.items() if r.address in self._tracked]:
+            del self._entries[did]
+
+    def on_transaction(self, message: Dict[str, Any]) -> None:
+        tx = message.get("transaction") or message.get("tx_json") or {}
+        if tx.get("TransactionType") in DID_TRANSACTION_TYPES:
+            self.invalidate(tx.get("Account"))
+
+    async def resolve(self, did: str) -> DIDResolution:
+        entry = self._entries.get(did)
+        if entry is not None and self._fresh(entry):
+            self._entries.move_to_end(did)
+            return entry[1]
+
+        pending = self._pending.get(did)
+        if pending is None:
+            pending = asyncio.ensure_future(self._resolve(did))
+            self._pending[did] = pending
+            pending.add_done_callback(lambda f: self._settle(did, f))
+        return await asyncio.shield(pending)
+
+    def _fresh(self, entry: Tuple[float, DIDResolution, bool]) -> bool:
+        # An entry stored before the subscription was acknowledged may have
+        # missed an update, so it only gets the short TTL
+        tracked = entry[2] and self._is_tracking(entry[1].address)
+        return time.monotonic() - entry[0] < (self.max_age if tracked else self.ttl)
+
+    def _settle(self, did: str, future: asyncio.Future) -> None:
+        if self._pending.get(did) is future:
+            del self._pending[did]
+        if future.cancelled() or future.exception() is not None:
+            return
+        resolution = future.result()
+        self._entries[did] = (
+            time.monotonic(),
+            resolution,
+            self._is_tracking(resolution.address),
+        )
+        self._entries.move_to_end(did)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _is_tracking(self, address: str) -> bool:
+        return self.stream is not None and self.stream.is_tracking(address)
+
+    async def _resolve(self, did: str) -> DIDResolution:
+        resolution = await resolve_did(self.client, did, self.retrieve)
+        self._track(resolution.address)
+        return resolution
+
+    def _track(self, address: str) -> None:
+        # Only well-formed accounts, so one bad DID cannot break the resubscribe
+        if (
+            self.stream is None
+            or address in self._tracked
+            or len(self._tracked) >= self.max_tracked
+            or not is_valid_classic_address(address)
+        ):
+            return
+        self._tracked.add(address)
+        self.stream.track([address])
+
+
+did_cache = DIDCache(xrpl_client, stream=ledger_stream)
+ledger_stream.on_transaction(did_cache.on_transaction)
+ledger_stream.on_connection(did_cache.on_connection)
@@ -0,0 +1,66 @@
+from typing import Any, Awaitable, Callable, Dict, NamedTuple, Optional
+
+from fastapi import HTTPException
+from xrpl.asyncio.clients import Client
+from xrpl.core.addresscodec import is_valid_classic_address
+from xrpl.models.requests import AccountObjects, AccountObjectType, LedgerEntry
+
+# Errors meaning the account or its DID entry simply does not exist
+NOT_FOUND_ERRORS = {"entryNotFound", "actNotFound"}
+
+
+class DIDResolution(NamedTuple):
+    address: str
+    uri: str
+    verification_method: Dict[str, Any]
+    public_key: str
+
+
+def did_address(did: str) -> str:
+    # DID format: did:xrpl:<network>:<classicAddress>
+    return did.split(":")[-1]
+
+
+async def fetch_did_entry(client: Client, address: str) -> Optional[Dict[str, Any]]:
+    """
+    The account's DID ledger entry, or None if it has none. Looked up directly
+    with ledger_entry; servers that reject the ``did`` selector get a
+    DID-filtered AccountObjects instead, which never returns other objects.
+    """
+    resp = await client.request(LedgerEntry(did=address, ledger_index="validated"))
+    if resp.is_successful():
+        return resp.result["node"]
+    if resp.result.get("error") in NOT_FOUND_ERRORS:
+        return None
+
+    resp = await client.request(
+        AccountObjects(account=address, type=AccountObjectType.DID, ledger_index="validated")
+    )
+    if resp.is_successful():
+        objs = resp.result.get("account_objects", [])
+        return objs[0] if objs else None
+    if resp.result.get("error") in NOT_FOUND_ERRORS:
+        return None
+    raise HTTPException(status_code=502, detail=f"DID lookup failed: {resp.result.get('error')}")
+
+
+async def resolve_did(
+    client: Client, did: str, retrieve: Callable[[str], Awaitable[dict]]
+) -> DIDResolution:
+    """Ledger DID entry -> IPFS DID document -> first verification method"""
+    classic_addr = did_address(did)
+    if not is_valid_classic_address(classic_addr):
+        raise HTTPException(status_code=400, detail="Invalid DID")
+    did_obj = await fetch_did_entry(client, classic_addr)
+    if not did_obj or not did_obj.get("URI"):
+        raise HTTPException(status_code=404, detail="DID Document not found on ledger")
+
+    ipfs_uri = bytes.fromhex(did_obj["URI"]).decode("utf-8")
+    did_doc = await retrieve(ipfs_uri)
+
+    # Pick the first verification method
+    vm = did_doc["verificationMethod"][0]
+    pubkey = vm.get("publicKeyHex") or vm.get("publicKeyBase58")
+    if not pubkey:
+        raise HTTPException(status_code=500, detail="No supported public key in DID Document")
+    return DIDResolution(classic_addr, ipfs_uri, vm, pubkey)
@@ -1,34 +1,169 @@
+import asyncio
 import os
-import json
-import requests
+from typing import List, Optional, Sequence, Tuple
+
+import httpx
+
+from xrp.services.client import LoopClients
+
+from .cid_store import CIDStore, verify_cid
 
 PINATA_API_KEY = os.getenv("PINATA_API_KEY")
 PINATA_API_SECRET = os.getenv("PINATA_API_SECRET")
+PINATA_API_URL = os.getenv("PINATA_API_URL", "https://api.pinata.cloud")
+# Comma-separated gateways raced on every retrieval; the first valid answer wins
+IPFS_GATEWAYS = [
+    url.strip().rstrip("/")
+    for url in os.getenv("IPFS_GATEWAYS", "https://gateway.pinata.cloud").split(",")
+    if url.strip()
+]
+# Seconds allowed for a single pin or gateway request
+IPFS_TIMEOUT = float(os.getenv("IPFS_TIMEOUT", "10"))
+# Connections kept open across the pin API and all gateways
+IPFS_POOL_SIZE = int(os.getenv("IPFS_POOL_SIZE", "20"))
+# Local content-addressed copy of pinned/fetched documents ("" disables it);
+# keep it out of the statically served data directory
+IPFS_CACHE_PATH = os.getenv("IPFS_CACHE_PATH", "ipfs-cache.sqlite3")
+IPFS_CACHE_MAX_BYTES = int(os.getenv("IPFS_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+
+class IPFSService:
+    """
+    Pins DID documents through Pinata and fetches them back from IPFS
+    gateways on one pooled httpx.AsyncClient.
+
+    Retrieval sends the request to every gateway at once; the first valid
+    JSON document is returned and the slower requests are cancelled. A
+    gateway whose bytes do not hash to the CID is treated as failed.
+    The pool is created lazily on the running event loop.
+
+    With a ``cache``, documents are served by CID from the local store.
+    Pinned documents are written through to it, and so are fetched ones
+    whose content was verified against the CID.
+    """
+
+    def __init__(
+        self,
+        api_url: str = PINATA_API_URL,
+        gateways: Sequence[str] = IPFS_GATEWAYS,
+        api_key: Optional[str] = PINATA_API_KEY,
+        api_secret: Optional[str] = PINATA_API_SECRET,
+        timeout: float = IPFS_TIMEOUT,
+        pool_size: int = IPFS_POOL_SIZE,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        cache: Optional[CIDStore] = None,
+    ):
+        self.api_url = api_url
+        self.gateways = list(gateways)
+        self.api_key = api_key
+        self.api_secret = api_secret
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self._transport = transport
+        self.cache = cache
+        self._clients = LoopClients(
+            lambda: httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=self.pool_size,
+                    max_keepalive_connections=self.pool_size,
+                ),
+                timeout=self.timeout,
+                transport=self._transport,
+            )
+        )
+
+    def _client(self) -> httpx.AsyncClient:
+        return self._clients.get()
+
+    async def aclose(self) -> None:
+        await self._clients.aclose()
+        if self.cache is not None:
+            self.cache.close()
+
+    async def store(self, did_doc: dict, timeout: Optional[float] = None) -> str:
+        headers = {
+            "pinata_api_key": self.api_key or "",
+            "pinata_secret_api_key": self.api_secret or "",
+        }
+        body = {
+            "pinataMetadata": {"name": "my-xrp-did"},
+            "pinataContent": did_doc,
+        }
+
+        resp = await self._client().post(
+            f"{self.api_url}/pinning/pinJSONToIPFS",
+            headers=headers,
+            json=body,
+            timeout=timeout or self.timeout,
+        )
+        resp.raise_for_status()
+
+        cid = resp.json()["IpfsHash"]
+        if self.cache is not None:
+            await self.cache.put(cid, did_doc)
+        return f"ipfs://{cid}"
+
+    async def retrieve(self, ipfs_uri: str, timeout: Optional[float] = None) -> dict:
+        cid = ipfs_uri.removeprefix("ipfs://")
+        if self.cache is not None:
+            cached = await self.cache.get(cid)
+            if cached is not None:
+                return cached
+
+        document, verified = await self._race(cid, timeout or self.timeout)
+        if self.cache is not None and verified:
+            await self.cache.put(cid, document)
+        return document
+
+    async def _race(self, cid: str, timeout: float) -> Tuple[dict, bool]:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        tasks = [
+            asyncio.ensure_future(self._fetch(gateway, cid, timeout))
+            for gateway in self.gateways
+        ]
+        errors: List[Exception] = []
+        try:
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending,
+                    timeout=deadline - loop.time(),
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                if not done:
+                    raise TimeoutError(f"No IPFS gateway returned {cid} within {timeout}s")
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    errors.append(task.exception())
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        raise errors[-1] if errors else RuntimeError("No IPFS gateways configured")
+
+    async def _fetch(self, gateway: str, cid: str, timeout: float) -> Tuple[dict, bool]:
+        """The gateway's document and whether it was verified against the CID"""
+        resp = await self._client().get(f"{gateway}/ipfs/{cid}", timeout=timeout)
+        resp.raise_for_status()
+        verified = verify_cid(cid, resp.content)
+        if verified is False:
+            raise ValueError(f"{gateway} returned content that does not match {cid}")
+        document = resp.json()
+        if not isinstance(document, dict):
+            raise ValueError(f"{gateway} returned a non-object document for {cid}")
+        return document, bool(verified)
+
+
+ipfs_service = IPFSService(
+    cache=CIDStore(IPFS_CACHE_PATH, IPFS_CACHE_MAX_BYTES) if IPFS_CACHE_PATH else None
+)
+
+
+async def store_in_ipfs(did_doc: dict) -> str:
+    return await ipfs_service.store(did_doc)
+
 
-def store_in_ipfs(did_doc: dict) -> str:
-    url = "https://api.pinata.cloud/pinning/pinJSONToIPFS"
-    headers = {
-        "Content-Type": "application/json",
-        "pinata_api_key": PINATA_API_KEY,
-        "pinata_secret_api_key": PINATA_API_SECRET
-    }
-
-    body = {
-        "pinataMetadata": {"name": "my-xrp-did"},
-        "pinataContent": did_doc
-    }
-
-    resp = requests.post(url, headers=headers, data=json.dumps(body))
-    resp.raise_for_status()
-
-    data = resp.json()
-    cid = data["IpfsHash"]
-    return f"ipfs://{cid}"
-
-def retrieve_from_ipfs(ipfs_uri: str) -> dict:
-    cid = ipfs_uri.removeprefix("ipfs://")
-    url = f"https://gateway.pinata.cloud/ipfs/{cid}"
-    resp = requests.get(url)
-    resp.raise_for_status()
-
-    return resp.json()
\ No newline at end of file
+async def retrieve_from_ipfs(ipfs_uri: str) -> dict:
+    return await ipfs_service.retrieve(ipfs_uri)
@@ -0,0 +1,118 @@
+import os
+import secrets
+import time
+import zlib
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Tuple
+
+from db.db import postgrest
+from db.postgrest import PostgrestClient
+
+# "supabase" shares challenges between instances and workers; "memory" keeps
+# them in this process and is only correct for a single worker on one machine
+NONCE_STORE = os.getenv("NONCE_STORE", "supabase")
+# Seconds a login challenge stays valid
+NONCE_TTL = float(os.getenv("NONCE_TTL", "300"))
+NONCE_SHARDS = int(os.getenv("NONCE_SHARDS", "16"))
+
+
+class NonceStore(ABC):
+    """Login challenges: one outstanding nonce per DID, usable once"""
+
+    @abstractmethod
+    async def issue(self, did: str) -> str:
+        """Create a nonce for a DID, replacing any earlier one"""
+
+    @abstractmethod
+    async def consume(self, did: str, nonce: str) -> bool:
+        """Atomically use up a DID's nonce; False if it is wrong, used or expired"""
+
+
+class MemoryNonceStore(NonceStore):
+    """
+    In-process nonce store sharded by DID. Nonces expire after ``ttl``
+    seconds; each issue sweeps one shard for expired entries so memory stays
+    bounded without a background task.
+    """
+
+    def __init__(self, ttl: float = NONCE_TTL, shards: int = NONCE_SHARDS):
+        self.ttl = ttl
+        self._shards: List[Dict[str, Tuple[str, float]]] = [
+            {} for _ in range(max(1, shards))
+        ]
+        self._sweep = 0
+
+    def _shard(self, did: str) -> Dict[str, Tuple[str, float]]:
+        return self._shards[zlib.crc32(did.encode()) % len(self._shards)]
+
+    def __len__(self) -> int:
+        return sum(len(shard) for shard in self._shards)
+
+    async def issue(self, did: str) -> str:
+        nonce = secrets.token_hex(16)
+        self._shard(did)[did] = (nonce, time.monotonic() + self.ttl)
+        self._sweep_next_shard()
+        return nonce
+
+    async def consume(self, did: str, nonce: str) -> bool:
+        shard = self._shard(did)
+        entry = shard.get(did)
+        if entry is None or not secrets.compare_digest(entry[0], nonce):
+            return False
+        del shard[did]
+        return time.monotonic() < entry[1]
+
+    def _sweep_next_shard(self) -> None:
+        shard = self._shards[self._sweep]
+        self._sweep = (self._sweep + 1) % len(self._shards)
+        now = time.monotonic()
+        for did in [d for d, (_, expires) in shard.items() if expires <= now]:
+            del shard[did]
+
+
+class SupabaseNonceStore(NonceStore):
+    """
+    Nonces in the ``login_nonces`` table through the pooled PostgREST client.
+    Consuming is one DELETE ... RETURNING filtered on DID, nonce and expiry,
+    so a nonce can only ever be used once even across instances.
+    """
+
+    def __init__(self, client: PostgrestClient, ttl: float = NONCE_TTL):
+        self.client = client
+        self.ttl = ttl
+
+    async def issue(self, did: str) -> str:
+        nonce = secrets.token_hex(16)
+        expires_at = datetime.now(timezone.utc) + timedelta(seconds=self.ttl)
+        await self.client.insert(
+            "login_nonces",
+            [{"did": did, "nonce": nonce, "expires_at": expires_at.isoformat()}],
+            on_conflict="did",
+        )
+        return nonce
+
+    async def consume(self, did: str, nonce: str) -> bool:
+        deleted = await self.client.delete(
+            "login_nonces",
+            {
+                "did": f"eq.{did}",
+                "nonce": f"eq.{nonce}",
+                "expires_at": f"gt.{datetime.now(timezone.utc).isoformat()}",
+            },
+        )
+        return bool(deleted)
+
+
+def create_nonce_store(kind: str = NONCE_STORE) -> NonceStore:
+    if kind == "memory":
+        if int(os.getenv("WEB_CONCURRENCY", "1")) > 1:
+            # A challenge issued by one worker would fail to verify on another
+            raise ValueError("NONCE_STORE=memory cannot be shared by several workers")
+        return MemoryNonceStore()
+    if kind == "supabase":
+        return SupabaseNonceStore(postgrest)
+    raise ValueError(f"Unknown NONCE_STORE: {kind}")
+
+
+nonce_store = create_nonce_store()
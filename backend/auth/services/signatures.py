@@ -0,0 +1,84 @@
+import asyncio
+import base64
+import binascii
+import multiprocessing
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Optional
+
+from xrpl.core.keypairs import is_valid_message
+
+# "process" spreads verification across cores; "thread" keeps it in this
+# process (xrpl-py's ed25519/secp256k1 are pure Python, so threads only
+# keep the event loop free, they do not add parallelism)
+SIGNATURE_EXECUTOR = os.getenv("SIGNATURE_EXECUTOR", "process")
+SIGNATURE_WORKERS = int(os.getenv("SIGNATURE_WORKERS", str(os.cpu_count() or 1)))
+
+
+def decode_signature(signature: str) -> bytes:
+    """Signature bytes from a hex or base64 string; ValueError if it is neither"""
+    try:
+        return bytes.fromhex(signature)
+    except ValueError:
+        try:
+            return base64.b64decode(signature)
+        except binascii.Error as e:
+            raise ValueError("Signature is neither hex nor base64") from e
+
+
+def check_signature(message: bytes, signature: bytes, public_key: str) -> bool:
+    """is_valid_message that reports malformed keys/signatures as invalid"""
+    try:
+        return is_valid_message(message=message, signature=signature, public_key=public_key)
+    except Exception:
+        return False
+
+
+class SignatureVerifier:
+    """
+    Runs signature checks in a thread or process pool so CPU-bound
+    verification never blocks the event loop. The pool is created by
+    ``start`` (from the app lifespan), or on first use outside the app;
+    concurrent checks are spread across all workers.
+
+    Worker processes are spawned, not forked: the server already runs
+    threads (connection pools, the Turnkey loop), and forking a threaded
+    process can deadlock the child.
+    """
+
+    def __init__(self, kind: str = SIGNATURE_EXECUTOR, workers: int = SIGNATURE_WORKERS):
+        if kind not in ("process", "thread"):
+            raise ValueError(f"Unknown SIGNATURE_EXECUTOR: {kind}")
+        self.kind = kind
+        self.workers = max(1, workers)
+        self._executor: Optional[Executor] = None
+
+    def start(self) -> None:
+        self._pool()
+
+    def _pool(self) -> Executor:
+        if self._executor is None:
+            if self.kind == "process":
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix="signature"
+                )
+        return self._executor
+
+    async def verify(self, message: bytes, signature: bytes, public_key: str) -> bool:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._pool(), check_signature, message, signature, public_key
+        )
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+signature_verifier = SignatureVerifier()
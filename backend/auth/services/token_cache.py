@@ -0,0 +1,64 @@
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from typing import Callable, Optional, Tuple
+
+from auth.services.jwt import decode_access_token
+
+# Verified tokens remembered at once; least recently used are dropped first
+JWT_CACHE_SIZE = int(os.getenv("JWT_CACHE_SIZE", "4096"))
+
+
+class VerifiedTokenCache:
+    """
+    Claims of already-verified JWTs, keyed by the SHA-256 of the token so raw
+    tokens are never held. An entry is served until the token's ``exp``;
+    tokens without one, and tokens that fail verification, are not cached.
+    """
+
+    def __init__(
+        self,
+        decode: Callable[[str], Optional[dict]] = decode_access_token,
+        max_entries: int = JWT_CACHE_SIZE,
+    ):
+        self.decode = decode
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        # digest -> (exp as a unix timestamp, claims)
+        self._entries: "OrderedDict[bytes, Tuple[float, dict]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._entries)}
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def verify(self, token: str) -> Optional[dict]:
+        """Claims of a valid, unexpired token, or None"""
+        key = hashlib.sha256(token.encode()).digest()
+        entry = self._entries.get(key)
+        if entry is not None:
+            if time.time() < entry[0]:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return entry[1]
+            del self._entries[key]
+
+        self.misses += 1
+        claims = self.decode(token)
+        if claims is None:
+            return None
+        exp = claims.get("exp")
+        if isinstance(exp, (int, float)):
+            self._entries[key] = (float(exp), claims)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return claims
+
+
+token_cache = VerifiedTokenCache()
@@ -0,0 +1,267 @@
+import asyncio
+import json
+import os
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import Deque, Optional
+
+import httpx
+from xrpl.asyncio.clients import Client
+from xrpl.models.requests import AccountInfo
+from xrpl.wallet import Wallet
+
+from auth.xrpl import xrpl_client
+from xrp.services.client import LoopClients
+
+try:
+    import fcntl
+except ImportError:  # Windows: the pool file is not locked
+    fcntl = None
+
+# Refill starts when fewer than LOW funded wallets are ready and stops at HIGH
+WALLET_POOL_LOW = int(os.getenv("WALLET_POOL_LOW", "3"))
+WALLET_POOL_HIGH = int(os.getenv("WALLET_POOL_HIGH", "10"))
+# Faucet requests in flight while refilling
+WALLET_POOL_CONCURRENCY = int(os.getenv("WALLET_POOL_CONCURRENCY", "3"))
+# Ready wallets (including seeds) survive restarts here; keep it out of the
+# statically served data directory. Only one process may use the file: other
+# workers find it locked and fund wallets on demand instead
+WALLET_POOL_PATH = os.getenv("WALLET_POOL_PATH", "wallet-pool.json")
+FAUCET_URL = os.getenv("FAUCET_URL", "https://faucet.altnet.rippletest.net/accounts")
+# Seconds to wait for a funded account to appear in a validated ledger
+FAUCET_TIMEOUT = float(os.getenv("FAUCET_TIMEOUT", "40"))
+
+
+class Funder(ABC):
+    """Gets XRP into a new wallet"""
+
+    @abstractmethod
+    async def fund(self, wallet: Wallet) -> None:
+        """Return once the wallet's account exists in a validated ledger"""
+
+
+class FaucetFunder(Funder):
+    """
+    Funds wallets through a testnet/devnet faucet over a pooled httpx client,
+    then polls AccountInfo until the account is validated.
+    """
+
+    def __init__(
+        self,
+        client: Client,
+        faucet_url: str = FAUCET_URL,
+        timeout: float = FAUCET_TIMEOUT,
+        poll_interval: float = 1.0,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.client = client
+        self.faucet_url = faucet_url
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self._transport = transport
+        self._clients = LoopClients(
+            lambda: httpx.AsyncClient(timeout=self.timeout, transport=self._transport)
+        )
+
+    def _http_client(self) -> httpx.AsyncClient:
+        return self._clients.get()
+
+    async def aclose(self) -> None:
+        await self._clients.aclose()
+
+    async def fund(self, wallet: Wallet) -> None:
+        resp = await self._http_client().post(
+            self.faucet_url,
+            json={"destination": wallet.classic_address, "userAgent": "xrpl-py"},
+        )
+        resp.raise_for_status()
+
+        deadline = time.monotonic() + self.timeout
+        while True:
+            info = await self.client.request(
+                AccountInfo(account=wallet.classic_address, ledger_index="validated")
+            )
+            if info.is_successful():
+                return
+            if info.result.get("error") != "actNotFound":
+                raise RuntimeError(f"Funding {wallet.classic_address} failed: {info.result}")
+            if time.monotonic() >= deadline:
+                raise TimeoutError(
+                    f"{wallet.classic_address} was not funded within {self.timeout}s"
+                )
+            await asyncio.sleep(self.poll_interval)
+
+
+class WalletPool:
+    """
+    Pre-funded wallets ready to hand out, so signup skips the faucet.
+
+    A background refill funds wallets ``concurrency`` at a time whenever
+    fewer than ``low`` are ready, until ``high`` are. Ready wallets are
+    written to ``path`` on every change, and a wallet is removed from the
+    file before it leaves memory so it can never be given out twice. When
+    the pool is empty ``take`` funds a wallet on demand.
+
+    The file belongs to one process at a time (an exclusive lock on
+    ``path``.lock); a pool that cannot take the lock, e.g. in a second
+    uvicorn worker, disables itself and funds every wallet on demand.
+    """
+
+    def __init__(
+        self,
+        funder: Funder,
+        path: Optional[str] = WALLET_POOL_PATH,
+        low: int = WALLET_POOL_LOW,
+        high: int = WALLET_POOL_HIGH,
+        concurrency: int = WALLET_POOL_CONCURRENCY,
+        retry_delay: float = 5.0,
+    ):
+        self.funder = funder
+        self.path = path
+        self.low = low
+        self.high = max(low, high)
+        self.concurrency = max(1, concurrency)
+        self.retry_delay = retry_delay
+        self._ready: Deque[Wallet] = deque()
+        self._loaded = False
+        self._refill_task: Optional[asyncio.Task] = None
+        self._save_lock: Optional[asyncio.Lock] = None
+        self._lock_fd: Optional[int] = None
+
+    def __len__(self) -> int:
+        return len(self._ready)
+
+    async def start(self) -> None:
+        """Load persisted wallets and top the pool up in the background"""
+        await self._load()
+        self._maybe_refill()
+
+    async def stop(self) -> None:
+        if self._refill_task is not None:
+            self._refill_task.cancel()
+            await asyncio.gather(self._refill_task, return_exceptions=True)
+            self._refill_task = None
+        if self._loaded:
+            await self._save()
+        if self._lock_fd is not None:
+            os.close(self._lock_fd)
+            self._lock_fd = None
+
+    async def take(self) -> Wallet:
+        await self._load()
+        wallet = await self._take_ready()
+        if wallet is None:
+            wallet = Wallet.create()
+            await self.funder.fund(wallet)
+        self._maybe_refill()
+        return wallet
+
+    async def _take_ready(self) -> Optional[Wallet]:
+        async with self._lock():
+            if not self._ready:
+                return None
+            wallet = self._ready[0]
+            if self.path:
+                # Off the file first: if this fails the wallet stays pooled
+                await asyncio.to_thread(
+                    self._write, self._entries([w for w in self._ready if w is not wallet])
+                )
+            self._ready.remove(wallet)
+            return wallet
+
+    def _maybe_refill(self) -> None:
+        if self.high <= 0 or len(self._ready) >= self.low:
+            return
+        if self._refill_task is None or self._refill_task.done():
+            self._refill_task = asyncio.create_task(self._refill())
+
+    async def _refill(self) -> None:
+        while len(self._ready) < self.high:
+            needed = min(self.concurrency, self.high - len(self._ready))
+            results = await asyncio.gather(
+                *(self._fund_one() for _ in range(needed)), return_exceptions=True
+            )
+            errors = [r for r in results if isinstance(r, Exception)]
+            if errors:
+                print(f"Error funding pooled wallets: {errors[0]}")
+            if len(errors) == len(results):
+                await asyncio.sleep(self.retry_delay)
+
+    async def _fund_one(self) -> None:
+        wallet = Wallet.create()
+        await self.funder.fund(wallet)
+        self._ready.append(wallet)
+        await self._save()
+
+    def _lock(self) -> asyncio.Lock:
+        if self._save_lock is None:
+            self._save_lock = asyncio.Lock()
+        return self._save_lock
+
+    async def _load(self) -> None:
+        async with self._lock():
+            if self._loaded:
+                return
+            self._loaded = True
+            if not self.path:
+                return
+            if not await asyncio.to_thread(self._lock_file):
+                print(f"{self.path} is used by another process; funding wallets on demand")
+                self.path = None
+                self.high = self.low = 0
+                return
+            entries = await asyncio.to_thread(self._read)
+            self._ready.extend(
+                Wallet(e["public_key"], e["private_key"], seed=e.get("seed"))
+                for e in entries
+            )
+
+    async def _save(self) -> None:
+        if not self.path:
+            return
+        async with self._lock():
+            await asyncio.to_thread(self._write, self._entries(self._ready))
+
+    @staticmethod
+    def _entries(wallets) -> list:
+        return [
+            {"public_key": w.public_key, "private_key": w.private_key, "seed": w.seed}
+            for w in wallets
+        ]
+
+    def _lock_file(self) -> bool:
+        """Take the pool file for this process; False if another one holds it"""
+        if fcntl is None:
+            return True
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        fd = os.open(f"{self.path}.lock", os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return False
+        self._lock_fd = fd
+        return True
+
+    def _read(self) -> list:
+        if not os.path.exists(self.path):
+            return []
+        with open(self.path) as f:
+            return json.load(f)
+
+    def _write(self, entries: list) -> None:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp = f"{self.path}.tmp"
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w") as f:
+            json.dump(entries, f)
+        os.replace(tmp, self.path)
+
+
+faucet_funder = FaucetFunder(xrpl_client)
+wallet_pool = WalletPool(faucet_funder)
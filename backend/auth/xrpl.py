@@ -1,7 +1,5 @@
-import os
-from xrpl.asyncio.clients import AsyncJsonRpcClient
+from xrp.services.client import get_client
 
-TESTNET_URL = os.getenv("XRPL_RPC_URL")
 
 class XrplSingleton:
     """Singleton class for Xrpl client."""
@@ -11,7 +9,7 @@ class XrplSingleton:
     @staticmethod
     def get_instance():
         if XrplSingleton._instance is None:
-            XrplSingleton._instance = AsyncJsonRpcClient(TESTNET_URL)
+            XrplSingleton._instance = get_client()
         return XrplSingleton._instance
 
 # Create a single instance to be reused
@@ -1,20 +1,13 @@
 import os
-from supabase import create_client, Client
+
+from db.postgrest import PostgrestClient
+from db.write_behind import WriteBehindQueue
 
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_KEY")
 SUPABASE_SERVICE_ROLE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
 
-class SupabaseSingleton:
-    """Singleton class for Supabase client."""
-    _instance = None
-
-
-    @staticmethod
-    def get_instance() -> Client:
-        if SupabaseSingleton._instance is None:
-            SupabaseSingleton._instance = create_client(SUPABASE_URL, SUPABASE_KEY)
-        return SupabaseSingleton._instance
-
-# Create a single instance to be reused
-supabase_client = SupabaseSingleton.get_instance()
+# Async REST access on a pooled client; nothing connects until first use
+postgrest = PostgrestClient(SUPABASE_URL, SUPABASE_KEY)
+# Batched inserts for rows the request does not need to wait for
+write_behind = WriteBehindQueue(postgrest)
@@ -0,0 +1,7 @@
+-- Login challenges expire; consuming one is a single
+--   DELETE FROM login_nonces WHERE did = ? AND nonce = ? AND expires_at > NOW() RETURNING *
+ALTER TABLE login_nonces
+    ADD COLUMN IF NOT EXISTS expires_at TIMESTAMPTZ NOT NULL DEFAULT NOW() + INTERVAL '5 minutes';
+
+CREATE INDEX IF NOT EXISTS idx_login_nonces_expires_at
+    ON login_nonces(expires_at);
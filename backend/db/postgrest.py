@@ -0,0 +1,101 @@
+import json
+import os
+from typing import Any, Dict, List, Optional, Sequence
+
+import httpx
+
+from xrp.services.client import LoopClients
+
+# Connections kept open to the Supabase REST API
+SUPABASE_POOL_SIZE = int(os.getenv("SUPABASE_POOL_SIZE", "10"))
+SUPABASE_TIMEOUT = float(os.getenv("SUPABASE_TIMEOUT", "10"))
+
+
+class PostgrestClient:
+    """
+    Minimal async PostgREST client for Supabase's /rest/v1 API on one pooled
+    httpx.AsyncClient, created lazily on the running event loop.
+
+    Filters are PostgREST column operators, e.g. ``{"did": "eq.did:xrpl:..."}``.
+    Errors surface as httpx.HTTPStatusError.
+    """
+
+    def __init__(
+        self,
+        url: Optional[str],
+        key: Optional[str],
+        pool_size: int = SUPABASE_POOL_SIZE,
+        timeout: float = SUPABASE_TIMEOUT,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.base_url = f"{(url or '').rstrip('/')}/rest/v1"
+        self.key = key or ""
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self._transport = transport
+        self._clients = LoopClients(
+            lambda: httpx.AsyncClient(
+                base_url=self.base_url,
+                headers={
+                    "apikey": self.key,
+                    "Authorization": f"Bearer {self.key}",
+                    "Content-Type": "application/json",
+                },
+                limits=httpx.Limits(
+                    max_connections=self.pool_size,
+                    max_keepalive_connections=self.pool_size,
+                ),
+                timeout=self.timeout,
+                transport=self._transport,
+            )
+        )
+
+    def _client(self) -> httpx.AsyncClient:
+        return self._clients.get()
+
+    async def aclose(self) -> None:
+        await self._clients.aclose()
+
+    async def insert(
+        self,
+        table: str,
+        rows: Sequence[Dict[str, Any]],
+        returning: bool = False,
+        on_conflict: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """Insert rows in one request; with ``on_conflict`` it is an upsert"""
+        prefer = ["return=representation" if returning else "return=minimal"]
+        params = {}
+        if on_conflict:
+            prefer.append("resolution=merge-duplicates")
+            params["on_conflict"] = on_conflict
+        resp = await self._client().post(
+            f"/{table}",
+            params=params,
+            content=json.dumps(list(rows)),
+            headers={"Prefer": ",".join(prefer)},
+        )
+        resp.raise_for_status()
+        return resp.json() if returning else []
+
+    async def select(
+        self,
+        table: str,
+        filters: Optional[Dict[str, str]] = None,
+        columns: str = "*",
+        limit: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        params = {"select": columns, **(filters or {})}
+        if limit is not None:
+            params["limit"] = str(limit)
+        resp = await self._client().get(f"/{table}", params=params)
+        resp.raise_for_status()
+        return resp.json()
+
+    async def delete(self, table: str, filters: Dict[str, str]) -> List[Dict[str, Any]]:
+        """Delete matching rows and return them"""
+        resp = await self._client().delete(
+            f"/{table}", params=filters, headers={"Prefer": "return=representation"}
+        )
+        resp.raise_for_status()
+        return resp.json()
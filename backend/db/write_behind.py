@@ -0,0 +1,160 @@
+import asyncio
+import os
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+from db.postgrest import PostgrestClient
+
+# Rows waiting to be written; callers wait for space beyond this
+WRITE_BEHIND_MAX_PENDING = int(os.getenv("WRITE_BEHIND_MAX_PENDING", "10000"))
+# Rows per insert request
+WRITE_BEHIND_BATCH_SIZE = int(os.getenv("WRITE_BEHIND_BATCH_SIZE", "100"))
+# Seconds a partial batch waits for more rows before it is written
+WRITE_BEHIND_FLUSH_INTERVAL = float(os.getenv("WRITE_BEHIND_FLUSH_INTERVAL", "0.2"))
+WRITE_BEHIND_RETRIES = int(os.getenv("WRITE_BEHIND_RETRIES", "3"))
+
+
+class WriteBehindQueue:
+    """
+    Batches non-critical inserts off the request path. Rows that must be
+    stored before a request completes (e.g. anything holding key material)
+    should be inserted directly instead.
+
+    ``put`` returns as soon as the row is queued; a background task groups
+    queued rows by table and writes each group with one PostgREST insert.
+    At most ``max_pending`` rows are held: beyond that ``put`` waits for the
+    writer instead of growing memory. Failed batches are retried with
+    backoff, then split in half so one bad row cannot sink the rest; only
+    rows that fail on their own are logged and dropped. ``flush`` waits
+    until everything queued so far is written; ``aclose`` flushes and stops
+    the writer.
+
+    Rows queued with ``on_conflict`` are written as upserts on that column,
+    so re-queuing a row that is already stored is harmless.
+    """
+
+    def __init__(
+        self,
+        client: PostgrestClient,
+        max_pending: int = WRITE_BEHIND_MAX_PENDING,
+        batch_size: int = WRITE_BEHIND_BATCH_SIZE,
+        flush_interval: float = WRITE_BEHIND_FLUSH_INTERVAL,
+        retries: int = WRITE_BEHIND_RETRIES,
+        retry_delay: float = 0.5,
+    ):
+        self.client = client
+        self.max_pending = max_pending
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.written = 0
+        self.dropped = 0
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def put(
+        self, table: str, row: Dict[str, Any], on_conflict: Optional[str] = None
+    ) -> None:
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.max_pending)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        await self._queue.put((table, row, on_conflict))
+
+    async def flush(self) -> None:
+        """Wait until queued rows are written; raises if the writer has died"""
+        if self._queue is None or self._task is None:
+            return
+        joined = asyncio.ensure_future(self._queue.join())
+        try:
+            await asyncio.wait({joined, self._task}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            joined.cancel()
+        if joined.done() and not joined.cancelled():
+            return
+        if not self._task.cancelled() and self._task.exception() is not None:
+            raise self._task.exception()
+        raise RuntimeError(f"Write-behind writer stopped with {self.pending} rows queued")
+
+    async def aclose(self) -> None:
+        if self._task is not None:
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f"Write-behind writer failed, {self.pending} rows not written: {e}")
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        self._queue = None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(
+                        await asyncio.wait_for(self._queue.get(), deadline - loop.time())
+                    )
+                except asyncio.TimeoutError:
+                    break
+            try:
+                await self._write(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _write(
+        self, batch: List[Tuple[str, Dict[str, Any], Optional[str]]]
+    ) -> None:
+        # PostgREST bulk inserts need the same columns in every row
+        groups: Dict[
+            Tuple[str, Optional[str], Tuple[str, ...]], List[Dict[str, Any]]
+        ] = defaultdict(list)
+        for table, row, on_conflict in batch:
+            groups[(table, on_conflict, tuple(sorted(row)))].append(row)
+        for (_, on_conflict, _), rows in groups.items():
+            if on_conflict:
+                # Postgres rejects an upsert that touches the same row twice
+                rows[:] = list({row.get(on_conflict): row for row in rows}.values())
+        await asyncio.gather(
+            *(
+                self._insert(table, rows, on_conflict)
+                for (table, on_conflict, _), rows in groups.items()
+            )
+        )
+
+    async def _insert(
+        self,
+        table: str,
+        rows: List[Dict[str, Any]],
+        on_conflict: Optional[str] = None,
+        retries: Optional[int] = None,
+    ) -> None:
+        retries = self.retries if retries is None else retries
+        for attempt in range(retries + 1):
+            try:
+                await self.client.insert(table, rows, on_conflict=on_conflict)
+                self.written += len(rows)
+                return
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                error = e
+            if attempt < retries:
+                await asyncio.sleep(self.retry_delay * 2**attempt)
+
+        if len(rows) > 1:
+            # The batch has had its retries; bisect once per half to find bad rows
+            middle = len(rows) // 2
+            await self._insert(table, rows[:middle], on_conflict, retries=0)
+            await self._insert(table, rows[middle:], on_conflict, retries=0)
+            return
+        print(f"Dropping {table} row: {error}")
+        self.dropped += 1
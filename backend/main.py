@@ -6,6 +6,7 @@ load_dotenv()
 
 import logging
 import os
+from contextlib import asynccontextmanager
 
 import uvicorn
 from fastapi import FastAPI
@@ -14,14 +15,47 @@ from fastapi.responses import RedirectResponse
 from fastapi.staticfiles import StaticFiles
 
 from app.api import api_router
+from app.services.provisioning import provisioning_jobs
+from app.services.wallet import close_wallet_services
 from auth.routers import auth_router
+from auth.services.ipfs import ipfs_service
+from auth.services.signatures import signature_verifier
+from auth.services.wallet_pool import faucet_funder, wallet_pool
+from db.db import postgrest, write_behind
 from app.middlewares.frontend import FrontendProxyMiddleware
+from xrp.services.client import close_clients, start_health_checks
+from xrp.services.jobs import loan_jobs
+from xrp.services.ledger_stream import ledger_stream
+from xrp.services.xrpl_service import confirmations
 
 servers = []
 app_name = os.getenv("FLY_APP_NAME")
 if app_name:
     servers = [{"url": f"https://{app_name}.fly.dev"}]
-app = FastAPI(servers=servers)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    start_health_checks()
+    signature_verifier.start()
+    await ledger_stream.start()
+    await wallet_pool.start()
+    yield
+    await loan_jobs.shutdown()
+    await provisioning_jobs.shutdown()
+    await wallet_pool.stop()
+    await faucet_funder.aclose()
+    await ledger_stream.stop()
+    await confirmations.stop()
+    await close_wallet_services()
+    await ipfs_service.aclose()
+    await write_behind.aclose()
+    await postgrest.aclose()
+    signature_verifier.shutdown()
+    await close_clients()
+
+
+app = FastAPI(servers=servers, lifespan=lifespan)
 
 environment = os.getenv("ENVIRONMENT", "dev")  # Default to 'development' if not set
 frontend_endpoint = os.getenv("FRONTEND_ENDPOINT")
@@ -0,0 +1,47 @@
+import asyncio
+from collections import Counter
+
+import pytest
+
+from tests.test_turnkey import rippled_standin
+from xrp.services.autofill import Autofiller
+
+ACCOUNT = "rayJTJWwHVo6aGKusiebLr6ozQeZemTxPe"
+
+
+@pytest.mark.asyncio
+async def test_autofill_shares_one_network_snapshot_until_it_expires():
+    methods = Counter()
+    autofiller = Autofiller(rippled_standin([], network_id=1, methods=methods), ttl=0.05)
+
+    filled = await asyncio.gather(
+        *(autofiller.fill({"Account": ACCOUNT}) for _ in range(3))
+    )
+    autofiller.note_validated_ledger(1005)
+    later, _ = await autofiller.fill({"Account": ACCOUNT})
+    await asyncio.sleep(0.06)
+    await autofiller.fill({"Account": ACCOUNT, "Sequence": 3})
+
+    assert sorted(tx["Sequence"] for tx, _ in filled) == [7, 8, 9]
+    assert "NetworkID" not in filled[0][0]
+    assert later["LastLedgerSequence"] == 1025
+    assert methods["server_info"] == methods["fee"] == 2
+    assert methods["account_info"] == 1
+
+
+@pytest.mark.asyncio
+async def test_unconsumed_lease_resyncs_sequence():
+    methods = Counter()
+    autofiller = Autofiller(rippled_standin([], methods=methods))
+
+    tx, lease = await autofiller.fill({"Account": ACCOUNT})
+    autofiller.release(ACCOUNT, lease, "telINSUF_FEE_P")
+    again, _ = await autofiller.fill({"Account": ACCOUNT})
+    explicit, explicit_lease = await autofiller.fill(
+        {"Account": ACCOUNT, "Sequence": 42, "Fee": "100"}
+    )
+
+    assert tx["Sequence"] == again["Sequence"] == 7
+    assert methods["account_info"] == 2
+    assert explicit["Fee"] == "100" and explicit["Sequence"] == 42
+    assert explicit_lease is None
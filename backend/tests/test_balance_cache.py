@@ -0,0 +1,140 @@
+import asyncio
+from collections import Counter
+
+import pytest
+from xrpl.models.requests import AccountInfo, AccountLines, Ledger
+from xrpl.models.response import Response, ResponseStatus
+
+from xrp.services.account_state import LSF_DEFAULT_RIPPLE, AccountStateCache
+from xrp.services.balance_cache import BalanceCache
+
+
+class LedgerClient:
+    """Stand-in rippled client that counts requests by method"""
+
+    def __init__(self, ledger_index=100, lines=None):
+        self.ledger_index = ledger_index
+        self.calls = Counter()
+        # Pages of trust lines; each page but the last carries a marker
+        self.lines = lines or [
+            [{"account": "rIssuer", "currency": "SGD", "balance": "5", "limit": "1000"}]
+        ]
+
+    async def request(self, request):
+        await asyncio.sleep(0.01)
+        if isinstance(request, Ledger):
+            self.calls["ledger"] += 1
+            result = {"ledger_index": self.ledger_index}
+        elif isinstance(request, AccountInfo):
+            self.calls["account_info"] += 1
+            result = {
+                "account_data": {"Balance": "25000000", "Flags": LSF_DEFAULT_RIPPLE},
+                "ledger_index": request.ledger_index,
+            }
+        elif isinstance(request, AccountLines):
+            self.calls["account_lines"] += 1
+            page = request.marker or 0
+            lines = [
+                line
+                for line in self.lines[page]
+                if request.peer in (None, line["account"])
+            ]
+            result = {"lines": lines, "ledger_index": request.ledger_index}
+            if page + 1 < len(self.lines):
+                result["marker"] = page + 1
+        return Response(status=ResponseStatus.SUCCESS, result=result)
+
+
+@pytest.mark.asyncio
+async def test_reads_are_shared_within_a_ledger():
+    client = LedgerClient()
+    cache = BalanceCache(ledger_ttl=60)
+
+    await asyncio.gather(
+        *(cache.account_info(client, "rA") for _ in range(5)),
+        *(cache.account_lines(client, "rA") for _ in range(5)),
+    )
+
+    assert client.calls == Counter(ledger=1, account_info=1, account_lines=1)
+
+
+@pytest.mark.asyncio
+async def test_new_validated_ledger_triggers_fresh_reads():
+    client = LedgerClient()
+    cache = BalanceCache(ledger_ttl=60)
+
+    await cache.account_info(client, "rA")
+    cache.note_validated_ledger(101)
+    response = await cache.account_info(client, "rA")
+
+    assert response.result["ledger_index"] == 101
+    assert client.calls["account_info"] == 2
+
+
+@pytest.mark.asyncio
+async def test_least_recently_used_entries_are_evicted():
+    client = LedgerClient()
+    cache = BalanceCache(max_entries=2, ledger_ttl=60)
+
+    for address in ("rA", "rB", "rC"):
+        await cache.account_info(client, address)
+    await cache.account_info(client, "rA")
+
+    assert client.calls["account_info"] == 4
+
+
+@pytest.mark.asyncio
+async def test_account_state_is_kept_across_ledgers_until_invalidated():
+    client = LedgerClient()
+    state = AccountStateCache(BalanceCache(ledger_ttl=60))
+
+    assert await state.has_default_ripple(client, "rIssuer")
+    assert await state.has_trust_line(client, "rLender", "SGD", "rIssuer")
+    assert not await state.has_trust_line(client, "rLender", "USD", "rIssuer")
+
+    state.balance_cache.note_validated_ledger(101)
+    assert await state.has_default_ripple(client, "rIssuer")
+    assert client.calls["account_info"] == 1
+    assert client.calls["account_lines"] == 1
+
+    state.invalidate("rLender")
+    assert await state.has_trust_line(client, "rLender", "SGD", "rIssuer")
+    assert client.calls["account_lines"] == 2
+
+
+@pytest.mark.asyncio
+async def test_trust_line_needs_a_limit_and_is_read_across_pages():
+    client = LedgerClient(
+        lines=[
+            [
+                {"account": "rIssuer", "currency": "SGD", "balance": "0", "limit": "0"},
+                {"account": "rOther", "currency": "USD", "balance": "0", "limit": "10"},
+            ],
+            [{"account": "rIssuer", "currency": "USD", "balance": "0", "limit": "10"}],
+        ]
+    )
+    state = AccountStateCache(BalanceCache(ledger_ttl=60))
+
+    assert not await state.has_trust_line(client, "rLender", "SGD", "rIssuer")
+    assert await state.has_trust_line(client, "rLender", "USD", "rIssuer")
+    assert not await state.has_trust_line(client, "rLender", "EUR", "rOther")
+    assert client.calls["account_lines"] == 4
+
+
+@pytest.mark.asyncio
+async def test_watched_entries_are_refreshed_after_max_age_ledgers():
+    client = LedgerClient()
+    cache = BalanceCache(max_age_ledgers=5)
+    cache.follow_stream(["rLender"])
+    cache.note_validated_ledger(100)
+
+    await cache.account_info(client, "rLender")
+    cache.note_validated_ledger(104)
+    await cache.account_info(client, "rLender")
+    assert client.calls["account_info"] == 1
+
+    # No transaction named the account, but the entry is now too old
+    cache.note_validated_ledger(105)
+    response = await cache.account_info(client, "rLender")
+    assert client.calls["account_info"] == 2
+    assert response.result["ledger_index"] == 105
@@ -0,0 +1,118 @@
+import json
+import sqlite3
+from base64 import b32encode
+from hashlib import sha256
+
+import httpx
+import pytest
+
+from auth.services.cid_store import CIDStore, verify_cid
+from auth.services.ipfs import IPFSService
+from tests.test_ipfs import DOCUMENT, standins
+
+
+def raw_cid(data: bytes) -> str:
+    """CIDv1 (raw codec, sha2-256) of some bytes"""
+    cid = bytes([1, 0x55, 0x12, 32]) + sha256(data).digest()
+    return "b" + b32encode(cid).decode().lower().rstrip("=")
+
+
+@pytest.mark.asyncio
+async def test_store_persists_across_instances(tmp_path):
+    path = str(tmp_path / "cids.sqlite3")
+    store = CIDStore(path)
+    await store.put("bafkreidoc", DOCUMENT)
+    store.close()
+
+    reopened = CIDStore(path)
+    assert await reopened.get("bafkreidoc") == DOCUMENT
+    assert await reopened.get("bafkreimissing") is None
+    reopened.close()
+
+
+@pytest.mark.asyncio
+async def test_corrupted_blob_is_dropped_on_read(tmp_path):
+    path = str(tmp_path / "cids.sqlite3")
+    store = CIDStore(path)
+    await store.put("bafkreidoc", DOCUMENT)
+    with sqlite3.connect(path) as db:
+        db.execute("UPDATE blobs SET data = ? WHERE cid = ?", (b'{"id":"forged"}', "bafkreidoc"))
+
+    assert await store.get("bafkreidoc") is None
+    assert store.size() == 0
+    store.close()
+
+
+@pytest.mark.asyncio
+async def test_least_recently_read_blobs_are_evicted_over_cap(tmp_path):
+    store = CIDStore(str(tmp_path / "cids.sqlite3"), max_bytes=100)
+    document = {"pad": "x" * 30}  # 40 bytes once serialized
+
+    await store.put("a", document)
+    await store.put("b", document)
+    await store.get("a")
+    await store.put("c", document)
+
+    assert await store.get("a") == document
+    assert await store.get("b") is None
+    assert await store.get("c") == document
+    assert store.size() <= 100
+    store.close()
+
+
+@pytest.mark.asyncio
+async def test_pinned_documents_are_served_without_a_gateway(tmp_path):
+    store = CIDStore(str(tmp_path / "cids.sqlite3"))
+    ipfs = IPFSService(
+        api_url="http://pinata.local",
+        gateways=["http://broken.gw"],
+        api_key="key",
+        transport=standins({"broken.gw": 0}, [], []),
+        cache=store,
+    )
+
+    uri = await ipfs.store(DOCUMENT)
+
+    assert await ipfs.retrieve(uri) == DOCUMENT
+    await ipfs.aclose()
+    store.close()
+
+
+def test_verify_cid_checks_raw_and_dag_pb_content():
+    v0 = "QmT78zSuBmuS4z925WZfrqQ1qHaJ56DQaTfyMUF7F8ff5o"
+
+    assert verify_cid(v0, b"hello world\n") is True
+    assert verify_cid(v0, b"hello world!") is False
+    assert verify_cid(raw_cid(b"hello world"), b"hello world") is True
+    assert verify_cid(raw_cid(b"hello world"), b"forged") is False
+    assert verify_cid("bafkreidoc", b"hello world") is None
+
+
+@pytest.mark.asyncio
+async def test_only_verified_gateway_documents_are_persisted(tmp_path):
+    body = json.dumps(DOCUMENT).encode()
+    forged = json.dumps({**DOCUMENT, "verificationMethod": [{"publicKeyHex": "ED66"}]})
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.host == "forged.gw":
+            return httpx.Response(200, content=forged.encode())
+        return httpx.Response(200, content=body)
+
+    store = CIDStore(str(tmp_path / "cids.sqlite3"))
+    ipfs = IPFSService(
+        gateways=["http://forged.gw"],
+        transport=httpx.MockTransport(handler),
+        cache=store,
+    )
+    with pytest.raises(ValueError):
+        await ipfs.retrieve(f"ipfs://{raw_cid(body)}")
+
+    ipfs.gateways = ["http://forged.gw", "http://honest.gw"]
+    assert await ipfs.retrieve(f"ipfs://{raw_cid(body)}") == DOCUMENT
+    # A CID that cannot be checked is served but never cached
+    ipfs.gateways = ["http://honest.gw"]
+    assert await ipfs.retrieve("ipfs://bafkreidoc") == DOCUMENT
+
+    assert await store.get(raw_cid(body)) == DOCUMENT
+    assert await store.get("bafkreidoc") is None
+    await ipfs.aclose()
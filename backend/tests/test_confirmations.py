@@ -0,0 +1,146 @@
+import asyncio
+import json
+from collections import Counter
+
+import httpx
+import pytest
+from xrpl.asyncio.transaction import XRPLReliableSubmissionException
+
+from xrp.services.client import PooledJsonRpcClient
+from xrp.services.confirmations import ConfirmationTracker, TransactionExpired
+
+
+def rippled(validated_in, busy=()):
+    """
+    Stand-in rippled whose validated ledger advances by one per lookup of
+    the validated ledger. The first tx lookup of each hash in ``busy`` fails
+    with tooBusy.
+    """
+    calls = Counter()
+    busy = set(busy)
+    ledger = {"index": 0}
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        body = json.loads(request.content)
+        params = body["params"][0]
+        if body["method"] == "ledger" and params.get("transactions"):
+            calls["ledger_transactions"] += 1
+            index = params["ledger_index"]
+            hashes = [h for h, validated in validated_in.items() if validated == index]
+            result = {"status": "success", "ledger": {"transactions": hashes}}
+        elif body["method"] == "ledger":
+            calls["ledger"] += 1
+            ledger["index"] += 1
+            result = {"status": "success", "ledger_index": ledger["index"]}
+        else:
+            calls["tx"] += 1
+            tx_hash = params["transaction"]
+            if tx_hash in busy:
+                busy.discard(tx_hash)
+                result = {"status": "error", "error": "tooBusy"}
+            elif ledger["index"] >= validated_in.get(tx_hash, float("inf")):
+                result = {
+                    "status": "success",
+                    "hash": tx_hash,
+                    "validated": True,
+                    "meta": {"TransactionResult": "tesSUCCESS"},
+                }
+            else:
+                result = {"status": "error", "error": "txnNotFound"}
+        return httpx.Response(200, json={"result": result})
+
+    client = PooledJsonRpcClient(
+        "http://rippled.local", transport=httpx.MockTransport(handler)
+    )
+    return client, calls
+
+
+@pytest.mark.asyncio
+async def test_tracker_matches_hashes_against_each_validated_ledger():
+    client, calls = rippled({"A": 2, "B": 3})
+    tracker = ConfirmationTracker(client, poll_interval=0.01)
+
+    results = await asyncio.gather(
+        tracker.wait("A", 10),
+        tracker.wait("B", 10),
+        tracker.wait("LOST", 2),
+        return_exceptions=True,
+    )
+
+    assert results[0].result["meta"]["TransactionResult"] == "tesSUCCESS"
+    assert results[1].result["hash"] == "B"
+    assert isinstance(results[2], TransactionExpired)
+    # One lookup each when registered, then only A (ledger 2), B and the
+    # expired LOST (ledger 3); every ledger is scanned once
+    assert calls["tx"] == 6
+    assert calls["ledger"] == 3
+    assert calls["ledger_transactions"] == 3
+    assert tracker.pending == 0
+    await tracker.stop()
+
+
+@pytest.mark.asyncio
+async def test_pending_hashes_cost_no_lookups_while_unvalidated():
+    hashes = [f"H{i}" for i in range(20)]
+    client, calls = rippled({tx_hash: 6 for tx_hash in hashes})
+    tracker = ConfirmationTracker(client, poll_interval=0.01)
+
+    await asyncio.gather(*(tracker.wait(tx_hash, 100) for tx_hash in hashes))
+
+    # 20 when registered and 20 once found in ledger 6, not 20 per ledger
+    assert calls["tx"] == 40
+    assert calls["ledger_transactions"] == 6
+    await tracker.stop()
+
+
+@pytest.mark.asyncio
+async def test_tracker_resolves_from_stream_without_lookups():
+    client, calls = rippled({})
+    tracker = ConfirmationTracker(client, poll_interval=5)
+
+    waiter = asyncio.ensure_future(tracker.wait("ABC", 100))
+    await asyncio.sleep(0)
+    tracker.resolve_from_stream(
+        {
+            "type": "transaction",
+            "validated": True,
+            "ledger_index": 50,
+            "transaction": {"hash": "ABC", "Account": "rLender"},
+            "meta": {"TransactionResult": "tecPATH_DRY"},
+        }
+    )
+    response = await asyncio.wait_for(waiter, 1)
+
+    assert response.result["meta"]["TransactionResult"] == "tecPATH_DRY"
+    assert response.result["Account"] == "rLender"
+    assert calls["tx"] == 0
+    await tracker.stop()
+
+
+@pytest.mark.asyncio
+async def test_lookup_errors_are_retried_until_last_ledger_sequence():
+    client, _ = rippled({"OK": 3}, busy={"OK", "GONE"})
+    tracker = ConfirmationTracker(client, poll_interval=0.01)
+
+    ok, expired = await asyncio.gather(
+        tracker.wait("OK", 10), tracker.wait("GONE", 2), return_exceptions=True
+    )
+
+    # A transient error no longer fails the wait; the next ledger finds it
+    assert ok.result["validated"]
+    assert isinstance(expired, XRPLReliableSubmissionException)
+    assert "LastLedgerSequence 2" in str(expired)
+    await tracker.stop()
+
+
+@pytest.mark.asyncio
+async def test_wait_gives_up_after_timeout():
+    client, _ = rippled({})
+    tracker = ConfirmationTracker(client, poll_interval=0.01)
+
+    with pytest.raises(XRPLReliableSubmissionException, match="within 0.05s"):
+        await tracker.wait("NEVER", 10_000, timeout=0.05)
+
+    # Nobody waits any more, so the hash is no longer looked up
+    assert tracker.pending == 0
+    await tracker.stop()
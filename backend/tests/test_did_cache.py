@@ -0,0 +1,157 @@
+import asyncio
+import json
+from collections import Counter
+
+import httpx
+import pytest
+from fastapi import HTTPException
+
+from auth.services.did_cache import DIDCache
+from xrp.services.client import PooledJsonRpcClient
+
+ADDRESS = "rayJTJWwHVo6aGKusiebLr6ozQeZemTxPe"
+DID = f"did:xrpl:testnet:{ADDRESS}"
+URI = "ipfs://bafkreidid"
+
+
+class FakeStream:
+    def __init__(self, connected=True, acknowledge=True):
+        self.connected = connected
+        self.acknowledge = acknowledge
+        self.accounts = set()
+        self.subscribed = set()
+
+    def track(self, addresses):
+        self.accounts |= set(addresses)
+        if self.acknowledge:
+            self.subscribed |= set(addresses)
+
+    def is_tracking(self, address):
+        return self.connected and address in self.subscribed
+
+
+def ledger(calls):
+    async def handler(request: httpx.Request) -> httpx.Response:
+        account = json.loads(request.content)["params"][0]["did"]
+        calls[account] += 1
+        if account != ADDRESS:
+            return httpx.Response(
+                200, json={"result": {"status": "error", "error": "entryNotFound"}}
+            )
+        node = {"LedgerEntryType": "DID", "URI": URI.encode().hex()}
+        return httpx.Response(200, json={"result": {"status": "success", "node": node}})
+
+    return PooledJsonRpcClient(
+        "http://rippled.local", transport=httpx.MockTransport(handler)
+    )
+
+
+def documents(fetched):
+    async def retrieve(uri):
+        fetched.append(uri)
+        await asyncio.sleep(0.01)
+        return {"verificationMethod": [{"id": "#key-1", "publicKeyHex": "ED01"}]}
+
+    return retrieve
+
+
+@pytest.mark.asyncio
+async def test_repeat_resolutions_skip_ledger_and_ipfs():
+    calls, fetched = Counter(), []
+    stream = FakeStream()
+    cache = DIDCache(ledger(calls), documents(fetched), ttl=0, stream=stream)
+
+    resolved = await asyncio.gather(*(cache.resolve(DID) for _ in range(3)))
+    again = await cache.resolve(DID)
+
+    assert {r.public_key for r in resolved} == {"ED01"}
+    assert again.uri == URI
+    assert calls[ADDRESS] == 1 and fetched == [URI]
+    assert ADDRESS in stream.accounts
+
+
+@pytest.mark.asyncio
+async def test_didset_or_ttl_forces_a_fresh_resolution():
+    calls, fetched = Counter(), []
+    stream = FakeStream()
+    cache = DIDCache(ledger(calls), documents(fetched), ttl=0.05, stream=stream)
+
+    await cache.resolve(DID)
+    cache.on_transaction(
+        {"transaction": {"TransactionType": "Payment", "Account": ADDRESS}}
+    )
+    await cache.resolve(DID)
+    cache.on_transaction(
+        {"transaction": {"TransactionType": "DIDSet", "Account": ADDRESS}}
+    )
+    await cache.resolve(DID)
+    assert calls[ADDRESS] == 2
+
+    # Without a live subscription the short TTL applies
+    stream.connected = False
+    await asyncio.sleep(0.06)
+    await cache.resolve(DID)
+    assert calls[ADDRESS] == 3
+
+
+@pytest.mark.asyncio
+async def test_missing_did_is_not_cached():
+    calls = Counter()
+    cache = DIDCache(ledger(calls), documents([]))
+
+    for _ in range(2):
+        with pytest.raises(HTTPException) as e:
+            await cache.resolve("did:xrpl:testnet:rHb9CJAWyB4rj91VRWn96DkukG4bwdtyTh")
+        assert e.value.status_code == 404
+    assert calls["rHb9CJAWyB4rj91VRWn96DkukG4bwdtyTh"] == 2
+
+
+@pytest.mark.asyncio
+async def test_only_resolved_valid_accounts_are_tracked_up_to_the_cap():
+    stream = FakeStream()
+    cache = DIDCache(ledger(Counter()), documents([]), stream=stream, max_tracked=1)
+    other = "rNa2Hz5dTwuXofTfL8weNrwzTahLfF53he"
+
+    with pytest.raises(HTTPException):
+        await cache.resolve(f"did:xrpl:testnet:{other}")
+    assert stream.accounts == set()
+
+    cache._track("rNotAnAddress")
+    await cache.resolve(DID)
+    cache._track(other)
+
+    assert stream.accounts == {ADDRESS}
+
+
+@pytest.mark.asyncio
+async def test_disconnect_drops_entries_kept_by_the_subscription():
+    calls = Counter()
+    stream = FakeStream()
+    cache = DIDCache(ledger(calls), documents([]), ttl=60, stream=stream)
+
+    await cache.resolve(DID)
+    # A DIDSet sent while disconnected is missed; reconnecting must not revive the entry
+    cache.on_connection(False)
+    cache.on_connection(True)
+    await cache.resolve(DID)
+
+    assert calls[ADDRESS] == 2
+
+
+@pytest.mark.asyncio
+async def test_entries_use_the_ttl_until_the_subscription_is_acknowledged():
+    calls = Counter()
+    stream = FakeStream(acknowledge=False)
+    cache = DIDCache(ledger(calls), documents([]), ttl=0, max_age=60, stream=stream)
+
+    await cache.resolve(DID)
+    assert stream.accounts == {ADDRESS}
+    await cache.resolve(DID)
+    assert calls[ADDRESS] == 2
+
+    # Acknowledged now, but the entry above was stored before; only a fresh
+    # resolution is kept for max_age
+    stream.subscribed.add(ADDRESS)
+    await cache.resolve(DID)
+    await cache.resolve(DID)
+    assert calls[ADDRESS] == 3
@@ -0,0 +1,119 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+
+from auth.routers import did as did_routes
+from auth.services.did_cache import DIDCache
+from xrpl.core.addresscodec import encode_classic_address
+
+from auth.services.did_resolver import fetch_did_entry, resolve_did
+from xrp.services.client import PooledJsonRpcClient
+
+URI = "ipfs://bafkreidid"
+HAS_DID = "rayJTJWwHVo6aGKusiebLr6ozQeZemTxPe"
+DATA_ONLY = "rNa2Hz5dTwuXofTfL8weNrwzTahLfF53he"
+
+
+def address(i):
+    return encode_classic_address(bytes([i]) * 20)
+
+
+def rippled(requests, dids, ledger_entry_supported=True):
+    async def handler(request: httpx.Request) -> httpx.Response:
+        body = json.loads(request.content)
+        params = body["params"][0]
+        requests.append((body["method"], params))
+        if body["method"] == "ledger_entry":
+            if not ledger_entry_supported:
+                result = {"status": "error", "error": "invalidParams"}
+            elif params["did"] in dids:
+                result = {"status": "success", "node": dids[params["did"]]}
+            else:
+                result = {"status": "error", "error": "entryNotFound"}
+        else:
+            entry = dids.get(params["account"])
+            objects = [entry] if entry and params.get("type") == "did" else []
+            result = {"status": "success", "account_objects": objects}
+        await asyncio.sleep(0.01)
+        return httpx.Response(200, json={"result": result})
+
+    return PooledJsonRpcClient("http://rippled.local", transport=httpx.MockTransport(handler))
+
+
+def did_entry(uri=URI):
+    return {"LedgerEntryType": "DID", "URI": uri.encode().hex()}
+
+
+async def retrieve(uri):
+    return {"verificationMethod": [{"id": "#key-1", "publicKeyHex": "ED" + uri[-2:]}]}
+
+
+@pytest.mark.asyncio
+async def test_did_entry_is_read_directly():
+    requests = []
+    client = rippled(requests, {HAS_DID: did_entry()})
+
+    assert (await fetch_did_entry(client, HAS_DID))["URI"] == URI.encode().hex()
+    assert await fetch_did_entry(client, "rNoDid") is None
+    assert [method for method, _ in requests] == ["ledger_entry", "ledger_entry"]
+
+
+@pytest.mark.asyncio
+async def test_falls_back_to_did_filtered_account_objects():
+    requests = []
+    client = rippled(requests, {HAS_DID: did_entry()}, ledger_entry_supported=False)
+
+    resolution = await resolve_did(client, f"did:xrpl:testnet:{HAS_DID}", retrieve)
+
+    assert resolution.uri == URI and resolution.address == HAS_DID
+    method, params = requests[1]
+    assert method == "account_objects"
+    assert (params["account"], params["type"]) == (HAS_DID, "did")
+
+
+@pytest.mark.asyncio
+async def test_did_without_uri_is_not_found():
+    client = rippled([], {DATA_ONLY: {"LedgerEntryType": "DID", "Data": "00"}})
+
+    with pytest.raises(HTTPException) as e:
+        await resolve_did(client, f"did:xrpl:testnet:{DATA_ONLY}", retrieve)
+    assert e.value.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_malformed_did_is_rejected_without_a_lookup():
+    requests = []
+    client = rippled(requests, {})
+
+    with pytest.raises(HTTPException) as e:
+        await resolve_did(client, "did:xrpl:testnet:rNotAnAddress", retrieve)
+    assert e.value.status_code == 400
+    assert requests == []
+
+
+def test_resolve_endpoint_resolves_many_concurrently(monkeypatch):
+    requests = []
+    dids = {address(i): did_entry(f"ipfs://doc{i:02d}") for i in range(40)}
+    cache = DIDCache(rippled(requests, dids), retrieve)
+    monkeypatch.setattr(did_routes, "did_cache", cache)
+    monkeypatch.setattr(did_routes, "DID_RESOLVE_CONCURRENCY", 40)
+    app = FastAPI()
+    app.include_router(did_routes.did_router, prefix="/did")
+    client = TestClient(app)
+    wanted = [f"did:xrpl:testnet:{address(i)}" for i in range(40)]
+    wanted += [f"did:xrpl:testnet:{address(40)}", "did:xrpl:testnet:rNone"]
+
+    results = client.post("/did/resolve", json={"dids": wanted}).json()["results"]
+
+    assert [r["did"] for r in results] == wanted
+    assert results[7]["public_key"] == "ED07" and results[7]["uri"] == "ipfs://doc07"
+    assert results[-2]["status_code"] == 404
+    assert results[-1]["status_code"] == 400
+    assert len(requests) == 41
+
+    monkeypatch.setattr(did_routes, "DID_RESOLVE_MAX", 10)
+    assert client.post("/did/resolve", json={"dids": wanted}).status_code == 413
@@ -0,0 +1,87 @@
+import asyncio
+import json
+import time
+
+import httpx
+import pytest
+
+from auth.services.ipfs import IPFSService
+
+DOCUMENT = {"id": "did:xrpl:testnet:rOwner", "verificationMethod": []}
+
+
+def standins(latency, cancelled, pinned):
+    """Pinata pin API plus gateways with injected latency, keyed by host"""
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        host = request.url.host
+        if host == "pinata.local":
+            assert request.headers["pinata_api_key"] == "key"
+            pinned.append(json.loads(request.content)["pinataContent"])
+            return httpx.Response(200, json={"IpfsHash": "bafkreidoc"})
+
+        try:
+            await asyncio.sleep(latency[host])
+        except asyncio.CancelledError:
+            cancelled.append(host)
+            raise
+        if host.startswith("broken"):
+            return httpx.Response(502, text="bad gateway")
+        if host.startswith("html"):
+            return httpx.Response(200, json=["not", "a", "document"])
+        assert request.url.path == "/ipfs/bafkreidoc"
+        return httpx.Response(200, json=DOCUMENT)
+
+    return httpx.MockTransport(handler)
+
+
+def service(gateways, latency, cancelled, pinned=None, timeout=2):
+    return IPFSService(
+        api_url="http://pinata.local",
+        gateways=[f"http://{g}" for g in gateways],
+        api_key="key",
+        api_secret="secret",
+        timeout=timeout,
+        transport=standins(latency, cancelled, [] if pinned is None else pinned),
+    )
+
+
+@pytest.mark.asyncio
+async def test_fastest_valid_gateway_wins_and_others_are_cancelled():
+    latency = {"broken.gw": 0.0, "html.gw": 0.01, "fast.gw": 0.05, "slow.gw": 1.0}
+    cancelled = []
+    ipfs = service(list(latency), latency, cancelled)
+
+    start = time.monotonic()
+    document = await ipfs.retrieve("ipfs://bafkreidoc")
+
+    assert document == DOCUMENT
+    assert time.monotonic() - start < 0.5
+    assert cancelled == ["slow.gw"]
+    await ipfs.aclose()
+
+
+@pytest.mark.asyncio
+async def test_retrieve_raises_when_every_gateway_fails_or_times_out():
+    latency = {"broken.gw": 0.0, "stuck.gw": 1.0}
+    cancelled = []
+    ipfs = service(list(latency), latency, cancelled, timeout=0.1)
+
+    with pytest.raises(TimeoutError):
+        await ipfs.retrieve("ipfs://bafkreidoc")
+    assert cancelled == ["stuck.gw"]
+
+    ipfs.gateways = ["http://broken.gw"]
+    with pytest.raises(httpx.HTTPStatusError):
+        await ipfs.retrieve("ipfs://bafkreidoc")
+    await ipfs.aclose()
+
+
+@pytest.mark.asyncio
+async def test_store_pins_document_and_returns_ipfs_uri():
+    pinned = []
+    ipfs = service([], {}, [], pinned)
+
+    assert await ipfs.store(DOCUMENT) == "ipfs://bafkreidoc"
+    assert pinned == [DOCUMENT]
+    await ipfs.aclose()
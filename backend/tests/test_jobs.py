@@ -0,0 +1,67 @@
+import asyncio
+
+import pytest
+
+from xrp.models.loan import ApiResponse
+from xrp.services.jobs import JobQueue, JobQueueFull
+
+
+async def wait_for_job(queue, job_id):
+    for _ in range(100):
+        job = queue.get(job_id)
+        if job.finished_at is not None:
+            return job
+        await asyncio.sleep(0.01)
+    raise AssertionError("job did not finish")
+
+
+@pytest.mark.asyncio
+async def test_job_reports_steps_and_result():
+    queue = JobQueue(workers=1)
+
+    async def workflow(report):
+        report("first")
+        report("second")
+        return ApiResponse(success=True, message="done", data={"n": 1})
+
+    job = queue.submit("test", workflow)
+    assert job.status == "queued"
+
+    job = await wait_for_job(queue, job.id)
+    assert job.status == "succeeded"
+    assert [step.name for step in job.steps] == ["first", "second"]
+    assert job.result.data == {"n": 1}
+    await queue.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_failing_workflow_marks_job_failed():
+    queue = JobQueue(workers=1)
+
+    async def workflow(report):
+        raise RuntimeError("rippled unavailable")
+
+    job = await wait_for_job(queue, queue.submit("test", workflow).id)
+    assert job.status == "failed"
+    assert job.result.error == "rippled unavailable"
+    await queue.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_full_queue_rejects_new_jobs():
+    queue = JobQueue(workers=1, max_queued=1)
+    release = asyncio.Event()
+
+    async def workflow(report):
+        await release.wait()
+        return ApiResponse(success=True, message="done")
+
+    running = queue.submit("test", workflow)
+    await asyncio.sleep(0.01)  # let the worker pick up the first job
+    queue.submit("test", workflow)
+    with pytest.raises(JobQueueFull):
+        queue.submit("test", workflow)
+
+    release.set()
+    assert (await wait_for_job(queue, running.id)).status == "succeeded"
+    await queue.shutdown()
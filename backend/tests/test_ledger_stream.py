@@ -0,0 +1,183 @@
+import asyncio
+import json
+
+import pytest
+import websockets
+
+from xrp.services.balance_cache import BalanceCache
+from xrp.services.ledger_stream import LedgerStream, affected_accounts
+
+ISSUER = "rayJTJWwHVo6aGKusiebLr6ozQeZemTxPe"
+LENDER = "rNa2Hz5dTwuXofTfL8weNrwzTahLfF53he"
+# Well-formed, but the stand-in refuses to subscribe it
+REFUSED = "rHb9CJAWyB4rj91VRWn96DkukG4bwdtyTh"
+
+# Trimmed messages recorded from an altnet subscription
+RECORDED_MESSAGES = [
+    {
+        "type": "transaction",
+        "validated": True,
+        "engine_result": "tesSUCCESS",
+        "ledger_index": 101,
+        "transaction": {
+            "TransactionType": "Payment",
+            "Account": ISSUER,
+            "Destination": LENDER,
+            "hash": "ABC123",
+        },
+        "meta": {
+            "TransactionResult": "tesSUCCESS",
+            "AffectedNodes": [
+                {
+                    "ModifiedNode": {
+                        "LedgerEntryType": "RippleState",
+                        "FinalFields": {
+                            "HighLimit": {"issuer": LENDER},
+                            "LowLimit": {"issuer": ISSUER},
+                        },
+                    }
+                }
+            ],
+        },
+    },
+    {"type": "ledgerClosed", "ledger_index": 101, "txn_count": 1},
+]
+
+
+class RippledStandIn:
+    """Local WebSocket server that acknowledges subscriptions and replays messages"""
+
+    def __init__(self, messages, refused=()):
+        self.messages = messages
+        self.refused = set(refused)
+        self.subscriptions = []
+        self.connections = 0
+
+    async def handler(self, websocket):
+        self.connections += 1
+        async for raw in websocket:
+            request = json.loads(raw)
+            self.subscriptions.append(request)
+            if self.refused & set(request.get("accounts", [])):
+                await websocket.send(json.dumps({
+                    "id": request["id"],
+                    "status": "error",
+                    "type": "response",
+                    "error": "actMalformed",
+                }))
+                continue
+            await websocket.send(json.dumps({
+                "id": request["id"],
+                "status": "success",
+                "type": "response",
+                "result": {"ledger_index": 100},
+            }))
+            for message in self.messages:
+                await websocket.send(json.dumps(message))
+            if self.connections == 1:
+                await websocket.close()
+
+
+def test_affected_accounts_reads_meta_and_tx():
+    assert affected_accounts(RECORDED_MESSAGES[0]) == {ISSUER, LENDER}
+
+
+@pytest.mark.asyncio
+async def test_stream_drives_cache_and_resubscribes_after_disconnect():
+    standin = RippledStandIn(RECORDED_MESSAGES)
+    server = await websockets.serve(standin.handler, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+
+    cache = BalanceCache()
+    stream = LedgerStream(f"ws://127.0.0.1:{port}", reconnect_delay=0.05)
+    stream.track([ISSUER])
+    invalidated = []
+    seen = asyncio.Event()
+    stream.on_ledger(cache.note_validated_ledger)
+    stream.on_connection(lambda up: cache.follow_stream(stream.subscribed) if up else None)
+    stream.on_subscribed(cache.watch)
+    stream.on_transaction(lambda message: invalidated.extend(affected_accounts(message)))
+    stream.on_transaction(lambda message: seen.set())
+
+    def subscribed(account):
+        return any(account in sub.get("accounts", []) for sub in standin.subscriptions)
+
+    await stream.start()
+    await asyncio.wait_for(seen.wait(), 2)
+    assert stream.is_tracking(ISSUER)
+    # Accounts tracked while connected count as tracked, and are watched by
+    # the cache, only once rippled acknowledges them
+    stream.track([LENDER])
+    assert cache._watched == {ISSUER}
+    assert not stream.is_tracking(LENDER)
+    for _ in range(100):
+        if standin.connections >= 2 and stream.is_tracking(LENDER):
+            break
+        await asyncio.sleep(0.02)
+    acknowledged = stream.is_tracking(LENDER)
+    watched = set(cache._watched)
+    await stream.stop()
+    server.close()
+    await server.wait_closed()
+
+    assert cache._ledger_index == 101
+    assert LENDER in invalidated
+    assert standin.connections >= 2
+    initial = [sub for sub in standin.subscriptions if sub.get("streams")]
+    assert initial[0]["accounts"] == [ISSUER]
+    assert all(sub["streams"] == ["ledger"] for sub in initial)
+    assert subscribed(LENDER)
+    assert acknowledged
+    assert watched == {ISSUER, LENDER}
+
+
+def test_track_skips_malformed_addresses_and_caps_the_set():
+    stream = LedgerStream(None, max_accounts=2)
+    announced = []
+    stream.on_track(announced.append)
+
+    stream.track(["garbage", None, ISSUER])
+    stream.track([LENDER, REFUSED])
+
+    assert stream.accounts == {ISSUER, LENDER}
+    assert sorted(announced) == sorted([ISSUER, LENDER])
+
+
+@pytest.mark.asyncio
+async def test_refused_account_is_dropped_instead_of_failing_the_subscription():
+    standin = RippledStandIn([{"type": "ledgerClosed", "ledger_index": 101}], {REFUSED})
+    server = await websockets.serve(standin.handler, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    stream = LedgerStream(f"ws://127.0.0.1:{port}", reconnect_delay=0.05)
+    stream.track([ISSUER, REFUSED])
+    cache = BalanceCache()
+    refused = []
+    stream.on_connection(lambda up: cache.follow_stream(stream.subscribed) if up else None)
+    stream.on_subscribed(cache.watch)
+    stream.on_refused(cache.unwatch)
+    stream.on_refused(refused.append)
+
+    await stream.start()
+    for _ in range(100):
+        if stream.connected and stream.accounts == {ISSUER}:
+            break
+        await asyncio.sleep(0.02)
+    connected = stream.connected
+    # Refused after connecting too: never watched, so its balance is re-read
+    stream.track([LENDER, REFUSED])
+    for _ in range(100):
+        if len(refused) == 2 and stream.is_tracking(LENDER):
+            break
+        await asyncio.sleep(0.02)
+    tracking = {a for a in (ISSUER, LENDER, REFUSED) if stream.is_tracking(a)}
+    await stream.stop()
+    server.close()
+    await server.wait_closed()
+
+    assert connected
+    assert stream.accounts == {ISSUER, LENDER}
+    assert tracking == {ISSUER, LENDER}
+    assert refused == [REFUSED, REFUSED]
+    assert cache._watched == {ISSUER, LENDER}
+    assert stream.ledger_index is not None
+    assert any(sub.get("accounts") == [ISSUER] for sub in standin.subscriptions)
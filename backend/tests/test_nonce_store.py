@@ -0,0 +1,67 @@
+import asyncio
+
+import pytest
+
+from auth.services.nonce_store import MemoryNonceStore, create_nonce_store
+
+DID = "did:xrpl:testnet:rLoginUser"
+
+
+@pytest.mark.asyncio
+async def test_nonce_is_single_use():
+    store = MemoryNonceStore(ttl=60)
+    nonce = await store.issue(DID)
+
+    assert await store.consume(DID, nonce)
+    assert not await store.consume(DID, nonce)
+
+
+@pytest.mark.asyncio
+async def test_wrong_nonce_keeps_the_issued_one():
+    store = MemoryNonceStore(ttl=60)
+    nonce = await store.issue(DID)
+
+    assert not await store.consume(DID, "0" * 32)
+    assert not await store.consume("did:xrpl:testnet:rSomeoneElse", nonce)
+    assert await store.consume(DID, nonce)
+
+
+@pytest.mark.asyncio
+async def test_new_challenge_replaces_the_old_one():
+    store = MemoryNonceStore(ttl=60)
+    first = await store.issue(DID)
+    second = await store.issue(DID)
+
+    assert not await store.consume(DID, first)
+    assert await store.consume(DID, second)
+
+
+@pytest.mark.asyncio
+async def test_expired_nonces_are_rejected_and_swept():
+    store = MemoryNonceStore(ttl=0.05, shards=4)
+    dids = [f"did:xrpl:testnet:r{i}" for i in range(20)]
+    nonces = [await store.issue(did) for did in dids]
+    await asyncio.sleep(0.1)
+
+    assert not await store.consume(dids[0], nonces[0])
+    # Each issue sweeps one shard; a full round leaves only the fresh entries
+    for i in range(4):
+        await store.issue(f"did:xrpl:testnet:fresh{i}")
+    assert len(store) == 4
+
+
+@pytest.mark.asyncio
+async def test_concurrent_consumers_get_one_success():
+    store = MemoryNonceStore(ttl=60)
+    nonce = await store.issue(DID)
+
+    results = await asyncio.gather(*(store.consume(DID, nonce) for _ in range(10)))
+
+    assert results.count(True) == 1
+
+
+def test_memory_store_refuses_several_workers(monkeypatch):
+    monkeypatch.setenv("WEB_CONCURRENCY", "4")
+
+    with pytest.raises(ValueError, match="several workers"):
+        create_nonce_store("memory")
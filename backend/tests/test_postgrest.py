@@ -0,0 +1,252 @@
+import asyncio
+import threading
+from collections import defaultdict
+
+import httpx
+import pytest
+from fastapi import FastAPI, Request, Response
+
+from auth.services.nonce_store import SupabaseNonceStore
+from db.postgrest import PostgrestClient
+from db.write_behind import WriteBehindQueue
+
+KEY = "service-key"
+
+
+def matches(row, params):
+    for column, condition in params.items():
+        if column in ("select", "limit", "on_conflict"):
+            continue
+        op, _, value = condition.partition(".")
+        if op == "eq" and str(row.get(column)) != value:
+            return False
+        if op == "gt" and not str(row.get(column)) > value:
+            return False
+    return True
+
+
+def postgrest_standin(latency=0.0, failures=0):
+    """In-memory tables behind the subset of the PostgREST API we use"""
+    app = FastAPI()
+    app.state.tables = defaultdict(list)
+    app.state.inserts = []
+    app.state.failures = failures
+    # Rows PostgREST rejects outright (e.g. a constraint violation)
+    app.state.poison = set()
+
+    @app.post("/rest/v1/{table}")
+    async def insert(table: str, request: Request):
+        assert request.headers["apikey"] == KEY
+        await asyncio.sleep(latency)
+        if app.state.failures:
+            app.state.failures -= 1
+            return Response(status_code=503)
+        rows = await request.json()
+        if any(r.get("classic_address") in app.state.poison for r in rows):
+            return Response(status_code=409)
+        app.state.inserts.append((table, len(rows)))
+        conflict = request.query_params.get("on_conflict")
+        for row in rows:
+            if conflict:
+                app.state.tables[table] = [
+                    r for r in app.state.tables[table] if r[conflict] != row[conflict]
+                ]
+            app.state.tables[table].append(row)
+        if "return=representation" in request.headers.get("prefer", ""):
+            return rows
+        return Response(status_code=201)
+
+    @app.get("/rest/v1/{table}")
+    async def select(table: str, request: Request):
+        params = dict(request.query_params)
+        rows = [r for r in app.state.tables[table] if matches(r, params)]
+        return rows[: int(params.get("limit", len(rows)))]
+
+    @app.delete("/rest/v1/{table}")
+    async def delete(table: str, request: Request):
+        params = dict(request.query_params)
+        deleted = [r for r in app.state.tables[table] if matches(r, params)]
+        app.state.tables[table] = [r for r in app.state.tables[table] if r not in deleted]
+        return deleted
+
+    return app
+
+
+def client_for(app):
+    return PostgrestClient("http://supabase.local", KEY, transport=httpx.ASGITransport(app=app))
+
+
+@pytest.mark.asyncio
+async def test_insert_select_delete():
+    app = postgrest_standin()
+    client = client_for(app)
+
+    assert await client.insert("wallets", [{"classic_address": "rA"}], returning=True) == [
+        {"classic_address": "rA"}
+    ]
+    await client.insert("wallets", [{"classic_address": "rB"}, {"classic_address": "rC"}])
+
+    assert await client.select("wallets", {"classic_address": "eq.rB"}) == [
+        {"classic_address": "rB"}
+    ]
+    assert len(await client.select("wallets", limit=2)) == 2
+    assert await client.delete("wallets", {"classic_address": "eq.rA"}) == [
+        {"classic_address": "rA"}
+    ]
+    assert len(app.state.tables["wallets"]) == 2
+    await client.aclose()
+
+
+def test_pool_per_event_loop_closed_on_aclose():
+    client = client_for(postgrest_standin())
+    other = asyncio.new_event_loop()
+    thread = threading.Thread(target=other.run_forever, daemon=True)
+    thread.start()
+    try:
+        asyncio.run_coroutine_threadsafe(client.select("wallets"), other).result(5)
+        elsewhere = client._clients.pools[other]
+
+        async def main():
+            await client.select("wallets")
+            # The other loop's pool is kept rather than replaced
+            assert len(client._clients.pools) == 2
+            here = client._clients.current()
+            await client.aclose()
+            assert here.is_closed and client._clients.pools == {}
+
+        asyncio.run(main())
+        asyncio.run_coroutine_threadsafe(asyncio.sleep(0.05), other).result(5)
+        assert elsewhere.is_closed
+    finally:
+        other.call_soon_threadsafe(other.stop)
+        thread.join(5)
+        other.close()
+
+
+@pytest.mark.asyncio
+async def test_write_behind_batches_inserts():
+    app = postgrest_standin()
+    queue = WriteBehindQueue(client_for(app), batch_size=100, flush_interval=0.05)
+
+    for i in range(250):
+        await queue.put("wallets", {"classic_address": f"r{i}"})
+    await queue.put("events", {"kind": "signup"})
+    await queue.flush()
+
+    assert len(app.state.tables["wallets"]) == 250
+    assert len(app.state.inserts) <= 4
+    assert queue.written == 251 and queue.pending == 0
+    await queue.aclose()
+
+
+@pytest.mark.asyncio
+async def test_close_flushes_queued_rows():
+    app = postgrest_standin(latency=0.01)
+    queue = WriteBehindQueue(client_for(app), batch_size=10, flush_interval=1)
+
+    for i in range(25):
+        await queue.put("wallets", {"classic_address": f"r{i}"})
+    await queue.aclose()
+
+    assert len(app.state.tables["wallets"]) == 25
+
+
+@pytest.mark.asyncio
+async def test_pending_rows_are_bounded():
+    app = postgrest_standin(latency=0.02)
+    queue = WriteBehindQueue(client_for(app), max_pending=5, batch_size=5, flush_interval=0)
+    peak = 0
+
+    async def producer():
+        for i in range(40):
+            await queue.put("wallets", {"classic_address": f"r{i}"})
+
+    task = asyncio.create_task(producer())
+    while not task.done():
+        peak = max(peak, queue.pending)
+        await asyncio.sleep(0.001)
+    await queue.aclose()
+
+    assert peak <= 5
+    assert len(app.state.tables["wallets"]) == 40
+
+
+@pytest.mark.asyncio
+async def test_failed_batches_are_retried_then_dropped():
+    app = postgrest_standin(failures=2)
+    queue = WriteBehindQueue(client_for(app), flush_interval=0, retries=2, retry_delay=0.01)
+
+    await queue.put("wallets", {"classic_address": "rRetried"})
+    await queue.flush()
+    assert app.state.tables["wallets"] == [{"classic_address": "rRetried"}]
+
+    app.state.failures = 10
+    await queue.put("wallets", {"classic_address": "rLost"})
+    await queue.aclose()
+    assert queue.dropped == 1 and len(app.state.tables["wallets"]) == 1
+
+
+@pytest.mark.asyncio
+async def test_one_bad_row_does_not_drop_its_batch():
+    app = postgrest_standin()
+    app.state.poison = {"r5"}
+    queue = WriteBehindQueue(client_for(app), flush_interval=0.05, retries=1, retry_delay=0.01)
+
+    for i in range(8):
+        await queue.put("wallets", {"classic_address": f"r{i}"})
+    await queue.aclose()
+
+    stored = sorted(r["classic_address"] for r in app.state.tables["wallets"])
+    assert stored == [f"r{i}" for i in range(8) if i != 5]
+    assert queue.written == 7 and queue.dropped == 1
+
+
+@pytest.mark.asyncio
+async def test_flush_raises_when_the_writer_dies():
+    app = postgrest_standin()
+    queue = WriteBehindQueue(client_for(app), batch_size=1, flush_interval=0)
+
+    async def broken_write(batch):
+        raise RuntimeError("writer bug")
+
+    queue._write = broken_write
+    await queue.put("wallets", {"classic_address": "rA"})
+    await queue.put("wallets", {"classic_address": "rB"})
+
+    with pytest.raises(RuntimeError, match="writer bug"):
+        await asyncio.wait_for(queue.flush(), 1)
+    await asyncio.wait_for(queue.aclose(), 1)
+    assert app.state.tables["wallets"] == []
+
+
+@pytest.mark.asyncio
+async def test_requeued_users_are_upserted():
+    app = postgrest_standin()
+    queue = WriteBehindQueue(client_for(app), flush_interval=0.05)
+    dids = [f"did:xrpl:testnet:r{i}" for i in range(3)]
+
+    for did in dids + dids[:1]:
+        await queue.put("users", {"did": did}, on_conflict="did")
+    await queue.put("events", {"kind": "signup"})
+    await queue.aclose()
+
+    assert sorted(r["did"] for r in app.state.tables["users"]) == dids
+    assert ("users", 3) in app.state.inserts
+
+
+@pytest.mark.asyncio
+async def test_supabase_nonce_store():
+    app = postgrest_standin()
+    store = SupabaseNonceStore(client_for(app), ttl=60)
+    did = "did:xrpl:testnet:rUser"
+
+    first = await store.issue(did)
+    second = await store.issue(did)
+
+    assert len(app.state.tables["login_nonces"]) == 1
+    assert not await store.consume(did, first)
+    assert await store.consume(did, second)
+    assert not await store.consume(did, second)
+
+    expired = SupabaseNonceStore(client_for(app), ttl=-1)
+    assert not await expired.consume(did, await expired.issue(did))
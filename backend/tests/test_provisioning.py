@@ -0,0 +1,131 @@
+import asyncio
+import json
+import time
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from app.api import wallet as wallet_api
+from app.services.provisioning import provision_accounts
+from app.services.rate_limit import TokenBucket
+from app.services.wallet import AsyncTurnkeyService
+from auth import dependencies
+from auth.services.jwt import create_access_token
+from tests.test_turnkey import API_PRIVATE_KEY, API_PUBLIC_KEY, turnkey_standin
+from xrp.services.jobs import JobQueue
+
+
+@pytest.mark.asyncio
+async def test_provisioning_records_each_user_and_resumes(tmp_path):
+    app = turnkey_standin()
+    app.state.fail_create = {"user-3"}
+    service = AsyncTurnkeyService(
+        "http://turnkey.local",
+        API_PUBLIC_KEY,
+        API_PRIVATE_KEY,
+        "org-1",
+        transport=httpx.ASGITransport(app=app),
+    )
+    results = tmp_path / "batch.jsonl"
+    usernames = ["sending", "user-1", "user-2", "user-3", "user-1", ""]
+
+    counts = await provision_accounts(service, usernames, str(results), concurrency=3)
+    records = {r["username"]: r for r in map(json.loads, results.read_text().splitlines())}
+
+    assert counts == {"skipped": 0, "exists": 1, "created": 2, "failed": 1}
+    assert records["sending"]["sub_org_id"] == "suborg-1"
+    assert records["user-1"]["address"]
+    assert records["user-3"]["error"] == "unable to create wallet"
+
+    # A second run only retries the user that failed
+    app.state.fail_create = set()
+    app.state.calls.clear()
+    counts = await provision_accounts(service, usernames, str(results), concurrency=3)
+
+    assert counts == {"skipped": 3, "created": 1}
+    assert app.state.calls["/query/list_suborgs"] == 1
+    assert app.state.suborgs["user-3"] == "suborg-user-3"
+    await service.aclose()
+
+
+@pytest.mark.asyncio
+async def test_token_bucket_spreads_requests_to_rate():
+    bucket = TokenBucket(rate=50, burst=2)
+
+    start = time.monotonic()
+    await asyncio.gather(*(bucket.acquire() for _ in range(6)))
+    elapsed = time.monotonic() - start
+
+    # Two tokens are available up front, the other four arrive every 20ms
+    assert 0.07 <= elapsed < 0.3
+
+
+@pytest.mark.asyncio
+async def test_provision_routes_need_an_operator_token_and_serve_results(
+    tmp_path, monkeypatch
+):
+    turnkey = AsyncTurnkeyService(
+        "http://turnkey.local",
+        API_PUBLIC_KEY,
+        API_PRIVATE_KEY,
+        "org-1",
+        transport=httpx.ASGITransport(app=turnkey_standin()),
+    )
+    jobs = JobQueue(workers=1, max_queued=10, max_jobs=10)
+    monkeypatch.setattr(wallet_api, "get_wallet_service", lambda: turnkey)
+    monkeypatch.setattr(wallet_api, "provisioning_jobs", jobs)
+    monkeypatch.setattr(wallet_api, "PROVISIONING_DIR", str(tmp_path))
+    app = FastAPI()
+    app.include_router(wallet_api.wallet_router, prefix="/wallet")
+    monkeypatch.setattr(dependencies, "ADMIN_DIDS", {"did:xrpl:testnet:rAdmin"})
+    token = create_access_token({"sub": "did:xrpl:testnet:rAdmin"})
+    user_token = create_access_token({"sub": "did:xrpl:testnet:rUser"})
+    request = {"batch_id": "b1", "usernames": ["user-1", "user-2"]}
+
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app), base_url="http://api"
+    ) as client:
+        assert (await client.post("/wallet/provision", json=request)).status_code == 401
+        client.headers["Authorization"] = f"Bearer {user_token}"
+        assert (await client.post("/wallet/provision", json=request)).status_code == 403
+
+        client.headers["Authorization"] = f"Bearer {token}"
+        queued = await client.post("/wallet/provision", json=request)
+        assert queued.status_code == 202
+        assert set(queued.json()["data"]) == {"job_id", "status_url"}
+        job_id = queued.json()["data"]["job_id"]
+        for _ in range(100):
+            if jobs.get(job_id).finished_at:
+                break
+            await asyncio.sleep(0.01)
+        results = await client.get(f"/wallet/provision/{job_id}/results")
+        del client.headers["Authorization"]
+        anonymous = await client.get(f"/wallet/provision/{job_id}/results")
+
+    records = [json.loads(line) for line in results.text.splitlines()]
+    assert sorted(r["username"] for r in records) == ["user-1", "user-2"]
+    assert anonymous.status_code == 401
+    await jobs.shutdown()
+    await turnkey.aclose()
+
+
+@pytest.mark.asyncio
+async def test_activities_are_timestamped_after_rate_limiting():
+    app = turnkey_standin()
+    service = AsyncTurnkeyService(
+        "http://turnkey.local",
+        API_PUBLIC_KEY,
+        API_PRIVATE_KEY,
+        "org-1",
+        transport=httpx.ASGITransport(app=app),
+        rate_limiter=TokenBucket(rate=5, burst=1),
+    )
+
+    await service.rate_limiter.acquire()
+    start = time.time()
+    await service.create_account("user-1")
+
+    # list_suborgs waited ~0.2s for a token, create_sub_organization another
+    assert app.state.timestamps[0] >= (start + 0.3) * 1000
+    await service.aclose()
@@ -0,0 +1,123 @@
+import asyncio
+from collections import Counter
+
+import pytest
+from xrpl.models.requests import AccountInfo, AccountObjects
+from xrpl.models.response import Response, ResponseStatus
+
+from xrp.services.sequence import SequenceAllocator
+
+
+class AccountClient:
+    def __init__(self, sequence=10, tickets=()):
+        self.sequence = sequence
+        self.tickets = list(tickets)
+        self.calls = Counter()
+
+    async def request(self, request):
+        await asyncio.sleep(0.01)
+        if isinstance(request, AccountInfo):
+            self.calls["account_info"] += 1
+            result = {"account_data": {"Sequence": self.sequence}}
+        elif isinstance(request, AccountObjects):
+            self.calls["account_objects"] += 1
+            result = {
+                "account_objects": [
+                    {"LedgerEntryType": "Ticket", "TicketSequence": t}
+                    for t in self.tickets
+                ]
+            }
+        return Response(status=ResponseStatus.SUCCESS, result=result)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_acquires_get_distinct_sequences():
+    client = AccountClient(sequence=10)
+    allocator = SequenceAllocator("rIssuer")
+
+    leases = await asyncio.gather(*(allocator.acquire(client) for _ in range(5)))
+
+    assert sorted(lease["sequence"] for lease in leases) == [10, 11, 12, 13, 14]
+    assert client.calls["account_info"] == 1
+
+
+@pytest.mark.asyncio
+async def test_unconsumed_sequence_resyncs_from_ledger():
+    client = AccountClient(sequence=10)
+    allocator = SequenceAllocator("rIssuer")
+
+    lease = await allocator.acquire(client)
+    allocator.release(lease, "tesSUCCESS")
+    assert (await allocator.acquire(client))["sequence"] == 11
+
+    client.sequence = 11
+    allocator.release({"sequence": 11}, "tefPAST_SEQ")
+    assert (await allocator.acquire(client))["sequence"] == 11
+    assert client.calls["account_info"] == 2
+
+
+@pytest.mark.asyncio
+async def test_queued_transaction_keeps_its_sequence():
+    # The current ledger does not show queued transactions yet
+    client = AccountClient(sequence=10)
+    allocator = SequenceAllocator("rIssuer")
+
+    lease = await allocator.acquire(client, use_tickets=False)
+    allocator.release(lease, "terQUEUED")
+
+    assert (await allocator.acquire(client, use_tickets=False))["sequence"] == 11
+    assert client.calls["account_info"] == 1
+
+
+@pytest.mark.asyncio
+async def test_sequence_gap_resyncs_from_ledger():
+    client = AccountClient(sequence=10, tickets=[5])
+    allocator = SequenceAllocator("rIssuer", ticket_pool_size=1)
+    await allocator.load_tickets(client)
+
+    ticket = await allocator.acquire(client)
+    lease = await allocator.acquire(client)
+    await allocator.acquire(client)
+    allocator.release(lease, "terPRE_SEQ")
+    allocator.release(ticket, "terPRE_TICKET")
+
+    assert (await allocator.acquire(client))["sequence"] == 10
+    assert allocator.available_tickets == 0
+    assert client.calls["account_info"] == 2
+
+
+@pytest.mark.asyncio
+async def test_tickets_are_used_before_sequences():
+    client = AccountClient(sequence=10, tickets=[7, 5])
+    allocator = SequenceAllocator("rIssuer", ticket_pool_size=2)
+    await allocator.load_tickets(client)
+
+    first = await allocator.acquire(client)
+    second = await allocator.acquire(client)
+    third = await allocator.acquire(client)
+
+    assert first == {"sequence": 0, "ticket_sequence": 5}
+    assert second == {"sequence": 0, "ticket_sequence": 7}
+    assert third == {"sequence": 10}
+    assert allocator.tickets_low()
+
+    allocator.release(first, "telINSUF_FEE_P")
+    assert allocator.available_tickets == 1
+
+
+@pytest.mark.asyncio
+async def test_held_ticket_is_not_reused_until_released():
+    client = AccountClient(sequence=10, tickets=[5])
+    allocator = SequenceAllocator("rIssuer", ticket_pool_size=1)
+    await allocator.load_tickets(client)
+
+    lease = await allocator.acquire(client)
+    allocator.hold(lease)
+    # A refresh must not put a possibly-spent ticket back either
+    await allocator.load_tickets(client)
+    assert allocator.available_tickets == 0
+    assert allocator.in_doubt == 1
+
+    allocator.release(lease, "expired")
+    assert allocator.available_tickets == 1
+    assert allocator.in_doubt == 0
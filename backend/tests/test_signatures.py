@@ -0,0 +1,123 @@
+import asyncio
+import base64
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from xrpl.core.keypairs import derive_keypair, generate_seed, sign
+from xrpl.constants import CryptoAlgorithm
+
+from auth.routers import auth as auth_routes
+from auth.services.did_cache import DIDResolution
+from auth.services.nonce_store import MemoryNonceStore
+from auth.services.signatures import SignatureVerifier, decode_signature
+
+
+def keypair(algorithm=CryptoAlgorithm.ED25519):
+    return derive_keypair(generate_seed(algorithm=algorithm))
+
+
+def signed(message: str, private_key: str) -> str:
+    return sign(message.encode(), private_key)
+
+
+def test_decode_signature_accepts_hex_and_base64():
+    raw = bytes(range(64))
+
+    assert decode_signature(raw.hex()) == raw
+    assert decode_signature(base64.b64encode(raw).decode()) == raw
+    with pytest.raises(ValueError):
+        decode_signature("not a signature!")
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("kind", ["thread", "process"])
+async def test_verify_in_pool(kind):
+    verifier = SignatureVerifier(kind=kind, workers=2)
+    items = []
+    for algorithm in (CryptoAlgorithm.ED25519, CryptoAlgorithm.SECP256K1):
+        public, private = keypair(algorithm)
+        items.append((b"hello", bytes.fromhex(signed("hello", private)), public))
+        items.append((b"other", bytes.fromhex(signed("hello", private)), public))
+    items.append((b"hello", b"\x00" * 64, "ED" + "00" * 32))
+
+    try:
+        results = await asyncio.gather(*(verifier.verify(*item) for item in items))
+        assert results == [True, False, True, False, False]
+    finally:
+        verifier.shutdown()
+
+
+def test_process_pool_is_spawned_at_start():
+    verifier = SignatureVerifier(kind="process", workers=1)
+
+    verifier.start()
+    try:
+        # Forking the threaded server process could deadlock the workers
+        assert verifier._executor._mp_context.get_start_method() == "spawn"
+    finally:
+        verifier.shutdown()
+
+
+@pytest.fixture
+def login(monkeypatch):
+    keys = {}
+
+    async def resolve(did):
+        return DIDResolution(did.split(":")[-1], "ipfs://doc", {}, keys[did][0])
+
+    verifier = SignatureVerifier(kind="thread", workers=4)
+    store = MemoryNonceStore(ttl=60)
+    monkeypatch.setattr(auth_routes.did_cache, "resolve", resolve)
+    monkeypatch.setattr(auth_routes, "nonce_store", store)
+    monkeypatch.setattr(auth_routes, "signature_verifier", verifier)
+
+    app = FastAPI()
+    app.include_router(auth_routes.authentication_router, prefix="/auth")
+    client = TestClient(app)
+
+    def challenge(did):
+        keys.setdefault(did, keypair())
+        nonce = client.post("/auth/request-challenge", json={"did": did}).json()["challenge"]
+        return nonce, signed(nonce, keys[did][1])
+
+    yield client, challenge
+    verifier.shutdown()
+
+
+def test_verify_issues_token(login):
+    client, challenge = login
+    nonce, signature = challenge("did:xrpl:testnet:rOne")
+    payload = {"did": "did:xrpl:testnet:rOne", "challenge": nonce, "signature": signature}
+
+    assert "access_token" in client.post("/auth/verify", json=payload).json()
+    # The challenge was used up
+    assert client.post("/auth/verify", json=payload).status_code == 400
+
+
+def test_verify_batch_reports_each_login(login):
+    client, challenge = login
+    items = []
+    for i in range(6):
+        did = f"did:xrpl:testnet:r{i}"
+        nonce, signature = challenge(did)
+        items.append({"did": did, "challenge": nonce, "signature": signature})
+    items[1]["signature"] = items[2]["signature"]
+    items[3]["challenge"] = "f" * 32
+    items[4]["signature"] = "zz"
+
+    results = client.post("/auth/verify-batch", json={"items": items}).json()["results"]
+
+    assert [r["did"] for r in results] == [item["did"] for item in items]
+    assert [r.get("status_code") for r in results] == [None, 401, None, 400, 400, None]
+    assert all("access_token" in results[i] for i in (0, 2, 5))
+
+
+def test_verify_batch_is_bounded(login, monkeypatch):
+    client, _ = login
+    monkeypatch.setattr(auth_routes, "AUTH_BATCH_MAX", 2)
+    item = {"did": "did:xrpl:testnet:r", "challenge": "c", "signature": "00"}
+
+    response = client.post("/auth/verify-batch", json={"items": [item] * 3})
+
+    assert response.status_code == 413
@@ -0,0 +1,99 @@
+import time
+from datetime import timedelta
+
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.general import general_router
+from auth.dependencies import require_token
+from auth.services.jwt import create_access_token, decode_access_token
+from auth.services.token_cache import VerifiedTokenCache, token_cache
+
+
+def counting_decoder(calls):
+    def decode(token):
+        calls.append(token)
+        return decode_access_token(token)
+
+    return decode
+
+
+def test_repeat_token_is_decoded_once():
+    calls = []
+    cache = VerifiedTokenCache(decode=counting_decoder(calls))
+    token = create_access_token({"sub": "did:xrpl:testnet:rUser"})
+
+    for _ in range(5):
+        assert cache.verify(token)["sub"] == "did:xrpl:testnet:rUser"
+
+    assert len(calls) == 1
+    assert cache.stats() == {"hits": 4, "misses": 1, "size": 1}
+
+
+def test_entry_expires_at_token_exp():
+    calls = []
+
+    def decode(token):
+        calls.append(token)
+        return {"exp": time.time() + 0.05}
+
+    cache = VerifiedTokenCache(decode=decode)
+
+    assert cache.verify("token")
+    assert cache.verify("token")
+    time.sleep(0.1)
+    cache.verify("token")
+
+    assert len(calls) == 2
+
+
+def test_invalid_and_expired_tokens_are_rejected_and_not_cached():
+    cache = VerifiedTokenCache()
+    expired = create_access_token({"sub": "x"}, expires_delta=timedelta(seconds=-10))
+
+    assert cache.verify("not-a-jwt") is None
+    assert cache.verify(expired) is None
+    assert len(cache) == 0
+    assert cache.misses == 2
+
+
+def test_cache_is_bounded():
+    cache = VerifiedTokenCache(decode=lambda token: {"exp": time.time() + 60}, max_entries=3)
+
+    for i in range(5):
+        cache.verify(f"token-{i}")
+
+    assert len(cache) == 3
+
+
+def test_require_token_dependency():
+    app = FastAPI()
+
+    @app.get("/balance")
+    async def balance(claims: dict = Depends(require_token)):
+        return {"sub": claims["sub"]}
+
+    client = TestClient(app)
+    token = create_access_token({"sub": "did:xrpl:testnet:rUser"})
+    token_cache.clear()
+    hits = token_cache.hits
+
+    assert client.get("/balance").status_code == 401
+    assert client.get("/balance", headers={"Authorization": "Bearer junk"}).status_code == 401
+    for _ in range(3):
+        response = client.get("/balance", headers={"Authorization": f"Bearer {token}"})
+        assert response.json() == {"sub": "did:xrpl:testnet:rUser"}
+    assert token_cache.hits - hits == 2
+
+
+def test_counters_are_served_next_to_the_client_stats():
+    app = FastAPI()
+    app.include_router(general_router, prefix="/general")
+    client = TestClient(app)
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': 'did:xrpl:testnet:rUser'})}"}
+
+    assert client.get("/general/token-cache").status_code == 401
+    stats = client.get("/general/token-cache", headers=headers).json()
+
+    assert set(stats) == {"hits", "misses", "size"}
+    assert stats["misses"] >= 1
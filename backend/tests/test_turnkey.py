@@ -0,0 +1,506 @@
+import asyncio
+import json
+import time
+from base64 import urlsafe_b64decode
+from collections import Counter
+
+import httpx
+import pytest
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from cryptography.hazmat.primitives.asymmetric.utils import (
+    Prehashed,
+    decode_dss_signature,
+)
+from fastapi import FastAPI, HTTPException, Request
+from xrpl.core.binarycodec import decode, encode_for_signing
+from xrpl.core.keypairs import derive_classic_address, is_valid_message
+
+from app.services import wallet as wallet_module
+from app.services.wallet import SECP256K1_ORDER, AsyncTurnkeyService, TurnkeyService
+from app.services.wallet_resolution import WalletResolution, WalletResolutionCache
+from xrp.services.client import PooledJsonRpcClient
+
+API_KEY = ec.generate_private_key(ec.SECP256R1())
+API_PRIVATE_KEY = format(API_KEY.private_numbers().private_value, "064x")
+API_PUBLIC_KEY = API_KEY.public_key().public_bytes(
+    serialization.Encoding.X962, serialization.PublicFormat.CompressedPoint
+).hex()
+
+# The wallet key Turnkey holds for every sub-organization in these tests
+WALLET_KEY = ec.generate_private_key(ec.SECP256K1())
+WALLET_PUBLIC_KEY = WALLET_KEY.public_key().public_bytes(
+    serialization.Encoding.X962, serialization.PublicFormat.CompressedPoint
+).hex().upper()
+ADDRESS = derive_classic_address(WALLET_PUBLIC_KEY)
+TRANSACTION = {
+    "TransactionType": "Payment",
+    "Account": ADDRESS,
+    "Amount": "2000000",
+    "Destination": "rNa2Hz5dTwuXofTfL8weNrwzTahLfF53he",
+    "Fee": "12",
+}
+
+
+def sign_digest(digest: str) -> dict:
+    """Turnkey-style r/s over a prehashed payload, always with a high S"""
+    r, s = decode_dss_signature(
+        WALLET_KEY.sign(bytes.fromhex(digest), ec.ECDSA(Prehashed(hashes.SHA256())))
+    )
+    s = max(s, SECP256K1_ORDER - s)
+    return {"r": format(r, "064x"), "s": format(s, "064x"), "v": "00"}
+
+
+def assert_signed(tx: dict) -> None:
+    """The submitted transaction carries a valid low-S XRPL signature"""
+    unsigned = {k: v for k, v in tx.items() if k != "TxnSignature"}
+    signature = bytes.fromhex(tx["TxnSignature"])
+    assert tx["SigningPubKey"] == WALLET_PUBLIC_KEY
+    assert decode_dss_signature(signature)[1] <= SECP256K1_ORDER // 2
+    assert is_valid_message(
+        bytes.fromhex(encode_for_signing(unsigned)), signature, WALLET_PUBLIC_KEY
+    )
+
+
+def turnkey_standin(sign_barrier: int = 1):
+    """
+    Stand-in Turnkey API that checks every X-Stamp against the request body.
+    Signing waits until ``sign_barrier`` sign requests are in flight at once.
+    """
+    app = FastAPI()
+    app.state.calls = Counter()
+    app.state.suborgs = {"sending": "suborg-1"}
+    app.state.fail_create = set()
+    app.state.timestamps = []
+    arrived = asyncio.Event()
+    waiting = []
+
+    @app.middleware("http")
+    async def verify_stamp(request: Request, call_next):
+        body = await request.body()
+        padded = request.headers["X-Stamp"] + "=" * (-len(request.headers["X-Stamp"]) % 4)
+        stamp = json.loads(urlsafe_b64decode(padded))
+        assert stamp["publicKey"] == API_PUBLIC_KEY
+        API_KEY.public_key().verify(
+            bytes.fromhex(stamp["signature"]), body, ec.ECDSA(hashes.SHA256())
+        )
+        app.state.calls[request.url.path] += 1
+        return await call_next(request)
+
+    @app.post("/query/list_suborgs")
+    async def list_suborgs(body: dict):
+        suborg = app.state.suborgs.get(body["filterValue"])
+        return {"organizationIds": [suborg] if suborg else []}
+
+    @app.post("/submit/create_sub_organization")
+    async def create_sub_organization(body: dict):
+        username = body["parameters"]["rootUsers"][0]["userName"]
+        app.state.timestamps.append(int(body["timestampMs"]))
+        if username in app.state.fail_create:
+            raise HTTPException(status_code=429, detail="quota exceeded")
+        suborg = app.state.suborgs[username] = f"suborg-{username}"
+        return {
+            "activity": {
+                "status": "ACTIVITY_STATUS_COMPLETED",
+                "result": {
+                    "createSubOrganizationResultV4": {
+                        "subOrganizationId": suborg,
+                        "wallet": {"walletId": f"wallet-{suborg}", "addresses": [ADDRESS]},
+                    }
+                },
+            }
+        }
+
+    @app.post("/query/list_wallets")
+    async def list_wallets(body: dict):
+        return {"wallets": [{"walletId": f"wallet-{body['organizationId']}"}]}
+
+    @app.post("/query/list_wallet_accounts")
+    async def list_wallet_accounts(body: dict):
+        account = {
+            "walletId": body["walletId"],
+            "addressFormat": "ADDRESS_FORMAT_XRP",
+            "address": ADDRESS,
+            "publicKey": WALLET_PUBLIC_KEY.lower(),
+        }
+        return {"accounts": [account]}
+
+    @app.post("/submit/sign_raw_payload")
+    async def sign_raw_payload(body: dict):
+        parameters = body["parameters"]
+        if parameters["signWith"] != ADDRESS:
+            raise HTTPException(status_code=400, detail="unknown signer")
+        assert parameters["hashFunction"] == "HASH_FUNCTION_NO_OP"
+        waiting.append(1)
+        if len(waiting) >= sign_barrier:
+            arrived.set()
+        await asyncio.wait_for(arrived.wait(), 2)
+        return {
+            "activity": {
+                "result": {
+                    "signRawPayloadResult": sign_digest(parameters["payload"])
+                }
+            }
+        }
+
+    @app.post("/submit/sign_raw_payloads")
+    async def sign_raw_payloads(body: dict):
+        assert body["parameters"]["hashFunction"] == "HASH_FUNCTION_NO_OP"
+        signatures = [sign_digest(payload) for payload in body["parameters"]["payloads"]]
+        return {
+            "activity": {"result": {"signRawPayloadsResult": {"signatures": signatures}}}
+        }
+
+    return app
+
+
+def rippled_standin(submitted, network_id=None, methods=None):
+    """Stand-in rippled answering server_info, fee, account_info, submit, ledger and tx"""
+    methods = Counter() if methods is None else methods
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        body = json.loads(request.content)
+        method = body["method"]
+        methods[method] += 1
+        if method == "server_info":
+            info = {"validated_ledger": {"seq": 1000}}
+            if network_id is not None:
+                info["network_id"] = network_id
+            result = {"info": info}
+        elif method == "fee":
+            result = {"drops": {"base_fee": "10", "open_ledger_fee": "15"}}
+        elif method == "account_info":
+            result = {"account_data": {"Sequence": 7}}
+        elif method == "ledger":
+            result = {"ledger_index": 1000 + methods["ledger"]}
+        elif method == "tx":
+            tx_hash = body["params"][0]["transaction"]
+            result = {
+                "hash": tx_hash,
+                "validated": True,
+                "meta": {"TransactionResult": "tesSUCCESS"},
+            }
+        else:
+            submitted.append(decode(body["params"][0]["tx_blob"]))
+            result = {
+                "engine_result": "tesSUCCESS",
+                "tx_json": {"hash": f"HASH{len(submitted)}"},
+            }
+        return httpx.Response(200, json={"result": {"status": "success", **result}})
+
+    return PooledJsonRpcClient(
+        "http://rippled.local", transport=httpx.MockTransport(handler)
+    )
+
+
+def service_options(app, submitted):
+    return {
+        "xrpl_client": rippled_standin(submitted),
+        "transport": httpx.ASGITransport(app=app),
+    }
+
+
+@pytest.mark.asyncio
+async def test_async_service_signs_concurrently_on_one_pool():
+    app = turnkey_standin(sign_barrier=2)
+    submitted = []
+    service = AsyncTurnkeyService(
+        "http://turnkey.local",
+        API_PUBLIC_KEY,
+        API_PRIVATE_KEY,
+        "org-1",
+        **service_options(app, submitted),
+    )
+
+    # Both signing calls must be in flight together for the stand-in to answer
+    responses = await asyncio.gather(
+        service.sign_transaction(TRANSACTION, "sending"),
+        service.sign_transaction(TRANSACTION, "sending"),
+    )
+    pool = service._clients.current()
+
+    assert all(r.result["engine_result"] == "tesSUCCESS" for r in responses)
+    for tx in submitted:
+        assert_signed(tx)
+    assert service._clients.current() is pool
+    await service.aclose()
+
+
+@pytest.mark.asyncio
+async def test_async_service_creates_missing_suborg():
+    app = turnkey_standin()
+    service = AsyncTurnkeyService(
+        "http://turnkey.local",
+        API_PUBLIC_KEY,
+        API_PRIVATE_KEY,
+        "org-1",
+        **service_options(app, []),
+    )
+
+    assert await service.create_account("sending") == ["suborg-1"]
+    await service.create_account("receiving")
+
+    assert app.state.suborgs["receiving"] == "suborg-receiving"
+    assert app.state.calls["/submit/create_sub_organization"] == 1
+    await service.aclose()
+
+
+@pytest.mark.asyncio
+async def test_wallet_resolution_is_cached_and_coalesced():
+    app = turnkey_standin(sign_barrier=3)
+    service = AsyncTurnkeyService(
+        "http://turnkey.local",
+        API_PUBLIC_KEY,
+        API_PRIVATE_KEY,
+        "org-1",
+        **service_options(app, []),
+    )
+
+    await asyncio.gather(
+        *(service.sign_transaction(TRANSACTION, "sending") for _ in range(3))
+    )
+    await service.sign_transaction(TRANSACTION, "sending")
+
+    assert app.state.calls["/query/list_suborgs"] == 1
+    assert app.state.calls["/query/list_wallets"] == 1
+    assert app.state.calls["/query/list_wallet_accounts"] == 1
+    assert app.state.calls["/submit/sign_raw_payload"] == 4
+    await service.aclose()
+
+
+@pytest.mark.asyncio
+async def test_create_account_populates_wallet_resolution():
+    app = turnkey_standin()
+    service = AsyncTurnkeyService(
+        "http://turnkey.local",
+        API_PUBLIC_KEY,
+        API_PRIVATE_KEY,
+        "org-1",
+        **service_options(app, []),
+    )
+
+    await service.create_account("receiving")
+    wallet = await service.resolve_wallet("receiving")
+
+    assert wallet == WalletResolution(
+        "suborg-receiving", "wallet-suborg-receiving", ADDRESS, WALLET_PUBLIC_KEY
+    )
+    assert app.state.calls["/query/list_wallets"] == 0
+    await service.aclose()
+
+
+@pytest.mark.asyncio
+async def test_resolution_cache_expires_and_evicts():
+    cache = WalletResolutionCache(max_entries=2, ttl=0.05)
+    lookups = []
+
+    async def resolve(username):
+        lookups.append(username)
+        return WalletResolution(f"org-{username}", f"wallet-{username}", ADDRESS)
+
+    await cache.get("a", resolve)
+    await cache.get("b", resolve)
+    await cache.get("a", resolve)
+    await cache.get("c", resolve)  # evicts b, the least recently used
+    await cache.get("a", resolve)
+    await cache.get("b", resolve)
+    await asyncio.sleep(0.06)
+    await cache.get("a", resolve)
+
+    assert lookups == ["a", "b", "c", "b", "a"]
+
+
+@pytest.mark.asyncio
+async def test_sign_transactions_uses_one_activity_and_submits_in_sequence_order():
+    app = turnkey_standin()
+    submitted = []
+    service = AsyncTurnkeyService(
+        "http://turnkey.local",
+        API_PUBLIC_KEY,
+        API_PRIVATE_KEY,
+        "org-1",
+        **service_options(app, submitted),
+    )
+    transactions = [{**TRANSACTION, "Sequence": seq} for seq in (12, 10, 14, 11, 13)]
+
+    responses = await service.sign_transactions(transactions, "sending")
+
+    assert len(responses) == 5
+    assert app.state.calls["/submit/sign_raw_payloads"] == 1
+    assert app.state.calls["/submit/sign_raw_payload"] == 0
+    # Each signature must belong to the transaction it was submitted with
+    for tx in submitted:
+        assert_signed(tx)
+    assert [tx["Sequence"] for tx in submitted] == list(range(10, 15))
+    # Responses follow the input order: the 12 went out third
+    assert responses[0].result["tx_json"]["hash"] == "HASH3"
+    assert await service.sign_transactions([], "sending") == []
+    await service.aclose()
+
+
+@pytest.mark.asyncio
+async def test_sign_transactions_releases_leases_when_prepare_fails():
+    app = turnkey_standin()
+    submitted = []
+    service = AsyncTurnkeyService(
+        "http://turnkey.local",
+        API_PUBLIC_KEY,
+        API_PRIVATE_KEY,
+        "org-1",
+        **service_options(app, submitted),
+    )
+    payment = {k: v for k, v in TRANSACTION.items() if k != "Account"}
+    fill = service.autofiller.fill
+    filled = []
+
+    async def failing_fill(transaction):
+        if len(filled) == 2:
+            raise RuntimeError("rippled unavailable")
+        filled.append(await fill(transaction))
+        return filled[-1]
+
+    service.autofiller.fill = failing_fill
+    with pytest.raises(RuntimeError):
+        await service.sign_transactions([payment, payment, payment], "sending")
+
+    # Both leased sequences went back; the next one is re-read from the ledger
+    assert [tx["Sequence"] for tx, _ in filled] == [7, 8]
+    assert service.autofiller.allocator(ADDRESS)._next_sequence is None
+    assert submitted == []
+    assert app.state.calls["/submit/sign_raw_payloads"] == 0
+    await service.aclose()
+
+
+@pytest.mark.asyncio
+async def test_sign_transaction_releases_lease_when_signing_fails():
+    app = turnkey_standin()
+    submitted = []
+    service = AsyncTurnkeyService(
+        "http://turnkey.local",
+        API_PUBLIC_KEY,
+        API_PRIVATE_KEY,
+        "org-1",
+        **service_options(app, submitted),
+    )
+    payment = {k: v for k, v in TRANSACTION.items() if k != "Account"}
+    sign = service._sign_raw_payload
+
+    async def timing_out_sign(*args):
+        service._sign_raw_payload = sign
+        raise httpx.ReadTimeout("turnkey did not answer")
+
+    service._sign_raw_payload = timing_out_sign
+    with pytest.raises(httpx.ReadTimeout):
+        await service.sign_transaction(payment, "sending")
+    await service.sign_transaction(payment, "sending")
+
+    # The unsigned transaction's sequence was not skipped
+    assert [tx["Sequence"] for tx in submitted] == [7]
+    await service.aclose()
+
+
+@pytest.mark.asyncio
+async def test_signing_autofills_from_cached_network_state():
+    app = turnkey_standin()
+    submitted = []
+    methods = Counter()
+    service = AsyncTurnkeyService(
+        "http://turnkey.local",
+        API_PUBLIC_KEY,
+        API_PRIVATE_KEY,
+        "org-1",
+        xrpl_client=rippled_standin(submitted, network_id=21338, methods=methods),
+        transport=httpx.ASGITransport(app=app),
+    )
+    payment = {k: v for k, v in TRANSACTION.items() if k not in ("Account", "Fee")}
+
+    await service.sign_transaction(payment, "sending")
+    await service.sign_transactions([payment, payment], "sending")
+
+    assert [tx["Sequence"] for tx in submitted] == [7, 8, 9]
+    assert all(tx["Account"] == ADDRESS for tx in submitted)
+    assert all(tx["Fee"] == "15" for tx in submitted)
+    assert all(tx["LastLedgerSequence"] == 1020 for tx in submitted)
+    assert all(tx["NetworkID"] == 21338 for tx in submitted)
+    assert methods["server_info"] == methods["fee"] == methods["account_info"] == 1
+    await service.aclose()
+
+
+@pytest.mark.asyncio
+async def test_sign_and_wait_confirms_through_shared_tracker():
+    app = turnkey_standin()
+    methods = Counter()
+    service = AsyncTurnkeyService(
+        "http://turnkey.local",
+        API_PUBLIC_KEY,
+        API_PRIVATE_KEY,
+        "org-1",
+        xrpl_client=rippled_standin([], methods=methods),
+        transport=httpx.ASGITransport(app=app),
+    )
+    service.confirmations.poll_interval = 0.01
+
+    responses = await service.sign_transactions(
+        [TRANSACTION, TRANSACTION, TRANSACTION], "sending", wait=True
+    )
+
+    assert [r.result["hash"] for r in responses] == ["HASH1", "HASH2", "HASH3"]
+    assert all(r.result["validated"] for r in responses)
+    # One batch of lookups for the first validated ledger covers all three
+    assert methods["tx"] == 3
+    await service.aclose()
+
+
+@pytest.mark.asyncio
+async def test_shared_service_follows_pushed_ledgers(monkeypatch):
+    stream = wallet_module.ledger_stream
+    monkeypatch.setattr(wallet_module, "_services", {})
+    monkeypatch.setattr(stream, "_ledger_handlers", [])
+    monkeypatch.setenv("TURNKEY_PRIVATE_KEY", API_PRIVATE_KEY)
+    service = wallet_module.get_wallet_service()
+    service.autofiller._network = {"fee": 12, "network_id": None, "ledger_index": 1000}
+    service.autofiller._fetched_at = time.monotonic()
+
+    stream._handle_ledger(1004)
+    filled, _ = await service.autofiller.fill({**TRANSACTION, "Sequence": 1})
+
+    assert filled["LastLedgerSequence"] == 1004 + service.autofiller.last_ledger_offset
+    assert wallet_module.get_wallet_service() is service
+    assert len(stream._ledger_handlers) == 1
+
+
+def test_stamp_reuses_prefix_and_decodes_to_full_stamp():
+    service = AsyncTurnkeyService(
+        "http://turnkey.local", API_PUBLIC_KEY, API_PRIVATE_KEY, "org-1"
+    )
+
+    for body in (b"{}", b'{"organizationId":"org-1"}', b"x" * 1000):
+        stamp = service._stamp(body)
+        decoded = json.loads(urlsafe_b64decode(stamp + "=" * (-len(stamp) % 4)))
+        signature = bytes.fromhex(decoded["signature"])
+
+        assert stamp.startswith(service._stamp_prefix)
+        assert decoded["publicKey"] == API_PUBLIC_KEY
+        assert decoded["scheme"] == "SIGNATURE_SCHEME_TK_API_P256"
+        # No padding may leak into the signature value itself
+        assert decoded["signature"] == signature.hex()
+        API_KEY.public_key().verify(signature, body, ec.ECDSA(hashes.SHA256()))
+
+
+def test_sync_facade_runs_on_its_own_loop():
+    app = turnkey_standin()
+    submitted = []
+    service = TurnkeyService(
+        "http://turnkey.local",
+        API_PUBLIC_KEY,
+        API_PRIVATE_KEY,
+        "org-1",
+        None,
+        **service_options(app, submitted),
+    )
+
+    response = service.sign_transaction(TRANSACTION, "sending")
+    service.close()
+
+    assert response.result["engine_result"] == "tesSUCCESS"
+    assert submitted[0]["Destination"] == TRANSACTION["Destination"]
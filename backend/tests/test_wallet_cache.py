@@ -0,0 +1,63 @@
+import asyncio
+
+import pytest
+from xrpl.core.keypairs import generate_seed
+from xrpl.wallet import Wallet
+
+from xrp.services import wallet_cache as wallet_cache_module
+from xrp.services.wallet_cache import WalletCache
+
+
+@pytest.fixture
+def derivations(monkeypatch):
+    calls = []
+    derive = Wallet.from_seed
+
+    def counting_from_seed(seed, **kwargs):
+        calls.append(seed)
+        return derive(seed, **kwargs)
+
+    monkeypatch.setattr(wallet_cache_module.Wallet, "from_seed", counting_from_seed)
+    return calls
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_derive_once(derivations):
+    seed = generate_seed()
+    cache = WalletCache()
+
+    wallets = await asyncio.gather(*(cache.get(seed) for _ in range(5)))
+
+    assert len(derivations) == 1
+    assert all(wallet is wallets[0] for wallet in wallets)
+    assert seed not in cache._entries
+
+
+@pytest.mark.asyncio
+async def test_entries_expire_and_are_evicted(derivations):
+    seeds = [generate_seed() for _ in range(3)]
+    cache = WalletCache(max_entries=2)
+
+    for seed in seeds:
+        await cache.get(seed)
+    await cache.get(seeds[0])
+    assert len(derivations) == 4
+
+    cache.ttl = 0
+    await cache.get(seeds[0])
+    assert len(derivations) == 5
+
+
+@pytest.mark.asyncio
+async def test_cancelled_first_caller_does_not_fail_the_others(derivations):
+    seed = generate_seed()
+    cache = WalletCache()
+
+    first = asyncio.ensure_future(cache.get(seed))
+    others = [asyncio.ensure_future(cache.get(seed)) for _ in range(3)]
+    await asyncio.sleep(0)
+    first.cancel()
+
+    wallets = await asyncio.gather(*others)
+    assert all(wallet.classic_address == wallets[0].classic_address for wallet in wallets)
+    assert len(derivations) == 1
@@ -0,0 +1,195 @@
+import asyncio
+import json
+import os
+
+import httpx
+import pytest
+from xrpl.wallet import Wallet
+
+from auth.services.wallet_pool import FaucetFunder, Funder, WalletPool
+from xrp.services.client import PooledJsonRpcClient
+
+
+class InstantFunder(Funder):
+    def __init__(self, delay=0.01, fail=False):
+        self.delay = delay
+        self.fail = fail
+        self.funded = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def fund(self, wallet):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+            if self.fail:
+                raise RuntimeError("faucet down")
+            self.funded.append(wallet.classic_address)
+        finally:
+            self.in_flight -= 1
+
+
+async def settle(pool, size, timeout=2.0):
+    for _ in range(int(timeout / 0.01)):
+        if len(pool) == size and (pool._refill_task is None or pool._refill_task.done()):
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError(f"pool has {len(pool)} wallets, expected {size}")
+
+
+@pytest.mark.asyncio
+async def test_pool_refills_between_watermarks(tmp_path):
+    funder = InstantFunder()
+    pool = WalletPool(funder, str(tmp_path / "pool.json"), low=2, high=5, concurrency=2)
+
+    await pool.start()
+    await settle(pool, 5)
+    assert funder.max_in_flight == 2
+
+    taken = [await pool.take() for _ in range(3)]
+    # Still at the low watermark: no refill yet
+    await settle(pool, 2)
+    assert len(funder.funded) == 5
+
+    taken.append(await pool.take())
+    await settle(pool, 5)
+    assert len(funder.funded) == 9
+    assert len({w.classic_address for w in taken}) == 4
+    assert all(w.classic_address in funder.funded for w in taken)
+    await pool.stop()
+
+
+@pytest.mark.asyncio
+async def test_pool_survives_restart_without_reusing_wallets(tmp_path):
+    path = str(tmp_path / "pool.json")
+    pool = WalletPool(InstantFunder(), path, low=3, high=3)
+    await pool.start()
+    await settle(pool, 3)
+    pool.funder.delay = 10
+    taken = await pool.take()
+    await pool.stop()
+
+    funder = InstantFunder()
+    restored = WalletPool(funder, path, low=1, high=3)
+    await restored.start()
+    wallets = [await restored.take() for _ in range(len(restored))]
+    await restored.stop()
+
+    assert len(wallets) == 2 and not funder.funded
+    assert taken.classic_address not in {w.classic_address for w in wallets}
+    assert all(w.seed for w in wallets)
+    assert oct(os.stat(path).st_mode & 0o777) == "0o600"
+
+
+@pytest.mark.asyncio
+async def test_wallet_stays_pooled_when_the_file_cannot_be_written(tmp_path):
+    pool = WalletPool(InstantFunder(), str(tmp_path / "pool.json"), low=2, high=2)
+    await pool.start()
+    await settle(pool, 2)
+
+    def broken_write(entries):
+        raise OSError("disk full")
+
+    pool._write = broken_write
+    with pytest.raises(OSError):
+        await pool.take()
+    assert len(pool) == 2
+
+
+@pytest.mark.asyncio
+async def test_second_process_on_the_file_funds_on_demand(tmp_path):
+    path = str(tmp_path / "pool.json")
+    owner = WalletPool(InstantFunder(), path, low=2, high=2)
+    await owner.start()
+    await settle(owner, 2)
+
+    funder = InstantFunder()
+    other = WalletPool(funder, path, low=2, high=2)
+    await other.start()
+    wallet = await other.take()
+    await other.stop()
+
+    assert funder.funded == [wallet.classic_address]
+    assert len(other) == 0 and other._refill_task is None
+    assert len(json.load(open(path))) == 2
+    await owner.stop()
+
+
+@pytest.mark.asyncio
+async def test_empty_pool_funds_on_demand(tmp_path):
+    funder = InstantFunder()
+    pool = WalletPool(funder, str(tmp_path / "pool.json"), low=0, high=0)
+
+    wallet = await pool.take()
+
+    assert funder.funded == [wallet.classic_address]
+    assert pool._refill_task is None
+
+
+@pytest.mark.asyncio
+async def test_failed_funding_is_retried(tmp_path):
+    funder = InstantFunder(fail=True)
+    pool = WalletPool(funder, None, low=1, high=2, retry_delay=0.02)
+
+    await pool.start()
+    await asyncio.sleep(0.05)
+    assert len(pool) == 0
+    funder.fail = False
+    await settle(pool, 2)
+    await pool.stop()
+
+
+def faucet_standin(funded, pending_polls=2):
+    polls = {}
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.host == "faucet.local":
+            address = json.loads(request.content)["destination"]
+            funded.append(address)
+            return httpx.Response(
+                200, json={"account": {"address": address}, "amount": 100}
+            )
+        body = json.loads(request.content)
+        account = body["params"][0]["account"]
+        polls[account] = polls.get(account, 0) + 1
+        if account not in funded or polls[account] <= pending_polls:
+            result = {"status": "error", "error": "actNotFound"}
+        else:
+            result = {"status": "success", "account_data": {"Account": account}}
+        return httpx.Response(200, json={"result": result})
+
+    return httpx.MockTransport(handler)
+
+
+@pytest.mark.asyncio
+async def test_faucet_funder_waits_for_validated_account():
+    funded = []
+    transport = faucet_standin(funded)
+    funder = FaucetFunder(
+        PooledJsonRpcClient("http://rippled.local", transport=transport),
+        faucet_url="http://faucet.local/accounts",
+        poll_interval=0.01,
+        transport=transport,
+    )
+    wallet = Wallet.create()
+
+    await funder.fund(wallet)
+
+    assert funded == [wallet.classic_address]
+    await funder.aclose()
+
+
+@pytest.mark.asyncio
+async def test_faucet_funder_times_out():
+    funder = FaucetFunder(
+        PooledJsonRpcClient("http://rippled.local", transport=faucet_standin([], 0)),
+        faucet_url="http://faucet.local/accounts",
+        timeout=0.05,
+        poll_interval=0.01,
+        transport=httpx.MockTransport(lambda request: httpx.Response(200, json={})),
+    )
+
+    with pytest.raises(TimeoutError):
+        await funder.fund(Wallet.create())
+    await funder.aclose()
@@ -0,0 +1,183 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+from xrpl.models.response import Response, ResponseStatus
+from xrpl.models.transactions import AccountSet, Payment, TicketCreate
+
+from tests.test_sequence import AccountClient
+from xrp.services import xrpl_service
+from xrp.services.balance_cache import BalanceCache
+from xrp.services.client import PooledJsonRpcClient
+from xrp.services.confirmations import TransactionExpired
+from xrp.services.sequence import SequenceAllocator
+
+
+@pytest.mark.asyncio
+async def test_get_many_wallet_balances_reports_partial_failures(monkeypatch):
+    in_flight = 0
+    peak = 0
+
+    async def fake_get_wallet_balances(address):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        try:
+            if address == "slow":
+                await asyncio.sleep(1)
+            await asyncio.sleep(0.01)
+            if address == "broken":
+                raise RuntimeError("boom")
+            return {"address": address, "xrp": 1.0, "issued_currencies": {}}
+        finally:
+            in_flight -= 1
+
+    monkeypatch.setattr(xrpl_service, "fetch_wallet_balances", fake_get_wallet_balances)
+
+    addresses = [f"r{i}" for i in range(8)] + ["slow", "broken"]
+    results = await xrpl_service.get_many_wallet_balances(
+        addresses, concurrency=3, timeout=0.2
+    )
+
+    assert peak <= 3
+    assert set(results) == set(addresses)
+    assert results["r0"]["xrp"] == 1.0
+    assert "Timed out" in results["slow"]["error"]
+    assert results["broken"]["error"] == "boom"
+
+
+def rippled_standin():
+    async def handler(request: httpx.Request) -> httpx.Response:
+        body = json.loads(request.content)
+        params = body["params"][0]
+        if body["method"] == "ledger":
+            result = {"status": "success", "ledger_index": 100}
+        elif params["account"] == "rMissing":
+            result = {
+                "status": "error",
+                "error": "actNotFound",
+                "error_message": "Account not found.",
+            }
+        elif body["method"] == "account_info":
+            result = {"status": "success", "account_data": {"Balance": "25000000"}}
+        else:
+            result = {
+                "status": "success",
+                "lines": [{"currency": "SGD", "account": "rIssuer", "balance": "12.5"}],
+            }
+        return httpx.Response(200, json={"result": result})
+
+    return PooledJsonRpcClient(
+        "http://rippled.local", transport=httpx.MockTransport(handler)
+    )
+
+
+@pytest.mark.asyncio
+async def test_get_many_wallet_balances_reports_rippled_errors(monkeypatch):
+    monkeypatch.setattr(xrpl_service, "client", rippled_standin())
+    monkeypatch.setattr(xrpl_service, "balance_cache", BalanceCache())
+
+    results = await xrpl_service.get_many_wallet_balances(["rFunded", "rMissing"])
+
+    assert results["rFunded"] == {
+        "address": "rFunded",
+        "xrp": 25.0,
+        "issued_currencies": {"SGD": 12.5},
+    }
+    assert "actNotFound" in results["rMissing"]["error"]
+    assert "xrp" not in results["rMissing"]
+
+
+@pytest.mark.asyncio
+async def test_ticket_of_failed_submit_stays_leased_until_it_expires(monkeypatch):
+    client = AccountClient(sequence=10, tickets=[5])
+    allocator = SequenceAllocator("rIssuer", ticket_pool_size=1)
+    await allocator.load_tickets(client)
+    expired = asyncio.Event()
+
+    class Signed:
+        last_ledger_sequence = 20
+
+        def get_hash(self):
+            return "ABC"
+
+    class Tracker:
+        async def wait(self, tx_hash, last_ledger_sequence):
+            await expired.wait()
+            raise TransactionExpired(tx_hash)
+
+    async def fake_sign(transaction, client, wallet):
+        return Signed()
+
+    async def fake_submit(signed, client):
+        raise httpx.ReadTimeout("timed out after sending")
+
+    monkeypatch.setattr(xrpl_service, "client", client)
+    monkeypatch.setattr(xrpl_service, "autofill_and_sign", fake_sign)
+    monkeypatch.setattr(xrpl_service, "submit", fake_submit)
+    monkeypatch.setattr(xrpl_service, "confirmations", Tracker())
+
+    with pytest.raises(httpx.ReadTimeout):
+        await xrpl_service.submit_pipelined(
+            AccountSet(account="rIssuer"), wallet=None, allocator=allocator
+        )
+    await asyncio.sleep(0)
+    assert allocator.available_tickets == 0
+    assert allocator.in_doubt == 1
+
+    expired.set()
+    await asyncio.sleep(0.01)
+    assert allocator.available_tickets == 1
+    assert allocator.in_doubt == 0
+
+
+@pytest.mark.asyncio
+async def test_sequence_after_ticket_refill_skips_the_new_tickets(monkeypatch):
+    client = AccountClient(sequence=10)
+    allocator = SequenceAllocator("rIssuer", ticket_pool_size=2)
+    submitted = []
+
+    class Signed:
+        last_ledger_sequence = 20
+
+        def __init__(self, transaction):
+            self.transaction = transaction
+
+        def get_hash(self):
+            return str(len(submitted))
+
+    class Tracker:
+        async def wait(self, tx_hash, last_ledger_sequence):
+            return Response(
+                status=ResponseStatus.SUCCESS,
+                result={"meta": {"TransactionResult": "tesSUCCESS"}},
+            )
+
+    async def fake_sign(transaction, client, wallet):
+        return Signed(transaction)
+
+    async def fake_submit(signed, rippled):
+        tx = signed.transaction
+        assert tx.sequence == client.sequence
+        submitted.append(tx)
+        # A TicketCreate uses one sequence and gives each new ticket the next
+        if isinstance(tx, TicketCreate):
+            client.tickets = list(range(tx.sequence + 1, tx.sequence + 1 + tx.ticket_count))
+            client.sequence += tx.ticket_count + 1
+        else:
+            client.sequence += 1
+        return Response(status=ResponseStatus.SUCCESS, result={"engine_result": "tesSUCCESS"})
+
+    monkeypatch.setattr(xrpl_service, "client", client)
+    monkeypatch.setattr(xrpl_service, "autofill_and_sign", fake_sign)
+    monkeypatch.setattr(xrpl_service, "submit", fake_submit)
+    monkeypatch.setattr(xrpl_service, "confirmations", Tracker())
+
+    xrpl_service._refill_tickets(allocator, wallet=None)
+    await xrpl_service._ticket_refills[allocator.account]
+    payment = Payment(account="rIssuer", destination="rDest", amount="10")
+    await xrpl_service.submit_pipelined(payment, None, allocator, use_tickets=False)
+
+    assert [tx.sequence for tx in submitted] == [10, 13]
+    assert allocator.available_tickets == 2
@@ -1,12 +1,18 @@
 import os
+import sys
+from pathlib import Path
 
 from dotenv import load_dotenv
-from xrpl.clients import JsonRpcClient
 from xrpl.models.requests import AccountInfo, AccountLines
 
-# Load environment variables
+# Load environment variables before the client reads XRPL_RPC_URL(S)
 load_dotenv()
 
+# Run as a script (python xrp/check_balances.py), so make the backend root importable
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from xrp.services.client import get_sync_client  # noqa: E402
+
 # Get wallet information from .env
 ISSUER_ADDR = os.getenv("ISSUER_ADDR")
 ISSUER_SEED = os.getenv("ISSUER_SEED")
@@ -15,8 +21,8 @@ LENDER_SEED = os.getenv("LENDER_SEED")
 BORROWER_ADDR = os.getenv("BORROWER_ADDR")
 BORROWER_SEED = os.getenv("BORROWER_SEED")
 
-# Connect to testnet
-client = JsonRpcClient("https://s.altnet.rippletest.net:51234")
+# Shared pooled client for XRPL_RPC_URLS (testnet by default)
+client = get_sync_client()
 
 
 def get_xrp_balance(address):
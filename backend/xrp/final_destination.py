@@ -1,19 +1,25 @@
 import os
+import sys
+from pathlib import Path
 import time
 
 import xrpl
 from dotenv import load_dotenv
-from xrpl.clients import JsonRpcClient
 from xrpl.models.amounts import IssuedCurrencyAmount
 from xrpl.models.transactions import AccountSet, Payment, TrustSet
 from xrpl.transaction import submit_and_wait
 from xrpl.wallet import Wallet
 
-# Load environment variables
+# Load environment variables before the client reads XRPL_RPC_URL(S)
 load_dotenv()
 
-# Connect to testnet
-client = JsonRpcClient("https://s.altnet.rippletest.net:51234")
+# Run as a script (python xrp/final_destination.py), so make the backend root importable
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from xrp.services.client import get_sync_client  # noqa: E402
+
+# Shared pooled client for XRPL_RPC_URLS (testnet by default)
+client = get_sync_client()
 
 # Get wallet information from .env
 issuer_addr = os.getenv("ISSUER_ADDR")
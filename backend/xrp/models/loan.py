@@ -1,4 +1,4 @@
-from typing import Dict, Optional
+from typing import Dict, List, Optional
 
 from pydantic import BaseModel
 
@@ -23,6 +23,7 @@ class WalletBalance(BaseModel):
     address: str
     xrp: Optional[float] = None
     issued_currencies: Optional[Dict[str, float]] = None
+    error: Optional[str] = None
 
 
 class ApiResponse(BaseModel):
@@ -30,3 +31,18 @@ class ApiResponse(BaseModel):
     message: str
     data: Optional[Dict] = None
     error: Optional[str] = None
+
+
+class JobStep(BaseModel):
+    name: str
+    at: float
+
+
+class JobStatus(BaseModel):
+    id: str
+    kind: str
+    status: str = "queued"  # queued | running | succeeded | failed
+    steps: List[JobStep] = []
+    result: Optional[ApiResponse] = None
+    created_at: float
+    finished_at: Optional[float] = None
@@ -1,6 +1,17 @@
-from fastapi import APIRouter
+import os
+
+from fastapi import APIRouter, Depends
+
+from auth.dependencies import require_token
 
 from .loan_router import loan_router
 
+# Require a bearer token from /auth/verify on every /xrp/loan route
+XRP_REQUIRE_AUTH = os.getenv("XRP_REQUIRE_AUTH", "false").lower() in ("1", "true", "yes")
+
 xrp_router = APIRouter()
-xrp_router.include_router(loan_router, prefix="/loan")
+xrp_router.include_router(
+    loan_router,
+    prefix="/loan",
+    dependencies=[Depends(require_token)] if XRP_REQUIRE_AUTH else [],
+)
@@ -1,42 +1,100 @@
-from typing import Dict, List
+from typing import Callable, Dict, List
 
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException, Response, status
 
-from ..models.loan import ApiResponse, LoanRequest, RepaymentRequest, WalletBalance
+from ..models.loan import (
+    ApiResponse,
+    JobStatus,
+    LoanRequest,
+    RepaymentRequest,
+    WalletBalance,
+)
+from ..services.jobs import JobQueueFull, Workflow, loan_jobs
 from ..services.xrpl_service import (
     BORROWER_ADDR,
     ISSUER_ADDR,
     LENDER_ADDR,
-    create_trust_line,
+    ensure_default_ripple,
+    ensure_trust_line,
     get_issued_currency_balance,
+    get_many_wallet_balances,
     get_wallet_balances,
     issue_currency,
     send_loan,
     send_repayment,
-    setup_default_ripple,
 )
 
 loan_router = APIRouter()
 
 
+def _no_progress(step: str) -> None:
+    pass
+
+
+def _enqueue(kind: str, workflow: Workflow, response: Response) -> ApiResponse:
+    """Queue a loan workflow and return the job id, or 503 if the queue is full"""
+    try:
+        job = loan_jobs.submit(kind, workflow)
+    except JobQueueFull as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"Too many loan jobs in progress: {e}",
+            headers={"Retry-After": "5"},
+        )
+    response.status_code = status.HTTP_202_ACCEPTED
+    return ApiResponse(
+        success=True,
+        message=f"Queued {kind} job",
+        data={"job_id": job.id, "status_url": f"jobs/{job.id}"},
+    )
+
+
+def _validate_amount(amount: str) -> None:
+    try:
+        valid = float(amount) > 0
+    except ValueError:
+        valid = False
+    if not valid:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"Invalid amount: {amount}",
+        )
+
+
 @loan_router.post("/fund-loan", response_model=ApiResponse)
-async def fund_loan(loan_req: LoanRequest):
+async def fund_loan(loan_req: LoanRequest, response: Response, async_mode: bool = False):
     """
     Fund a loan from lender to borrower.
     This sets up all necessary components including:
     - DefaultRipple on issuer
     - Trust lines for lender and borrower
     - The actual loan payment
+
+    With ``async_mode=true`` the workflow is queued and a job id is returned
+    immediately; poll ``GET /jobs/{job_id}`` for progress and the result.
     """
+    if async_mode:
+        _validate_amount(loan_req.amount)
+        return _enqueue(
+            "fund-loan", lambda report: _fund_loan(loan_req, report), response
+        )
+    return await _fund_loan(loan_req)
+
+
+async def _fund_loan(
+    loan_req: LoanRequest, report: Callable[[str], None] = _no_progress
+) -> ApiResponse:
     # 1. Set up DefaultRipple on issuer (if not done already)
-    success, message = await setup_default_ripple()
+    report("Setting up issuer")
+    success, message = await ensure_default_ripple()
     if not success:
         return ApiResponse(
             success=False, message="Failed to set up issuer", error=message
         )
 
-    # 2. Create trust line for lender
-    success, message = await create_trust_line(
+    # 2. Create trust line for lender (if it does not exist yet)
+    report("Creating lender trust line")
+    success, message = await ensure_trust_line(
         loan_req.lender_address, loan_req.lender_seed, loan_req.currency_code
     )
     if not success:
@@ -49,6 +107,7 @@ async def fund_loan(loan_req: LoanRequest):
     # For now, we'll assume the borrower trust line is already established
 
     # 4. Issue currency to lender if needed (optional)
+    report("Checking lender balance")
     lender_balance = await get_issued_currency_balance(
         loan_req.lender_address, loan_req.currency_code
     )
@@ -57,6 +116,7 @@ async def fund_loan(loan_req: LoanRequest):
     if lender_balance < loan_amount:
         # Lender needs more funds
         amount_needed = str(loan_amount - lender_balance + 10)  # Add a buffer
+        report("Issuing currency to lender")
         success, message = await issue_currency(
             loan_req.lender_address, amount_needed, loan_req.currency_code
         )
@@ -68,6 +128,7 @@ async def fund_loan(loan_req: LoanRequest):
             )
 
     # 5. Send the loan
+    report("Sending loan")
     success, message, data = await send_loan(
         loan_req.lender_address,
         loan_req.lender_seed,
@@ -80,6 +141,7 @@ async def fund_loan(loan_req: LoanRequest):
         return ApiResponse(success=False, message="Failed to send loan", error=message)
 
     # 6. Get updated balances
+    report("Reading updated balances")
     lender_balance_after = await get_issued_currency_balance(
         loan_req.lender_address, loan_req.currency_code
     )
@@ -102,9 +164,27 @@ async def fund_loan(loan_req: LoanRequest):
 
 
 @loan_router.post("/repay-loan", response_model=ApiResponse)
-async def repay_loan(repayment_req: RepaymentRequest):
-    """Send a repayment from borrower to lender"""
+async def repay_loan(
+    repayment_req: RepaymentRequest, response: Response, async_mode: bool = False
+):
+    """Send a repayment from borrower to lender
+
+    With ``async_mode=true`` the repayment is queued and a job id is returned
+    immediately; poll ``GET /jobs/{job_id}`` for progress and the result.
+    """
+    if async_mode:
+        _validate_amount(repayment_req.amount)
+        return _enqueue(
+            "repay-loan", lambda report: _repay_loan(repayment_req, report), response
+        )
+    return await _repay_loan(repayment_req)
+
+
+async def _repay_loan(
+    repayment_req: RepaymentRequest, report: Callable[[str], None] = _no_progress
+) -> ApiResponse:
     # Send the repayment
+    report("Sending repayment")
     success, message, data = await send_repayment(
         repayment_req.borrower_address,
         repayment_req.borrower_seed,
@@ -119,6 +199,7 @@ async def repay_loan(repayment_req: RepaymentRequest):
         )
 
     # Get updated balances
+    report("Reading updated balances")
     lender_balance_after = await get_issued_currency_balance(
         repayment_req.lender_address, repayment_req.currency_code
     )
@@ -140,6 +221,15 @@ async def repay_loan(repayment_req: RepaymentRequest):
     )
 
 
+@loan_router.get("/jobs/{job_id}", response_model=JobStatus)
+async def get_job(job_id: str):
+    """Get progress and, once finished, the result of a queued loan job"""
+    job = loan_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
 @loan_router.get("/balance/{address}", response_model=WalletBalance)
 async def get_balance(address: str):
     """Get balances for a specific wallet address"""
@@ -170,9 +260,12 @@ async def get_borrower_balance():
 
 @loan_router.post("/all-balances", response_model=Dict[str, WalletBalance])
 async def get_all_balances(addresses: List[str]):
-    """Get balances for multiple wallet addresses"""
-    results = {}
-    for address in addresses:
-        balances = await get_wallet_balances(address)
-        results[address] = WalletBalance(**balances)
-    return results
+    """Get balances for multiple wallet addresses
+
+    Addresses are queried concurrently; any address that fails or times out
+    is returned with its ``error`` field set rather than failing the request.
+    """
+    results = await get_many_wallet_balances(addresses)
+    return {
+        address: WalletBalance(**balances) for address, balances in results.items()
+    }
@@ -0,0 +1,83 @@
+import time
+from typing import Dict, FrozenSet, Optional, Tuple
+
+from xrpl.asyncio.clients import Client
+from xrpl.models.requests import AccountLines
+
+from .balance_cache import BalanceCache
+
+# AccountRoot flag set by AccountSet asfDefaultRipple
+LSF_DEFAULT_RIPPLE = 0x00800000
+
+
+class AccountStateCache:
+    """
+    Remembers the account settings that loan setup transactions establish:
+    whether an account has DefaultRipple enabled and which trust lines it
+    holds. DefaultRipple is read through the balance cache; trust lines are
+    read for one issuer at a time (every page), and only a line with a
+    non-zero limit counts. Both are kept for ``ttl`` seconds, or until
+    ``invalidate`` is called after a setup transaction.
+    """
+
+    def __init__(self, balance_cache: BalanceCache, ttl: float = 300.0):
+        self.balance_cache = balance_cache
+        self.ttl = ttl
+        self._default_ripple: Dict[str, Tuple[float, bool]] = {}
+        # (address, issuer) -> currencies the address trusts the issuer for
+        self._trust_lines: Dict[Tuple[str, str], Tuple[float, FrozenSet[str]]] = {}
+
+    def invalidate(self, address: str) -> None:
+        self._default_ripple.pop(address, None)
+        for key in [key for key in self._trust_lines if key[0] == address]:
+            del self._trust_lines[key]
+
+    async def has_default_ripple(self, client: Client, address: str) -> bool:
+        cached = self._fresh(self._default_ripple.get(address))
+        if cached is not None:
+            return cached
+
+        response = await self.balance_cache.account_info(client, address)
+        if not response.is_successful():
+            return False
+        flags = int(response.result["account_data"].get("Flags", 0))
+        enabled = bool(flags & LSF_DEFAULT_RIPPLE)
+        self._default_ripple[address] = (time.monotonic(), enabled)
+        return enabled
+
+    async def has_trust_line(
+        self, client: Client, address: str, currency_code: str, issuer: str
+    ) -> bool:
+        currencies = self._fresh(self._trust_lines.get((address, issuer)))
+        if currencies is None:
+            currencies = await self._trusted_currencies(client, address, issuer)
+            if currencies is None:
+                return False
+            self._trust_lines[(address, issuer)] = (time.monotonic(), currencies)
+        return currency_code in currencies
+
+    async def _trusted_currencies(
+        self, client: Client, address: str, issuer: str
+    ) -> Optional[FrozenSet[str]]:
+        currencies = set()
+        marker = None
+        while True:
+            response = await client.request(
+                AccountLines(
+                    account=address, peer=issuer, ledger_index="validated", marker=marker
+                )
+            )
+            if not response.is_successful():
+                return None
+            for line in response.result.get("lines", []):
+                # A zero limit is what is left after a trust line is removed
+                if line["account"] == issuer and float(line.get("limit", 0)) != 0:
+                    currencies.add(line["currency"])
+            marker = response.result.get("marker")
+            if marker is None:
+                return frozenset(currencies)
+
+    def _fresh(self, entry: Optional[Tuple[float, object]]):
+        if entry is None or time.monotonic() - entry[0] > self.ttl:
+            return None
+        return entry[1]
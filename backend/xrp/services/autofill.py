@@ -0,0 +1,128 @@
+import asyncio
+import os
+import time
+from typing import Dict, Optional, Tuple
+
+from xrpl.asyncio.clients import Client
+from xrpl.models.requests import Fee, ServerInfo
+
+from .sequence import SequenceAllocator
+
+# Seconds a fee/server_info snapshot is reused before it is refreshed
+AUTOFILL_CACHE_TTL = float(os.getenv("AUTOFILL_CACHE_TTL", "5"))
+# Ledgers after the last known validated ledger before a transaction expires
+LAST_LEDGER_OFFSET = int(os.getenv("LAST_LEDGER_OFFSET", "20"))
+# Upper bound on the fee filled in automatically (drops)
+MAX_FEE_DROPS = int(os.getenv("MAX_FEE_DROPS", "2000000"))
+
+# Networks with an ID above this require NetworkID on every transaction
+RESTRICTED_NETWORK_ID = 1024
+
+
+class Autofiller:
+    """
+    Fills Fee, Sequence, LastLedgerSequence and NetworkID for transactions
+    signed outside xrpl-py (e.g. by Turnkey) without per-transaction rippled
+    calls.
+
+    Fee, network ID and the validated ledger index come from a fee +
+    server_info snapshot shared by all callers and refreshed every ``ttl``
+    seconds. Sequences come from a local SequenceAllocator per account, so
+    only the first transaction from an account reads its sequence.
+    """
+
+    def __init__(
+        self,
+        client: Client,
+        ttl: float = AUTOFILL_CACHE_TTL,
+        last_ledger_offset: int = LAST_LEDGER_OFFSET,
+        max_fee_drops: int = MAX_FEE_DROPS,
+    ):
+        self.client = client
+        self.ttl = ttl
+        self.last_ledger_offset = last_ledger_offset
+        self.max_fee_drops = max_fee_drops
+        self._network: Optional[Dict[str, Optional[int]]] = None
+        self._fetched_at = 0.0
+        self._refresh: Optional[asyncio.Future] = None
+        self._allocators: Dict[str, SequenceAllocator] = {}
+
+    def allocator(self, account: str) -> SequenceAllocator:
+        if account not in self._allocators:
+            self._allocators[account] = SequenceAllocator(account)
+        return self._allocators[account]
+
+    def note_validated_ledger(self, ledger_index: int) -> None:
+        """Move LastLedgerSequence forward from a pushed ledger index"""
+        if self._network is not None and ledger_index > self._network["ledger_index"]:
+            self._network["ledger_index"] = ledger_index
+
+    async def network(self) -> Dict[str, Optional[int]]:
+        """Cached fee (drops), network ID and validated ledger index"""
+        if self._network is not None and time.monotonic() - self._fetched_at < self.ttl:
+            return self._network
+
+        if self._refresh is None:
+            self._refresh = asyncio.ensure_future(self._fetch_network())
+        refresh = self._refresh
+        try:
+            network = await asyncio.shield(refresh)
+        finally:
+            if self._refresh is refresh and refresh.done():
+                self._refresh = None
+        if self._network is not None:
+            # Keep a newer ledger index pushed in while the refresh was running
+            network["ledger_index"] = max(
+                network["ledger_index"], self._network["ledger_index"]
+            )
+        self._network = network
+        self._fetched_at = time.monotonic()
+        return network
+
+    async def fill(self, transaction: dict) -> Tuple[dict, Optional[Dict[str, int]]]:
+        """
+        Return the transaction with missing fields filled in, and the sequence
+        lease to ``release`` once its engine result is known (None when the
+        caller supplied Sequence or TicketSequence).
+        """
+        network = await self.network()
+        filled = dict(transaction)
+        filled.setdefault("Fee", str(network["fee"]))
+        filled.setdefault(
+            "LastLedgerSequence", network["ledger_index"] + self.last_ledger_offset
+        )
+        network_id = network["network_id"]
+        if network_id is not None and network_id > RESTRICTED_NETWORK_ID:
+            filled.setdefault("NetworkID", network_id)
+
+        lease = None
+        if "Sequence" not in filled and "TicketSequence" not in filled:
+            lease = await self.allocator(filled["Account"]).acquire(
+                self.client, use_tickets=False
+            )
+            filled["Sequence"] = lease["sequence"]
+        return filled, lease
+
+    def release(
+        self, account: str, lease: Optional[Dict[str, int]], engine_result: str
+    ) -> None:
+        if lease is not None:
+            self.allocator(account).release(lease, engine_result)
+
+    async def _fetch_network(self) -> Dict[str, Optional[int]]:
+        info_response, fee_response = await asyncio.gather(
+            self.client.request(ServerInfo()), self.client.request(Fee())
+        )
+        if not info_response.is_successful() or not fee_response.is_successful():
+            raise RuntimeError(
+                f"Unable to read network fee: {info_response.result} {fee_response.result}"
+            )
+
+        info = info_response.result["info"]
+        drops = fee_response.result["drops"]
+        fee = max(int(drops["base_fee"]), int(drops["open_ledger_fee"]))
+        return {
+            "fee": min(fee, self.max_fee_drops),
+            "network_id": info.get("network_id"),
+            "ledger_index": int(info["validated_ledger"]["seq"]),
+        }
@@ -0,0 +1,178 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Iterable, Optional, Set, Tuple
+
+from xrpl.asyncio.clients import Client
+from xrpl.models.requests import AccountInfo, AccountLines, Ledger
+from xrpl.models.response import Response
+
+
+class BalanceCache:
+    """
+    LRU cache of AccountInfo/AccountLines responses keyed by
+    (address, validated ledger index).
+
+    A validated ledger never changes, so a response read against it can be
+    served locally until a newer ledger is validated. The current validated
+    ledger index is itself cached for ``ledger_ttl`` seconds and shared by all
+    addresses. Concurrent reads for the same key share one in-flight request.
+
+    While a ledger subscription is live (``follow_stream``) the validated
+    index is pushed in instead of polled, and responses for watched
+    addresses are kept across ledgers until ``invalidate`` is called for them
+    or ``max_age_ledgers`` ledgers have been validated since they were read,
+    so a dropped or filtered stream message cannot leave a balance stale.
+    """
+
+    def __init__(
+        self, max_entries: int = 1024, ledger_ttl: float = 1.0, max_age_ledgers: int = 20
+    ):
+        self.max_entries = max_entries
+        self.ledger_ttl = ledger_ttl
+        self.max_age_ledgers = max_age_ledgers
+        # (address, ledger index) -> {"ledger_index": read at, "info"/"lines":
+        # future}; watched addresses use None as the ledger index
+        self._entries: "OrderedDict[Tuple[str, Optional[int]], Dict]" = OrderedDict()
+        self._watched: Set[str] = set()
+        self._stream_driven = False
+        self._ledger_index: Optional[int] = None
+        self._ledger_checked_at = 0.0
+        self._ledger_lookup: Optional[asyncio.Future] = None
+
+    def note_validated_ledger(self, ledger_index: int) -> None:
+        """Record a validated ledger index learned elsewhere (e.g. a tx result)"""
+        if self._ledger_index is None or ledger_index > self._ledger_index:
+            self._ledger_index = ledger_index
+            self._ledger_checked_at = time.monotonic()
+
+    def follow_stream(self, watched: Iterable[str] = ()) -> None:
+        """Use pushed ledger indexes and keep watched addresses across ledgers"""
+        self._stream_driven = True
+        for address in watched:
+            self.watch(address)
+
+    def unfollow_stream(self) -> None:
+        """Go back to polling the validated ledger and keying every read by it"""
+        self._stream_driven = False
+        for address in list(self._watched):
+            self.invalidate(address)
+        self._watched.clear()
+
+    def watch(self, address: str) -> None:
+        if self._stream_driven and address not in self._watched:
+            self._watched.add(address)
+            self.invalidate(address)
+
+    def unwatch(self, address: str) -> None:
+        """Key an address's reads by ledger again, e.g. once its subscription is gone"""
+        if address in self._watched:
+            self._watched.discard(address)
+            self.invalidate(address)
+
+    def expire_ledger(self) -> None:
+        """Force the next read to look up the validated ledger index again"""
+        self._ledger_checked_at = 0.0
+
+    def invalidate(self, address: str) -> None:
+        """Drop every cached response for an address"""
+        for key in [key for key in self._entries if key[0] == address]:
+            del self._entries[key]
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    async def validated_ledger_index(self, client: Client) -> int:
+        fresh = (
+            self._stream_driven
+            or time.monotonic() - self._ledger_checked_at < self.ledger_ttl
+        )
+        if self._ledger_index is not None and fresh:
+            return self._ledger_index
+
+        if self._ledger_lookup is None:
+            self._ledger_lookup = asyncio.ensure_future(self._fetch_ledger_index(client))
+        lookup = self._ledger_lookup
+        try:
+            ledger_index = await asyncio.shield(lookup)
+        finally:
+            if self._ledger_lookup is lookup and lookup.done():
+                self._ledger_lookup = None
+        self.note_validated_ledger(ledger_index)
+        return self._ledger_index
+
+    async def account_info(self, client: Client, address: str) -> Response:
+        return await self._read(
+            client,
+            address,
+            "info",
+            lambda ledger_index: client.request(
+                AccountInfo(account=address, ledger_index=ledger_index)
+            ),
+        )
+
+    async def account_lines(self, client: Client, address: str) -> Response:
+        return await self._read(
+            client,
+            address,
+            "lines",
+            lambda ledger_index: client.request(
+                AccountLines(account=address, ledger_index=ledger_index)
+            ),
+        )
+
+    async def _fetch_ledger_index(self, client: Client) -> int:
+        response = await client.request(Ledger(ledger_index="validated"))
+        if not response.is_successful():
+            raise RuntimeError(
+                f"Unable to look up validated ledger: {response.result}"
+            )
+        return int(response.result["ledger_index"])
+
+    async def _read(
+        self,
+        client: Client,
+        address: str,
+        kind: str,
+        fetch: Callable[[int], Awaitable[Response]],
+    ) -> Response:
+        ledger_index = await self.validated_ledger_index(client)
+        watched = address in self._watched
+        key = (address, None if watched else ledger_index)
+
+        entry = self._entries.get(key)
+        if (
+            entry is not None
+            and watched
+            and ledger_index - entry["ledger_index"] >= self.max_age_ledgers
+        ):
+            del self._entries[key]
+            entry = None
+        if entry is None:
+            entry = self._entries[key] = {"ledger_index": ledger_index}
+        self._entries.move_to_end(key)
+
+        future = entry.get(kind)
+        if future is None:
+            future = entry[kind] = asyncio.ensure_future(fetch(ledger_index))
+            self._evict()
+
+        try:
+            response = await asyncio.shield(future)
+        except Exception:
+            self._forget(key, kind, future)
+            raise
+        if not response.is_successful():
+            self._forget(key, kind, future)
+        return response
+
+    def _forget(
+        self, key: Tuple[str, Optional[int]], kind: str, future: asyncio.Future
+    ) -> None:
+        entry = self._entries.get(key)
+        if entry is not None and entry.get(kind) is future:
+            del entry[kind]
+
+    def _evict(self) -> None:
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
@@ -0,0 +1,467 @@
+import asyncio
+import os
+import time
+from collections import deque
+from json import JSONDecodeError
+from typing import Callable, Dict, List, Optional, Sequence, Union
+from urllib.parse import urlsplit
+
+import httpx
+from xrpl.asyncio.clients import AsyncJsonRpcClient
+from xrpl.asyncio.clients.client import REQUEST_TIMEOUT
+from xrpl.asyncio.clients.exceptions import XRPLRequestFailureException
+from xrpl.asyncio.clients.utils import json_to_response, request_to_json_rpc
+from xrpl.clients import JsonRpcClient
+from xrpl.models.requests import ServerInfo
+from xrpl.models.requests.request import Request
+from xrpl.models.response import Response
+
+try:
+    import h2  # noqa: F401
+
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+DEFAULT_RPC_URL = "https://s.altnet.rippletest.net:51234"
+# Connection pool size per rippled endpoint
+XRPL_POOL_SIZE = int(os.getenv("XRPL_POOL_SIZE", "20"))
+# Seconds allowed for a single JSON-RPC request
+XRPL_REQUEST_TIMEOUT = float(os.getenv("XRPL_REQUEST_TIMEOUT", "10"))
+# Send a duplicate read to a second endpoint when the first is slower than its p95
+XRPL_HEDGE_READS = os.getenv("XRPL_HEDGE_READS", "false").lower() in ("1", "true")
+# Hedge delay (seconds) used until an endpoint has enough latency samples
+XRPL_HEDGE_DELAY = float(os.getenv("XRPL_HEDGE_DELAY", "0.5"))
+# Seconds between server_info health checks
+XRPL_HEALTH_CHECK_INTERVAL = float(os.getenv("XRPL_HEALTH_CHECK_INTERVAL", "30"))
+
+# Read-only methods that are safe to send to two endpoints at once
+HEDGED_METHODS = {"account_info", "account_lines", "account_objects"}
+
+# server_state values of a node that is in sync with the network
+HEALTHY_STATES = {"full", "proposing", "validating"}
+
+# Consecutive failures before an endpoint is taken out of rotation
+FAILURE_THRESHOLD = 3
+
+# Latency samples kept per endpoint for the p95 estimate
+LATENCY_WINDOW = 200
+MIN_LATENCY_SAMPLES = 20
+
+
+def redact_url(url: str) -> str:
+    """
+    Scheme, host and port of an endpoint URL. Providers put API keys in the
+    path, query or userinfo, so stats never report more than this.
+    """
+    parts = urlsplit(url)
+    host = parts.hostname or ""
+    if parts.port is not None:
+        host = f"{host}:{parts.port}"
+    return f"{parts.scheme}://{host}"
+
+
+class Endpoint:
+    """Health and latency of one rippled endpoint"""
+
+    def __init__(self, url: str, alpha: float = 0.2):
+        self.url = url
+        self.alpha = alpha
+        self.healthy = True
+        self.ewma: Optional[float] = None
+        self.failures = 0
+        self.samples: deque = deque(maxlen=LATENCY_WINDOW)
+
+    def record_latency(self, latency: float, sample: bool = True) -> None:
+        if sample:
+            self.samples.append(latency)
+        if self.ewma is None:
+            self.ewma = latency
+        else:
+            self.ewma = self.alpha * latency + (1 - self.alpha) * self.ewma
+
+    def record_success(self, latency: float, sample: bool = True) -> None:
+        self.record_latency(latency, sample)
+        self.failures = 0
+        self.healthy = True
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.failures >= FAILURE_THRESHOLD:
+            self.healthy = False
+
+    def p95(self) -> Optional[float]:
+        if len(self.samples) < MIN_LATENCY_SAMPLES:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+    def stats(self) -> Dict:
+        return {
+            "url": redact_url(self.url),
+            "healthy": self.healthy,
+            "ewma_latency": self.ewma,
+            "p95_latency": self.p95(),
+            "failures": self.failures,
+        }
+
+
+class _Routing:
+    """Endpoint selection, pool settings and counters shared by both clients"""
+
+    def _init_routing(self, urls: List[str], pool_size: int, timeout: float) -> None:
+        self.endpoints = [Endpoint(url) for url in urls]
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.in_flight = 0
+        self.total_requests = 0
+        self.failed_requests = 0
+        self.hedged_requests = 0
+
+    def _ranked(self) -> List[Endpoint]:
+        """Healthy endpoints fastest first (unmeasured ones first of all),
+        then unhealthy ones as a last resort"""
+        healthy = sorted(
+            (e for e in self.endpoints if e.healthy), key=lambda e: e.ewma or 0.0
+        )
+        return healthy + [e for e in self.endpoints if not e.healthy]
+
+    def _limits(self) -> httpx.Limits:
+        connections = self.pool_size * len(self.endpoints)
+        return httpx.Limits(
+            max_connections=connections, max_keepalive_connections=connections
+        )
+
+    def _start(self) -> float:
+        self.in_flight += 1
+        self.total_requests += 1
+        return time.monotonic()
+
+    def _finish(
+        self,
+        endpoint: Endpoint,
+        started: float,
+        response: Optional[httpx.Response] = None,
+        error: Optional[Exception] = None,
+        sample: bool = True,
+    ) -> Response:
+        """
+        Update counters and endpoint health for one HTTP exchange. With
+        ``sample=False`` the latency feeds the EWMA but not the p95 window.
+        """
+        self.in_flight -= 1
+        if error is None and response.status_code >= 500:
+            error = XRPLRequestFailureException(
+                {"error": response.status_code, "error_message": response.text}
+            )
+        if error is not None:
+            self.failed_requests += 1
+            endpoint.record_failure()
+            raise error
+        endpoint.record_success(time.monotonic() - started, sample)
+        return _to_response(response)
+
+    def _record_health(self, endpoint: Endpoint, response: Response) -> None:
+        state = response.result.get("info", {}).get("server_state")
+        endpoint.healthy = response.is_successful() and state in HEALTHY_STATES
+
+    def stats(self) -> Dict:
+        return {
+            "url": redact_url(self.url),
+            "pool_size": self.pool_size,
+            "timeout": self.timeout,
+            "http2": HTTP2_AVAILABLE,
+            "in_flight": self.in_flight,
+            "total_requests": self.total_requests,
+            "failed_requests": self.failed_requests,
+            "hedged_requests": self.hedged_requests,
+            "endpoints": [endpoint.stats() for endpoint in self.endpoints],
+        }
+
+
+def _to_response(response: httpx.Response) -> Response:
+    try:
+        return json_to_response(response.json())
+    except JSONDecodeError:
+        raise XRPLRequestFailureException(
+            {"error": response.status_code, "error_message": response.text}
+        )
+
+
+class LoopClients:
+    """
+    One httpx.AsyncClient per event loop, built by ``factory`` the first time
+    that loop asks for it. Pools of closed loops are dropped (their
+    connections can no longer be used or closed); ``aclose`` closes the
+    rest, handing pools of other running loops back to their own loop.
+    """
+
+    def __init__(self, factory: Callable[[], httpx.AsyncClient]):
+        self.factory = factory
+        self.pools: Dict[asyncio.AbstractEventLoop, httpx.AsyncClient] = {}
+
+    def current(self) -> Optional[httpx.AsyncClient]:
+        """The pool of the running event loop, if one has been created"""
+        return self.pools.get(asyncio.get_running_loop())
+
+    def get(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        http = self.pools.get(loop)
+        if http is None:
+            for owner in [owner for owner in self.pools if owner.is_closed()]:
+                del self.pools[owner]
+            http = self.pools[loop] = self.factory()
+        return http
+
+    async def aclose(self) -> None:
+        loop = asyncio.get_running_loop()
+        pools, self.pools = self.pools, {}
+        for owner, http in pools.items():
+            if owner is loop:
+                await http.aclose()
+            elif owner.is_running():
+                asyncio.run_coroutine_threadsafe(http.aclose(), owner)
+
+
+class PooledJsonRpcClient(_Routing, AsyncJsonRpcClient):
+    """
+    AsyncJsonRpcClient that keeps one pooled (HTTP/2 where available)
+    httpx.AsyncClient instead of opening a connection per request.
+
+    Given several endpoints it sends each request to the healthy endpoint
+    with the lowest EWMA latency and fails over to the next on transport
+    errors or 5xx responses. With ``hedge`` enabled, reads in HEDGED_METHODS
+    are duplicated to the second-best endpoint once the first has taken
+    longer than its p95 latency; the first answer wins.
+
+    Pools are created lazily, one per event loop that uses the client, and
+    dropped once their loop is closed.
+    """
+
+    def __init__(
+        self,
+        urls: Union[str, Sequence[str]],
+        pool_size: int = XRPL_POOL_SIZE,
+        timeout: float = XRPL_REQUEST_TIMEOUT,
+        hedge: bool = XRPL_HEDGE_READS,
+        hedge_delay: float = XRPL_HEDGE_DELAY,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        urls = [urls] if isinstance(urls, str) else list(urls)
+        super().__init__(urls[0])
+        self._init_routing(urls, pool_size, timeout)
+        self.hedge = hedge
+        self.hedge_delay = hedge_delay
+        self._transport = transport
+        self._clients = LoopClients(
+            lambda: httpx.AsyncClient(
+                http2=HTTP2_AVAILABLE,
+                limits=self._limits(),
+                timeout=self.timeout,
+                transport=self._transport,
+            )
+        )
+        self._health_task: Optional[asyncio.Task] = None
+
+    @property
+    def _http(self) -> Optional[httpx.AsyncClient]:
+        return self._clients.current()
+
+    def _client(self) -> httpx.AsyncClient:
+        return self._clients.get()
+
+    async def _request_impl(
+        self, request: Request, *, timeout: float = REQUEST_TIMEOUT
+    ) -> Response:
+        # The pool's timeout policy applies to every request
+        payload = request_to_json_rpc(request)
+        candidates = self._ranked()
+        if self.hedge and request.method in HEDGED_METHODS and len(candidates) > 1:
+            return await self._hedged(payload, candidates)
+        return await self._failover(payload, candidates)
+
+    async def _post(
+        self, endpoint: Endpoint, payload: Dict, sample: bool = True
+    ) -> Response:
+        started = self._start()
+        try:
+            response = await self._client().post(endpoint.url, json=payload)
+        except asyncio.CancelledError:
+            # Lost a hedge race: the elapsed time is a lower bound on latency
+            self.in_flight -= 1
+            endpoint.record_latency(time.monotonic() - started)
+            raise
+        except Exception as e:
+            return self._finish(endpoint, started, error=e)
+        return self._finish(endpoint, started, response, sample=sample)
+
+    async def _failover(self, payload: Dict, candidates: List[Endpoint]) -> Response:
+        error: Optional[Exception] = None
+        for endpoint in candidates:
+            try:
+                return await self._post(endpoint, payload)
+            except (httpx.HTTPError, XRPLRequestFailureException) as e:
+                error = e
+        raise error
+
+    async def _hedged(self, payload: Dict, candidates: List[Endpoint]) -> Response:
+        primary, backup = candidates[0], candidates[1]
+        first = asyncio.ensure_future(self._post(primary, payload))
+        delay = primary.p95() or self.hedge_delay
+        done, _ = await asyncio.wait({first}, timeout=delay)
+        if first in done:
+            if first.exception() is None:
+                return first.result()
+            return await self._failover(payload, candidates[1:])
+
+        self.hedged_requests += 1
+        pending = {first, asyncio.ensure_future(self._post(backup, payload))}
+        error: Optional[BaseException] = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+        finally:
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+        if len(candidates) > 2:
+            return await self._failover(payload, candidates[2:])
+        raise error
+
+    async def check_health(self) -> None:
+        """Ping every endpoint with server_info and update its health"""
+        payload = request_to_json_rpc(ServerInfo())
+
+        async def check(endpoint: Endpoint) -> None:
+            try:
+                # Health pings are not request latency; keep them out of the p95
+                response = await self._post(endpoint, payload, sample=False)
+                self._record_health(endpoint, response)
+            except Exception:
+                endpoint.healthy = False
+
+        await asyncio.gather(*(check(endpoint) for endpoint in self.endpoints))
+
+    def start_health_checks(self, interval: float = XRPL_HEALTH_CHECK_INTERVAL) -> None:
+        if self._health_task is not None or len(self.endpoints) < 2:
+            return
+
+        async def run() -> None:
+            while True:
+                await self.check_health()
+                await asyncio.sleep(interval)
+
+        self._health_task = asyncio.create_task(run())
+
+    async def aclose(self) -> None:
+        if self._health_task is not None:
+            self._health_task.cancel()
+            await asyncio.gather(self._health_task, return_exceptions=True)
+            self._health_task = None
+        await self._clients.aclose()
+
+
+class PooledSyncJsonRpcClient(_Routing, JsonRpcClient):
+    """
+    Blocking JsonRpcClient that reuses one pooled httpx.Client and fails over
+    across endpoints like PooledJsonRpcClient (without hedging).
+    """
+
+    def __init__(
+        self,
+        urls: Union[str, Sequence[str]],
+        pool_size: int = XRPL_POOL_SIZE,
+        timeout: float = XRPL_REQUEST_TIMEOUT,
+    ):
+        urls = [urls] if isinstance(urls, str) else list(urls)
+        super().__init__(urls[0])
+        self._init_routing(urls, pool_size, timeout)
+        self._http = httpx.Client(
+            http2=HTTP2_AVAILABLE, limits=self._limits(), timeout=timeout
+        )
+
+    def request(self, request: Request) -> Response:
+        payload = request_to_json_rpc(request)
+        error: Optional[Exception] = None
+        for endpoint in self._ranked():
+            started = self._start()
+            try:
+                try:
+                    response = self._http.post(endpoint.url, json=payload)
+                except Exception as e:
+                    self._finish(endpoint, started, error=e)
+                return self._finish(endpoint, started, response)
+            except (httpx.HTTPError, XRPLRequestFailureException) as e:
+                error = e
+        raise error
+
+    async def _request_impl(
+        self, request: Request, *, timeout: float = REQUEST_TIMEOUT
+    ) -> Response:
+        # xrpl's sync helpers (e.g. xrpl.transaction.submit_and_wait) run their
+        # async versions under asyncio.run and end up here; reuse the sync pool
+        return self.request(request)
+
+    def close(self) -> None:
+        self._http.close()
+
+
+_async_clients: Dict[str, PooledJsonRpcClient] = {}
+_sync_clients: Dict[str, PooledSyncJsonRpcClient] = {}
+
+
+def rpc_urls() -> List[str]:
+    """
+    Configured rippled endpoints: the comma-separated XRPL_RPC_URLS, else
+    XRPL_RPC_URL, else testnet. Read on every call so scripts and tests
+    that set the environment after import get the endpoints they asked for.
+    """
+    urls = os.getenv("XRPL_RPC_URLS") or os.getenv("XRPL_RPC_URL") or DEFAULT_RPC_URL
+    return [url.strip() for url in urls.split(",") if url.strip()]
+
+
+def get_client(url: Optional[str] = None) -> PooledJsonRpcClient:
+    """Shared async client for one rippled endpoint, or for rpc_urls()"""
+    urls = [url] if url else rpc_urls()
+    key = ",".join(urls)
+    if key not in _async_clients:
+        _async_clients[key] = PooledJsonRpcClient(urls)
+    return _async_clients[key]
+
+
+def get_sync_client(url: Optional[str] = None) -> PooledSyncJsonRpcClient:
+    """Shared blocking client for scripts and sync services"""
+    urls = [url] if url else rpc_urls()
+    key = ",".join(urls)
+    if key not in _sync_clients:
+        _sync_clients[key] = PooledSyncJsonRpcClient(urls)
+    return _sync_clients[key]
+
+
+def client_stats() -> Dict:
+    return {
+        "async": [client.stats() for client in _async_clients.values()],
+        "sync": [client.stats() for client in _sync_clients.values()],
+    }
+
+
+def start_health_checks() -> None:
+    """Start background health checks for multi-endpoint clients"""
+    for client in _async_clients.values():
+        client.start_health_checks()
+
+
+async def close_clients() -> None:
+    """Close every pooled connection; called from the app lifespan"""
+    for client in _async_clients.values():
+        await client.aclose()
+    for client in _sync_clients.values():
+        client.close()
+    _sync_clients.clear()
@@ -0,0 +1,260 @@
+import asyncio
+import os
+from typing import Any, Dict, Optional, Set, Tuple
+
+import httpx
+from xrpl.asyncio.clients import Client
+from xrpl.asyncio.transaction import XRPLReliableSubmissionException
+from xrpl.clients import XRPLRequestFailureException
+from xrpl.models.requests import Ledger, Tx
+from xrpl.models.response import Response, ResponseStatus
+
+from .ledger_stream import transaction_hash
+
+# Seconds between validated ledger checks when no ledger index is pushed in
+CONFIRM_POLL_INTERVAL = float(os.getenv("CONFIRM_POLL_INTERVAL", "1"))
+# Concurrent tx lookups per validated ledger
+CONFIRM_CONCURRENCY = int(os.getenv("CONFIRM_CONCURRENCY", "20"))
+# Most ledgers scanned to catch up; past that, pending hashes are looked up one by one
+CONFIRM_MAX_LEDGER_SCAN = int(os.getenv("CONFIRM_MAX_LEDGER_SCAN", "10"))
+# Seconds a caller waits for a confirmation before giving up on it
+CONFIRM_TIMEOUT = float(os.getenv("CONFIRM_TIMEOUT", "120"))
+
+
+class TransactionExpired(XRPLReliableSubmissionException):
+    """A validated ledger passed the transaction's LastLedgerSequence without it"""
+
+
+class ConfirmationTracker:
+    """
+    Confirms submitted transactions for every caller at once.
+
+    Hashes are registered with their LastLedgerSequence. Once per new
+    validated ledger, that ledger's transaction hashes are fetched in one
+    request and matched against every pending hash; only matches are looked
+    up with ``tx`` to get their result. A hash is also looked up once when
+    first registered (it may already be validated) and once the ledger has
+    passed its LastLedgerSequence, where it fails unless validated. Lookup
+    errors are retried on the next ledger. Ledger indexes and validated
+    transactions pushed from a ledger subscription short-cut the lookups.
+
+    The checking task runs only while something is pending.
+    """
+
+    def __init__(
+        self,
+        client: Client,
+        poll_interval: float = CONFIRM_POLL_INTERVAL,
+        concurrency: int = CONFIRM_CONCURRENCY,
+        timeout: float = CONFIRM_TIMEOUT,
+        max_ledger_scan: int = CONFIRM_MAX_LEDGER_SCAN,
+    ):
+        self.client = client
+        self.poll_interval = poll_interval
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.max_ledger_scan = max_ledger_scan
+        self.ledger_index: Optional[int] = None
+        # hash -> (LastLedgerSequence, future)
+        self._pending: Dict[str, Tuple[int, asyncio.Future]] = {}
+        # Pending hashes that may have validated in a ledger no scan covered
+        self._unseen: Set[str] = set()
+        # hash -> callers currently waiting on it
+        self._waiters: Dict[str, int] = {}
+        self._checked_ledger: Optional[int] = None
+        self._ledger_event: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def note_validated_ledger(self, ledger_index: int) -> None:
+        """Ledger index pushed from a subscription; wakes the checker"""
+        if self.ledger_index is None or ledger_index > self.ledger_index:
+            self.ledger_index = ledger_index
+            if self._ledger_event is not None:
+                self._ledger_event.set()
+
+    def resolve_from_stream(self, message: Dict[str, Any]) -> None:
+        """Resolve a pending hash from a validated transaction stream message"""
+        tx_hash = transaction_hash(message)
+        if tx_hash not in self._pending:
+            return
+        tx = message.get("transaction") or message.get("tx_json") or {}
+        self._settle(
+            tx_hash,
+            Response(
+                status=ResponseStatus.SUCCESS,
+                result={
+                    **tx,
+                    "hash": tx_hash,
+                    "meta": message["meta"],
+                    "ledger_index": message["ledger_index"],
+                    "validated": True,
+                },
+            ),
+        )
+
+    async def wait(
+        self, tx_hash: str, last_ledger_sequence: int, timeout: Optional[float] = None
+    ) -> Response:
+        """
+        Wait until a submitted transaction is validated (returning the tx
+        response) or can no longer be, or ``timeout`` seconds (default
+        ``self.timeout``) pass (raising XRPLReliableSubmissionException)
+        """
+        timeout = self.timeout if timeout is None else timeout
+        entry = self._pending.get(tx_hash)
+        if entry is None:
+            entry = (last_ledger_sequence, asyncio.get_running_loop().create_future())
+            self._pending[tx_hash] = entry
+            self._unseen.add(tx_hash)
+        self._start()
+        self._waiters[tx_hash] = self._waiters.get(tx_hash, 0) + 1
+        try:
+            return await asyncio.wait_for(asyncio.shield(entry[1]), timeout)
+        except asyncio.TimeoutError:
+            raise XRPLReliableSubmissionException(
+                f"Transaction {tx_hash} was not confirmed within {timeout}s"
+            )
+        finally:
+            self._waiters[tx_hash] -= 1
+            if not self._waiters[tx_hash]:
+                del self._waiters[tx_hash]
+                # Nobody is waiting any more; stop looking it up
+                if not entry[1].done() and self._pending.get(tx_hash) is entry:
+                    del self._pending[tx_hash]
+                    self._unseen.discard(tx_hash)
+                    entry[1].cancel()
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        for _, future in self._pending.values():
+            future.cancel()
+        self._pending.clear()
+        self._unseen.clear()
+
+    def _start(self) -> None:
+        if self._task is None or self._task.done():
+            self._ledger_event = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self) -> None:
+        while self._pending:
+            try:
+                await asyncio.wait_for(self._ledger_event.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._ledger_event.clear()
+
+            try:
+                ledger_index = await self._validated_ledger()
+                if self._checked_ledger is None or ledger_index > self._checked_ledger:
+                    await self._check_pending(ledger_index)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Error checking confirmations: {e}")
+
+    async def _validated_ledger(self) -> int:
+        if self.ledger_index is not None and self.ledger_index != self._checked_ledger:
+            return self.ledger_index
+        response = await self.client.request(Ledger(ledger_index="validated"))
+        if not response.is_successful():
+            raise XRPLRequestFailureException(response.result)
+        ledger_index = int(response.result["ledger_index"])
+        # Not note_validated_ledger: our own poll must not wake the loop again
+        if self.ledger_index is None or ledger_index > self.ledger_index:
+            self.ledger_index = ledger_index
+        return self.ledger_index
+
+    async def _check_pending(self, ledger_index: int) -> None:
+        """Scan the ledgers validated since the last check, then look up matches"""
+        first = ledger_index if self._checked_ledger is None else self._checked_ledger + 1
+        if ledger_index - first >= self.max_ledger_scan:
+            # Too far behind to scan every ledger; anything may have validated
+            self._unseen.update(self._pending)
+            first = ledger_index
+        lookups = set(self._unseen)
+        try:
+            for index in range(first, ledger_index + 1):
+                lookups.update(await self._ledger_hashes(index) & self._pending.keys())
+                self._checked_ledger = index
+        except (httpx.HTTPError, XRPLRequestFailureException) as e:
+            # Look every pending hash up this once rather than stall on one ledger
+            print(f"Error scanning ledger {index}: {e}")
+            lookups.update(self._pending)
+            self._checked_ledger = ledger_index
+        lookups.update(
+            tx_hash for tx_hash, (lls, _) in self._pending.items() if ledger_index > lls
+        )
+        await self._look_up(
+            {tx_hash: self._pending[tx_hash][0] for tx_hash in lookups & self._pending.keys()},
+            ledger_index,
+        )
+
+    async def _ledger_hashes(self, ledger_index: int) -> Set[str]:
+        response = await self.client.request(
+            Ledger(ledger_index=ledger_index, transactions=True, expand=False)
+        )
+        if not response.is_successful():
+            raise XRPLRequestFailureException(response.result)
+        return set(response.result.get("ledger", {}).get("transactions", []))
+
+    async def _look_up(self, hashes: Dict[str, int], ledger_index: int) -> None:
+        """Fetch each hash (to its LastLedgerSequence) with tx and settle it"""
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def check(tx_hash: str, last_ledger_sequence: int) -> None:
+            async with semaphore:
+                try:
+                    response = await self.client.request(Tx(transaction=tx_hash))
+                except Exception as e:
+                    # Transport error; try again on the next ledger
+                    print(f"Error looking up {tx_hash}: {e}")
+                    return
+            if response.is_successful() and response.result.get("validated"):
+                self._settle(tx_hash, response)
+                return
+            error = response.result.get("error")
+            if ledger_index > last_ledger_sequence:
+                self._settle(
+                    tx_hash,
+                    TransactionExpired(
+                        f"Transaction {tx_hash} was not validated before "
+                        f"LastLedgerSequence {last_ledger_sequence}"
+                        + (f" (last lookup: {error})" if error else "")
+                    ),
+                )
+            elif error and error != "txnNotFound":
+                # Try again on the next ledger, as for transport errors
+                print(f"Error looking up {tx_hash}: {error}")
+            else:
+                # Not validated up to this ledger; later scans will catch it
+                self._unseen.discard(tx_hash)
+
+        await asyncio.gather(*(check(tx_hash, lls) for tx_hash, lls in hashes.items()))
+
+    def _settle(self, tx_hash: str, outcome: Any) -> None:
+        self._unseen.discard(tx_hash)
+        entry = self._pending.pop(tx_hash, None)
+        if entry is None or entry[1].done():
+            return
+        if isinstance(outcome, Exception):
+            entry[1].set_exception(outcome)
+        else:
+            entry[1].set_result(outcome)
+
+
+_trackers: Dict[int, ConfirmationTracker] = {}
+
+
+def get_tracker(client: Client) -> ConfirmationTracker:
+    """One shared tracker per client, so all submitters batch their lookups"""
+    if id(client) not in _trackers:
+        _trackers[id(client)] = ConfirmationTracker(client)
+    return _trackers[id(client)]
@@ -0,0 +1,109 @@
+import asyncio
+import os
+import time
+import uuid
+from collections import OrderedDict
+from typing import Awaitable, Callable, List, Optional
+
+from ..models.loan import ApiResponse, JobStatus, JobStep
+
+# A workflow reports progress through the callback and returns the final response
+Workflow = Callable[[Callable[[str], None]], Awaitable[ApiResponse]]
+
+
+class JobQueueFull(Exception):
+    """Raised when the job queue is at capacity"""
+
+
+class JobQueue:
+    """
+    In-process worker pool for long-running workflows.
+
+    Jobs wait in a bounded queue (``max_queued``) and are run by ``workers``
+    concurrent tasks, started on first submit. Finished jobs are kept for
+    polling until more than ``max_jobs`` are tracked, oldest first.
+    """
+
+    def __init__(self, workers: int = 4, max_queued: int = 100, max_jobs: int = 1000):
+        self.workers = workers
+        self.max_queued = max_queued
+        self.max_jobs = max_jobs
+        self._jobs: "OrderedDict[str, JobStatus]" = OrderedDict()
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+
+    def submit(self, kind: str, workflow: Workflow) -> JobStatus:
+        """Queue a workflow, raising JobQueueFull if the queue is at capacity"""
+        self._start()
+        job = JobStatus(id=uuid.uuid4().hex, kind=kind, created_at=time.time())
+        try:
+            self._queue.put_nowait((job, workflow))
+        except asyncio.QueueFull:
+            raise JobQueueFull(f"{self.max_queued} jobs already queued")
+
+        self._jobs[job.id] = job
+        self._prune()
+        return job
+
+    def get(self, job_id: str) -> Optional[JobStatus]:
+        return self._jobs.get(job_id)
+
+    async def shutdown(self) -> None:
+        """Stop the workers; jobs that have not finished are marked failed"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queue = None
+        for job in self._jobs.values():
+            if job.finished_at is None:
+                self._finish(job, "failed", ApiResponse(
+                    success=False, message="Job cancelled", error="Server shutting down"
+                ))
+
+    def _start(self) -> None:
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queued)
+        self._tasks = [
+            asyncio.create_task(self._worker()) for _ in range(max(1, self.workers))
+        ]
+
+    async def _worker(self) -> None:
+        while True:
+            job, workflow = await self._queue.get()
+            job.status = "running"
+
+            def report(step: str, job: JobStatus = job) -> None:
+                job.steps.append(JobStep(name=step, at=time.time()))
+
+            try:
+                result = await workflow(report)
+                self._finish(job, "succeeded" if result.success else "failed", result)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._finish(job, "failed", ApiResponse(
+                    success=False, message="Job failed", error=str(e)
+                ))
+            finally:
+                self._queue.task_done()
+
+    def _finish(self, job: JobStatus, status: str, result: ApiResponse) -> None:
+        job.status = status
+        job.result = result
+        job.finished_at = time.time()
+
+    def _prune(self) -> None:
+        excess = len(self._jobs) - self.max_jobs
+        if excess <= 0:
+            return
+        for job_id in [j.id for j in self._jobs.values() if j.finished_at][:excess]:
+            del self._jobs[job_id]
+
+
+loan_jobs = JobQueue(
+    workers=int(os.getenv("LOAN_JOB_WORKERS", "4")),
+    max_queued=int(os.getenv("LOAN_JOB_QUEUE_SIZE", "100")),
+    max_jobs=int(os.getenv("LOAN_JOB_HISTORY", "1000")),
+)
@@ -0,0 +1,245 @@
+import asyncio
+import os
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+
+from xrpl.asyncio.clients import AsyncWebsocketClient
+from xrpl.core.addresscodec import is_valid_classic_address
+from xrpl.models.requests import StreamParameter, Subscribe
+
+# Optional rippled WebSocket endpoint. While its subscription is live, ledger
+# and transaction events drive cache invalidation and confirmations
+XRPL_WS_URL = os.getenv("XRPL_WS_URL")
+# Most accounts kept on the subscription; later ones are not tracked
+LEDGER_STREAM_MAX_ACCOUNTS = int(os.getenv("LEDGER_STREAM_MAX_ACCOUNTS", "1000"))
+
+LedgerHandler = Callable[[int], None]
+TransactionHandler = Callable[[Dict[str, Any]], None]
+ConnectionHandler = Callable[[bool], None]
+TrackHandler = Callable[[str], None]
+
+
+def transaction_hash(message: Dict[str, Any]) -> Optional[str]:
+    """Hash of a transaction stream message (API v1 or v2 layout)"""
+    return message.get("hash") or message.get("transaction", {}).get("hash")
+
+
+def affected_accounts(message: Dict[str, Any]) -> Set[str]:
+    """Every account whose AccountRoot or trust lines a transaction touched"""
+    tx = message.get("transaction") or message.get("tx_json") or {}
+    accounts = {tx.get("Account"), tx.get("Destination")}
+
+    for node in message.get("meta", {}).get("AffectedNodes", []):
+        entry = next(iter(node.values()))
+        fields = entry.get("FinalFields") or entry.get("NewFields") or {}
+        if entry.get("LedgerEntryType") == "AccountRoot":
+            accounts.add(fields.get("Account"))
+        elif entry.get("LedgerEntryType") == "RippleState":
+            accounts.add(fields.get("HighLimit", {}).get("issuer"))
+            accounts.add(fields.get("LowLimit", {}).get("issuer"))
+    accounts.discard(None)
+    return accounts
+
+
+class LedgerStream:
+    """
+    Long-lived rippled WebSocket subscription to the ledger stream and to a
+    set of tracked accounts.
+
+    Validated ledgers and transactions are fanned out to registered handlers,
+    and newly tracked accounts are announced to track handlers. Only valid
+    classic addresses are tracked, at most ``max_accounts`` of them, and an
+    account rippled refuses to subscribe is dropped rather than failing the
+    whole subscription. An account counts as tracked (``is_tracking``) only
+    once rippled has acknowledged its subscription; subscribed and refused
+    handlers hear about each account as that answer arrives. The connection
+    is re-opened with exponential backoff (and every subscription re-sent)
+    when it drops or stays silent for ``idle_timeout`` seconds.
+    """
+
+    def __init__(
+        self,
+        url: Optional[str],
+        idle_timeout: float = 30.0,
+        reconnect_delay: float = 1.0,
+        max_reconnect_delay: float = 30.0,
+        max_accounts: int = LEDGER_STREAM_MAX_ACCOUNTS,
+    ):
+        self.url = url
+        self.idle_timeout = idle_timeout
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.max_accounts = max_accounts
+        self.accounts: Set[str] = set()
+        # Accounts rippled has acknowledged on the current connection
+        self.subscribed: Set[str] = set()
+        self.ledger_index: Optional[int] = None
+        self.connected = False
+        self._client: Optional[AsyncWebsocketClient] = None
+        self._task: Optional[asyncio.Task] = None
+        self._ledger_handlers: List[LedgerHandler] = []
+        self._transaction_handlers: List[TransactionHandler] = []
+        self._connection_handlers: List[ConnectionHandler] = []
+        self._track_handlers: List[TrackHandler] = []
+        self._subscribed_handlers: List[TrackHandler] = []
+        self._refused_handlers: List[TrackHandler] = []
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.url)
+
+    def on_ledger(self, handler: LedgerHandler) -> None:
+        self._ledger_handlers.append(handler)
+
+    def on_transaction(self, handler: TransactionHandler) -> None:
+        self._transaction_handlers.append(handler)
+
+    def on_connection(self, handler: ConnectionHandler) -> None:
+        self._connection_handlers.append(handler)
+
+    def on_track(self, handler: TrackHandler) -> None:
+        self._track_handlers.append(handler)
+
+    def on_subscribed(self, handler: TrackHandler) -> None:
+        """Called with each account once rippled acknowledges its subscription"""
+        self._subscribed_handlers.append(handler)
+
+    def on_refused(self, handler: TrackHandler) -> None:
+        """Called with each account rippled refuses; it is no longer tracked"""
+        self._refused_handlers.append(handler)
+
+    def is_tracking(self, address: str) -> bool:
+        """Whether transactions of an account are being pushed right now"""
+        return self.connected and address in self.subscribed
+
+    def track(self, addresses: Iterable[str]) -> None:
+        """Add accounts to the subscription (immediately if connected)"""
+        new = set()
+        for address in addresses:
+            if len(self.accounts) + len(new) >= self.max_accounts:
+                break
+            if address and address not in self.accounts and is_valid_classic_address(address):
+                new.add(address)
+        if not new:
+            return
+        self.accounts |= new
+        for address in new:
+            for handler in self._track_handlers:
+                handler(address)
+        if self.connected and self._client is not None:
+            asyncio.ensure_future(self._subscribe_accounts(self._client, new))
+
+    async def start(self) -> None:
+        if self.enabled and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self) -> None:
+        delay = self.reconnect_delay
+        while True:
+            try:
+                async with AsyncWebsocketClient(self.url) as client:
+                    self._client = client
+                    await self._subscribe(client)
+                    self._set_connected(True)
+                    delay = self.reconnect_delay
+                    await self._consume(client)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Ledger stream error: {e}")
+            finally:
+                self._client = None
+                self._set_connected(False)
+
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.max_reconnect_delay)
+
+    async def _subscribe(self, client: AsyncWebsocketClient) -> None:
+        accounts = sorted(self.accounts)
+        response = await client.request(
+            Subscribe(streams=[StreamParameter.LEDGER], accounts=accounts or None)
+        )
+        if response.is_successful():
+            self._acknowledge(accounts)
+        elif accounts:
+            # One rejected account fails the whole request; add them one by one
+            response = await client.request(Subscribe(streams=[StreamParameter.LEDGER]))
+            if response.is_successful():
+                await self._subscribe_each(client, accounts)
+        if not response.is_successful():
+            raise ConnectionError(f"Subscribe failed: {response.result}")
+        if "ledger_index" in response.result:
+            self._handle_ledger(int(response.result["ledger_index"]))
+
+    async def _subscribe_accounts(
+        self, client: AsyncWebsocketClient, accounts: Set[str]
+    ) -> None:
+        try:
+            response = await client.request(Subscribe(accounts=sorted(accounts)))
+            if response.is_successful():
+                self._acknowledge(accounts)
+            else:
+                await self._subscribe_each(client, sorted(accounts))
+        except Exception as e:
+            print(f"Error subscribing to accounts: {e}")
+
+    async def _subscribe_each(
+        self, client: AsyncWebsocketClient, accounts: List[str]
+    ) -> None:
+        for account in accounts:
+            response = await client.request(Subscribe(accounts=[account]))
+            if response.is_successful():
+                self._acknowledge([account])
+            else:
+                print(f"Dropping {account} from the subscription: {response.result}")
+                self.accounts.discard(account)
+                for handler in self._refused_handlers:
+                    handler(account)
+
+    def _acknowledge(self, accounts: Iterable[str]) -> None:
+        for account in accounts:
+            self.subscribed.add(account)
+            for handler in self._subscribed_handlers:
+                handler(account)
+
+    async def _consume(self, client: AsyncWebsocketClient) -> None:
+        messages = client.__aiter__()
+        while client.is_open():
+            try:
+                message = await asyncio.wait_for(anext(messages), self.idle_timeout)
+            except StopAsyncIteration:
+                return
+            except asyncio.TimeoutError:
+                raise ConnectionError(f"No messages for {self.idle_timeout}s")
+
+            if message.get("type") == "ledgerClosed":
+                self._handle_ledger(int(message["ledger_index"]))
+            elif message.get("type") == "transaction" and message.get("validated"):
+                self._handle_transaction(message)
+
+    def _handle_ledger(self, ledger_index: int) -> None:
+        self.ledger_index = ledger_index
+        for handler in self._ledger_handlers:
+            handler(ledger_index)
+
+    def _handle_transaction(self, message: Dict[str, Any]) -> None:
+        for handler in self._transaction_handlers:
+            handler(message)
+
+    def _set_connected(self, connected: bool) -> None:
+        if connected == self.connected:
+            return
+        self.connected = connected
+        if not connected:
+            self.subscribed.clear()
+        for handler in self._connection_handlers:
+            handler(connected)
+
+
+# Shared subscription; services register their handlers on it
+ledger_stream = LedgerStream(XRPL_WS_URL)
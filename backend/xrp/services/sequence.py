@@ -0,0 +1,137 @@
+import asyncio
+from bisect import insort
+from typing import Dict, List, Optional, Set
+
+from xrpl.asyncio.clients import Client
+from xrpl.models.requests import AccountInfo, AccountObjects, AccountObjectType
+
+# Engine results that mean our local view of the account's sequence/tickets is stale
+SEQUENCE_RESYNC_RESULTS = {"tefPAST_SEQ", "tefNO_TICKET"}
+
+# Results where rippled holds the transaction to apply later, so its sequence
+# or ticket is spoken for even though the current ledger does not show it yet
+HELD_RESULTS = {"terQUEUED"}
+
+# Results where the sequence or ticket is ahead of the account: nothing after
+# it can apply until the gap is filled, so the local view must be re-read
+GAP_RESULTS = {"terPRE_SEQ", "terPRE_TICKET"}
+
+# Maximum number of tickets an account can hold
+MAX_TICKETS = 250
+
+
+class SequenceAllocator:
+    """
+    Hands out Sequence numbers (or Tickets) for one account without a
+    round trip per transaction, so several transactions from the same
+    account can be in flight in the same ledger.
+
+    The next sequence is read from the current ledger on first use and
+    whenever a lease comes back unconsumed; after that it is incremented
+    locally. When ``ticket_pool_size`` is set, pre-created Tickets are handed
+    out first so that one failed transaction does not stall the ones after it.
+    """
+
+    def __init__(self, account: str, ticket_pool_size: int = 0):
+        self.account = account
+        self.ticket_pool_size = min(ticket_pool_size, MAX_TICKETS)
+        self._lock = asyncio.Lock()
+        self._next_sequence: Optional[int] = None
+        self._tickets: List[int] = []
+        self._leased_tickets: Set[int] = set()
+        # Leases of transactions that may or may not have reached rippled
+        self._in_doubt: List[Dict[str, int]] = []
+
+    @property
+    def available_tickets(self) -> int:
+        return len(self._tickets)
+
+    @property
+    def in_doubt(self) -> int:
+        return len(self._in_doubt)
+
+    def tickets_low(self) -> bool:
+        """Whether the ticket pool is enabled and should be topped up"""
+        if not self.ticket_pool_size:
+            return False
+        return len(self._tickets) < max(1, self.ticket_pool_size // 4)
+
+    async def acquire(self, client: Client, use_tickets: bool = True) -> Dict[str, int]:
+        """Reserve the fields that order the next transaction from this account"""
+        async with self._lock:
+            if use_tickets and self._tickets:
+                ticket = self._tickets.pop(0)
+                self._leased_tickets.add(ticket)
+                return {"sequence": 0, "ticket_sequence": ticket}
+
+            if self._next_sequence is None:
+                self._next_sequence = await self._fetch_sequence(client)
+            sequence = self._next_sequence
+            self._next_sequence += 1
+            return {"sequence": sequence}
+
+    def hold(self, lease: Dict[str, int]) -> None:
+        """
+        Keep the lease of a transaction whose fate is unknown (the submit
+        failed in transit, or nobody waited for validation) out of
+        circulation. Its ticket is not handed out again, and the lease does
+        not resync the sequence counter, until ``release`` is called with the
+        final result, or with a non-consuming one once LastLedgerSequence has
+        passed. Resyncs caused by other leases still happen meanwhile.
+        """
+        self._in_doubt.append(lease)
+
+    def release(self, lease: Dict[str, int], engine_result: str) -> None:
+        """
+        Return a lease once its transaction has a final (or rejected) result.
+
+        tes/tec results consume the sequence or ticket, and so does terQUEUED.
+        Anything else leaves a gap, so unused tickets go back to the pool and
+        the sequence counter is resynced from the ledger on the next acquire.
+        terPRE_SEQ/terPRE_TICKET mean the lease was ahead of the account: the
+        counter is resynced and the ticket is not handed out again. Only call
+        this once the transaction has definitely applied or definitely cannot;
+        otherwise ``hold`` the lease.
+        """
+        self._in_doubt = [held for held in self._in_doubt if held is not lease]
+        consumed = engine_result.startswith(("tes", "tec")) or engine_result in HELD_RESULTS
+        ticket = lease.get("ticket_sequence")
+        if ticket is not None:
+            self._leased_tickets.discard(ticket)
+            if not consumed and engine_result not in SEQUENCE_RESYNC_RESULTS | GAP_RESULTS:
+                insort(self._tickets, ticket)
+            if engine_result in GAP_RESULTS:
+                self.resync()
+        elif not consumed:
+            self.resync()
+
+    def resync(self) -> None:
+        """Forget the local sequence so it is re-read on the next acquire"""
+        self._next_sequence = None
+
+    async def load_tickets(self, client: Client) -> None:
+        """Refresh the ticket pool from the tickets the account owns"""
+        response = await client.request(
+            AccountObjects(
+                account=self.account,
+                type=AccountObjectType.TICKET,
+                ledger_index="validated",
+                limit=MAX_TICKETS,
+            )
+        )
+        if not response.is_successful():
+            raise RuntimeError(f"Unable to load tickets: {response.result}")
+
+        tickets = sorted(
+            obj["TicketSequence"] for obj in response.result.get("account_objects", [])
+        )
+        async with self._lock:
+            self._tickets = [t for t in tickets if t not in self._leased_tickets]
+
+    async def _fetch_sequence(self, client: Client) -> int:
+        response = await client.request(
+            AccountInfo(account=self.account, ledger_index="current")
+        )
+        if not response.is_successful():
+            raise RuntimeError(f"Unable to read account sequence: {response.result}")
+        return int(response.result["account_data"]["Sequence"])
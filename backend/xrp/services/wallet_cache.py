@@ -0,0 +1,59 @@
+import asyncio
+import hashlib
+import hmac
+import secrets
+import time
+from collections import OrderedDict
+from typing import Dict, Tuple
+
+from xrpl.wallet import Wallet
+
+
+class WalletCache:
+    """
+    Bounded cache of Wallet objects derived from seeds, with TTL and LRU
+    eviction.
+
+    Entries are keyed by an HMAC of the seed under a random per-process key,
+    so raw seeds are never used as dictionary keys. Derivation on a miss runs
+    in a worker thread, and concurrent misses for the same seed share it;
+    it runs to completion even if the caller that started it is cancelled.
+    """
+
+    def __init__(self, max_entries: int = 256, ttl: float = 900.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._hmac_key = secrets.token_bytes(32)
+        self._entries: "OrderedDict[bytes, Tuple[float, Wallet]]" = OrderedDict()
+        self._pending: Dict[bytes, asyncio.Future] = {}
+
+    def _key(self, seed: str) -> bytes:
+        return hmac.new(self._hmac_key, seed.encode(), hashlib.sha256).digest()
+
+    async def get(self, seed: str) -> Wallet:
+        key = self._key(seed)
+        entry = self._entries.get(key)
+        if entry is not None and time.monotonic() - entry[0] < self.ttl:
+            self._entries.move_to_end(key)
+            return entry[1]
+
+        pending = self._pending.get(key)
+        if pending is None:
+            # Owned by the cache, so a cancelled caller does not cancel the rest
+            pending = asyncio.ensure_future(asyncio.to_thread(Wallet.from_seed, seed))
+            self._pending[key] = pending
+            pending.add_done_callback(lambda f: self._settle(key, f))
+        return await asyncio.shield(pending)
+
+    def _settle(self, key: bytes, future: asyncio.Future) -> None:
+        if self._pending.get(key) is future:
+            del self._pending[key]
+        if future.cancelled() or future.exception() is not None:
+            return
+        self._entries[key] = (time.monotonic(), future.result())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
@@ -1,15 +1,30 @@
+import asyncio
 import os
-from typing import Dict, Optional, Tuple
+from dataclasses import replace
+from typing import Dict, Iterable, Optional, Set, Tuple
 
 import xrpl
 from dotenv import load_dotenv
-from xrpl.asyncio.clients import AsyncJsonRpcClient
-from xrpl.asyncio.transaction import submit_and_wait
+from xrpl.asyncio.clients import XRPLRequestFailureException
+from xrpl.asyncio.transaction import (
+    XRPLReliableSubmissionException,
+    autofill_and_sign,
+    submit,
+)
 from xrpl.models.amounts import IssuedCurrencyAmount
-from xrpl.models.requests import AccountInfo, AccountLines
-from xrpl.models.transactions import AccountSet, Payment, TrustSet
+from xrpl.models.response import Response
+from xrpl.models.transactions import AccountSet, Payment, TicketCreate, TrustSet
+from xrpl.models.transactions.transaction import Transaction
 from xrpl.wallet import Wallet
 
+from .account_state import AccountStateCache
+from .balance_cache import BalanceCache
+from .client import get_client
+from .confirmations import TransactionExpired, get_tracker
+from .ledger_stream import affected_accounts, ledger_stream
+from .sequence import SEQUENCE_RESYNC_RESULTS, SequenceAllocator
+from .wallet_cache import WalletCache
+
 # Load environment variables
 load_dotenv()
 
@@ -21,19 +36,233 @@ LENDER_SEED = os.getenv("LENDER_SEED")
 BORROWER_ADDR = os.getenv("BORROWER_ADDR")
 BORROWER_SEED = os.getenv("BORROWER_SEED")
 
-# Connect to testnet with async client
-client = AsyncJsonRpcClient("https://s.altnet.rippletest.net:51234")
+# Shared pooled client for XRPL_RPC_URLS (testnet by default)
+client = get_client()
+
+# Upper bound on concurrent rippled reads when querying many addresses at once
+BALANCE_FANOUT_CONCURRENCY = int(os.getenv("BALANCE_FANOUT_CONCURRENCY", "10"))
+# Seconds a single address may take before it is reported as failed
+BALANCE_FANOUT_TIMEOUT = float(os.getenv("BALANCE_FANOUT_TIMEOUT", "5"))
+
+# Balance reads are cached per validated ledger; see BalanceCache
+balance_cache = BalanceCache(
+    max_entries=int(os.getenv("BALANCE_CACHE_SIZE", "1024")),
+    ledger_ttl=float(os.getenv("BALANCE_CACHE_LEDGER_TTL", "1")),
+    max_age_ledgers=int(os.getenv("BALANCE_CACHE_MAX_AGE_LEDGERS", "20")),
+)
+
+# DefaultRipple/trust line state, so setup transactions are only sent when missing
+account_state = AccountStateCache(
+    balance_cache, ttl=float(os.getenv("ACCOUNT_STATE_CACHE_TTL", "300"))
+)
+
+# Submitted transactions are confirmed together, once per validated ledger
+confirmations = get_tracker(client)
+
+ledger_stream.track([ISSUER_ADDR, LENDER_ADDR, BORROWER_ADDR])
+
+
+def _on_stream_connection(connected: bool) -> None:
+    if connected:
+        balance_cache.follow_stream(ledger_stream.subscribed)
+    else:
+        balance_cache.unfollow_stream()
+
+
+def _on_stream_transaction(message: Dict) -> None:
+    for account in affected_accounts(message):
+        balance_cache.invalidate(account)
+        account_state.invalidate(account)
+
+
+ledger_stream.on_connection(_on_stream_connection)
+# Accounts are kept across ledgers only while rippled pushes their transactions
+ledger_stream.on_subscribed(balance_cache.watch)
+ledger_stream.on_refused(balance_cache.unwatch)
+ledger_stream.on_ledger(balance_cache.note_validated_ledger)
+ledger_stream.on_ledger(confirmations.note_validated_ledger)
+ledger_stream.on_transaction(_on_stream_transaction)
+ledger_stream.on_transaction(confirmations.resolve_from_stream)
+
+# Wallets derived from request seeds, so key derivation runs once per seed
+wallet_cache = WalletCache(
+    max_entries=int(os.getenv("WALLET_CACHE_SIZE", "256")),
+    ttl=float(os.getenv("WALLET_CACHE_TTL", "900")),
+)
 
 # Create issuer wallet object
 issuer_wallet = Wallet.from_seed(ISSUER_SEED) if ISSUER_SEED else None
 
+# Issuer transactions take sequences (or tickets) from a local allocator so
+# several can be in flight per ledger; 0 disables the ticket pool
+ISSUER_TICKET_POOL_SIZE = int(os.getenv("ISSUER_TICKET_POOL_SIZE", "0"))
+issuer_sequences = SequenceAllocator(ISSUER_ADDR, ISSUER_TICKET_POOL_SIZE)
+
+# How many times a transaction is re-signed after a stale sequence/ticket
+SEQUENCE_RETRIES = 3
+
+_ticket_refills: Dict[str, asyncio.Task] = {}
+# Background checks settling leases of in-doubt transactions
+_in_doubt_checks: Set[asyncio.Task] = set()
+
+
+def _note_validated(response: Response) -> None:
+    """Make later balance reads see the ledger a transaction was validated in"""
+    ledger_index = response.result.get("ledger_index")
+    if ledger_index:
+        balance_cache.note_validated_ledger(int(ledger_index))
+
+
+def _check_preliminary(submitted: Response) -> None:
+    """Raise for submit results that mean the transaction can never apply"""
+    prelim = submitted.result.get("engine_result", "")
+    if prelim.startswith(("tem", "tef", "tel")):
+        message = submitted.result.get("engine_result_message", "")
+        raise XRPLReliableSubmissionException(f"{prelim}: {message}")
+
+
+async def submit_and_confirm(transaction: Transaction, wallet: Wallet) -> Response:
+    """
+    Autofill, sign and submit a transaction, then wait for the shared
+    confirmation tracker. Raises XRPLReliableSubmissionException unless the
+    final result is tesSUCCESS, matching submit_and_wait.
+    """
+    signed = await autofill_and_sign(transaction, client, wallet)
+    submitted = await submit(signed, client)
+    _check_preliminary(submitted)
+
+    response = await confirmations.wait(
+        signed.get_hash(), signed.last_ledger_sequence
+    )
+    final = response.result["meta"]["TransactionResult"]
+    if final != "tesSUCCESS":
+        raise XRPLReliableSubmissionException(f"Transaction failed: {final}")
+    return response
+
+
+async def submit_pipelined(
+    transaction: Transaction,
+    wallet: Wallet,
+    allocator: SequenceAllocator,
+    use_tickets: bool = True,
+) -> Response:
+    """
+    Sign a transaction with a locally allocated sequence or ticket, submit it
+    and wait for validation. Stale sequences are resynced and retried.
+
+    Raises XRPLReliableSubmissionException unless the final result is
+    tesSUCCESS, matching submit_and_wait.
+    """
+    if use_tickets and allocator.tickets_low():
+        _refill_tickets(allocator, wallet)
+
+    for _ in range(SEQUENCE_RETRIES):
+        lease = await allocator.acquire(client, use_tickets=use_tickets)
+        try:
+            signed = await autofill_and_sign(replace(transaction, **lease), client, wallet)
+        except BaseException:
+            allocator.release(lease, "unsigned")
+            raise
+        try:
+            submitted = await submit(signed, client)
+        except BaseException:
+            # rippled may have received it before the failure
+            _hold_in_doubt(allocator, lease, signed)
+            raise
+
+        prelim = submitted.result.get("engine_result", "")
+        if prelim in SEQUENCE_RESYNC_RESULTS:
+            allocator.release(lease, prelim)
+            allocator.resync()
+            continue
+        try:
+            _check_preliminary(submitted)
+        except XRPLReliableSubmissionException:
+            allocator.release(lease, prelim)
+            raise
+
+        try:
+            response = await confirmations.wait(
+                signed.get_hash(), signed.last_ledger_sequence
+            )
+        except TransactionExpired:
+            allocator.release(lease, "expired")
+            raise
+        except BaseException:
+            # Timed out or cancelled; the transaction can still validate
+            _hold_in_doubt(allocator, lease, signed)
+            raise
+
+        final = response.result["meta"]["TransactionResult"]
+        allocator.release(lease, final)
+        if final != "tesSUCCESS":
+            raise XRPLReliableSubmissionException(f"Transaction failed: {final}")
+        return response
+
+    raise XRPLReliableSubmissionException(
+        f"Sequence for {allocator.account} still stale after {SEQUENCE_RETRIES} attempts"
+    )
+
+
+def _hold_in_doubt(
+    allocator: SequenceAllocator, lease: Dict[str, int], signed: Transaction
+) -> None:
+    """
+    Keep a lease out of circulation until its transaction is seen validated
+    or its LastLedgerSequence has passed, then release it with that outcome
+    """
+    allocator.hold(lease)
+    tx_hash, last_ledger_sequence = signed.get_hash(), signed.last_ledger_sequence
+
+    async def settle() -> None:
+        while True:
+            try:
+                response = await confirmations.wait(tx_hash, last_ledger_sequence)
+            except TransactionExpired:
+                allocator.release(lease, "expired")
+                return
+            except XRPLReliableSubmissionException:
+                # Wait timed out before the ledger passed LastLedgerSequence
+                continue
+            allocator.release(lease, response.result["meta"]["TransactionResult"])
+            return
+
+    task = asyncio.ensure_future(settle())
+    _in_doubt_checks.add(task)
+    task.add_done_callback(_in_doubt_checks.discard)
+
+
+def _refill_tickets(allocator: SequenceAllocator, wallet: Wallet) -> None:
+    """Top up an allocator's ticket pool in the background (one refill at a time)"""
+    if allocator.account in _ticket_refills:
+        return
+
+    async def refill() -> None:
+        try:
+            await allocator.load_tickets(client)
+            missing = allocator.ticket_pool_size - allocator.available_tickets
+            if missing > 0:
+                ticket_create = TicketCreate(
+                    account=allocator.account, ticket_count=missing
+                )
+                await submit_pipelined(
+                    ticket_create, wallet, allocator, use_tickets=False
+                )
+                # The account Sequence moved past the new tickets as well
+                allocator.resync()
+                await allocator.load_tickets(client)
+        except Exception as e:
+            print(f"Error refilling tickets for {allocator.account}: {e}")
+        finally:
+            _ticket_refills.pop(allocator.account, None)
+
+    _ticket_refills[allocator.account] = asyncio.ensure_future(refill())
+
 
 async def get_xrp_balance(address: str) -> Optional[float]:
     """Get XRP balance for any address"""
     try:
-        response = await client.request(
-            AccountInfo(account=address, ledger_index="validated")
-        )
+        response = await balance_cache.account_info(client, address)
 
         if response.is_successful():
             # XRP balance is stored in drops (1 XRP = 1,000,000 drops)
@@ -51,9 +280,7 @@ async def get_issued_currency_balance(
 ) -> float:
     """Get issued currency balance for any address"""
     try:
-        response = await client.request(
-            AccountLines(account=address, ledger_index="validated")
-        )
+        response = await balance_cache.account_lines(client, address)
 
         if response.is_successful() and "lines" in response.result:
             for line in response.result["lines"]:
@@ -65,16 +292,11 @@ async def get_issued_currency_balance(
         return 0.0
 
 
-async def get_wallet_balances(address: str) -> Dict:
-    """Get all balances for a wallet"""
-    xrp = await get_xrp_balance(address)
-
-    # Get issued currencies
+async def get_issued_currencies(address: str) -> Dict[str, float]:
+    """Get every issued currency balance held by an address"""
     issued_currencies = {}
     try:
-        response = await client.request(
-            AccountLines(account=address, ledger_index="validated")
-        )
+        response = await balance_cache.account_lines(client, address)
 
         if response.is_successful() and "lines" in response.result:
             for line in response.result["lines"]:
@@ -83,9 +305,66 @@ async def get_wallet_balances(address: str) -> Dict:
     except Exception as e:
         print(f"Error getting issued currencies: {e}")
 
+    return issued_currencies
+
+
+async def get_wallet_balances(address: str) -> Dict:
+    """Get all balances for a wallet"""
+    xrp, issued_currencies = await asyncio.gather(
+        get_xrp_balance(address), get_issued_currencies(address)
+    )
+
     return {"address": address, "xrp": xrp, "issued_currencies": issued_currencies}
 
 
+async def fetch_wallet_balances(address: str) -> Dict:
+    """Get all balances for a wallet, raising if rippled rejects either read"""
+    info, lines = await asyncio.gather(
+        balance_cache.account_info(client, address),
+        balance_cache.account_lines(client, address),
+    )
+    for response in (info, lines):
+        if not response.is_successful():
+            raise XRPLRequestFailureException(response.result)
+
+    return {
+        "address": address,
+        "xrp": int(info.result["account_data"]["Balance"]) / 1000000,
+        "issued_currencies": {
+            line["currency"]: float(line["balance"])
+            for line in lines.result.get("lines", [])
+        },
+    }
+
+
+async def get_many_wallet_balances(
+    addresses: Iterable[str],
+    concurrency: int = BALANCE_FANOUT_CONCURRENCY,
+    timeout: float = BALANCE_FANOUT_TIMEOUT,
+) -> Dict[str, Dict]:
+    """Get balances for many wallets concurrently.
+
+    At most ``concurrency`` addresses are queried at a time. An address that
+    rippled rejects (e.g. actNotFound), that fails in transport or that takes
+    longer than ``timeout`` seconds is reported with an ``error`` entry
+    instead of failing the whole batch.
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def fetch(address: str) -> Dict:
+        async with semaphore:
+            try:
+                return await asyncio.wait_for(fetch_wallet_balances(address), timeout)
+            except asyncio.TimeoutError:
+                return {"address": address, "error": f"Timed out after {timeout}s"}
+            except Exception as e:
+                return {"address": address, "error": str(e)}
+
+    unique = list(dict.fromkeys(addresses))
+    results = await asyncio.gather(*(fetch(address) for address in unique))
+    return {result["address"]: result for result in results}
+
+
 async def setup_default_ripple() -> Tuple[bool, str]:
     """Configure issuer with DefaultRipple flag"""
     if not issuer_wallet:
@@ -96,9 +375,15 @@ async def setup_default_ripple() -> Tuple[bool, str]:
             account=ISSUER_ADDR,
             set_flag=xrpl.models.transactions.AccountSetAsfFlag.ASF_DEFAULT_RIPPLE,
         )
-        dr_result = await submit_and_wait(default_ripple_tx, client, issuer_wallet)
+        try:
+            dr_result = await submit_pipelined(
+                default_ripple_tx, issuer_wallet, issuer_sequences
+            )
+        finally:
+            account_state.invalidate(ISSUER_ADDR)
 
         if dr_result.is_successful():
+            _note_validated(dr_result)
             return True, "DefaultRipple set successfully"
         else:
             return (
@@ -117,16 +402,20 @@ async def create_trust_line(
 ) -> Tuple[bool, str]:
     """Create trust line from account to issuer"""
     try:
-        account_wallet = Wallet.from_seed(account_seed)
+        account_wallet = await wallet_cache.get(account_seed)
         trust_set = TrustSet(
             account=account_addr,
             limit_amount=IssuedCurrencyAmount(
                 currency=currency_code, issuer=ISSUER_ADDR, value=limit
             ),
         )
-        trust_result = await submit_and_wait(trust_set, client, account_wallet)
+        try:
+            trust_result = await submit_and_confirm(trust_set, account_wallet)
+        finally:
+            account_state.invalidate(account_addr)
 
         if trust_result.is_successful():
+            _note_validated(trust_result)
             return True, f"Trust line created successfully for {account_addr}"
         else:
             return (
@@ -137,6 +426,33 @@ async def create_trust_line(
         return False, f"Error creating trust line: {str(e)}"
 
 
+async def ensure_default_ripple() -> Tuple[bool, str]:
+    """Set DefaultRipple on the issuer unless it is already known to be set"""
+    try:
+        if await account_state.has_default_ripple(client, ISSUER_ADDR):
+            return True, "DefaultRipple already set"
+    except Exception as e:
+        print(f"Error reading issuer flags: {e}")
+    return await setup_default_ripple()
+
+
+async def ensure_trust_line(
+    account_addr: str,
+    account_seed: str,
+    currency_code: str = "SGD",
+    limit: str = "1000",
+) -> Tuple[bool, str]:
+    """Create a trust line to the issuer unless the account already has one"""
+    try:
+        if await account_state.has_trust_line(
+            client, account_addr, currency_code, ISSUER_ADDR
+        ):
+            return True, f"Trust line already exists for {account_addr}"
+    except Exception as e:
+        print(f"Error reading trust lines: {e}")
+    return await create_trust_line(account_addr, account_seed, currency_code, limit)
+
+
 async def issue_currency(
     destination: str, amount: str, currency_code: str = "SGD"
 ) -> Tuple[bool, str]:
@@ -152,9 +468,12 @@ async def issue_currency(
                 currency=currency_code, issuer=ISSUER_ADDR, value=amount
             ),
         )
-        issue_result = await submit_and_wait(issue_payment, client, issuer_wallet)
+        issue_result = await submit_pipelined(
+            issue_payment, issuer_wallet, issuer_sequences
+        )
 
         if issue_result.is_successful():
+            _note_validated(issue_result)
             return (
                 True,
                 f"Successfully issued {amount} {currency_code} to {destination}",
@@ -177,7 +496,7 @@ async def send_loan(
 ) -> Tuple[bool, str, Dict]:
     """Send loan from lender to borrower"""
     try:
-        lender_wallet = Wallet.from_seed(lender_seed)
+        lender_wallet = await wallet_cache.get(lender_seed)
         loan_payment = Payment(
             account=lender_addr,
             destination=borrower_addr,
@@ -190,9 +509,12 @@ async def send_loan(
                 value=str(float(amount) * 1.05),  # 5% buffer
             ),
         )
-        loan_result = await submit_and_wait(loan_payment, client, lender_wallet)
+        loan_result = await submit_and_confirm(loan_payment, lender_wallet)
 
         if loan_result.is_successful():
+            _note_validated(loan_result)
+            # Only accounts that just moved funds on the ledger are followed
+            ledger_stream.track([lender_addr, borrower_addr])
             return (
                 True,
                 f"Loan of {amount} {currency_code} sent successfully to {borrower_addr}",
@@ -217,7 +539,7 @@ async def send_repayment(
 ) -> Tuple[bool, str, Dict]:
     """Send repayment from borrower to lender"""
     try:
-        borrower_wallet = Wallet.from_seed(borrower_seed)
+        borrower_wallet = await wallet_cache.get(borrower_seed)
         repayment = Payment(
             account=borrower_addr,
             destination=lender_addr,
@@ -230,9 +552,12 @@ async def send_repayment(
                 value=str(float(amount) * 1.05),  # 5% buffer
             ),
         )
-        repayment_result = await submit_and_wait(repayment, client, borrower_wallet)
+        repayment_result = await submit_and_confirm(repayment, borrower_wallet)
 
         if repayment_result.is_successful():
+            _note_validated(repayment_result)
+            # Only accounts that just moved funds on the ledger are followed
+            ledger_stream.track([borrower_addr, lender_addr])
             return (
                 True,
                 f"Repayment of {amount} {currency_code} sent successfully to {lender_addr}",